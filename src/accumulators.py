@@ -0,0 +1,293 @@
+import argparse
+import copy
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from store import iter_merged, default_merged_path, has_arrow
+from utils import get_scheme, stored_scheme
+
+# One-pass, mergeable summaries of the merged trades.
+#
+# Moments    count / sum / min / max / mean / M2 (Welford, combined with
+#            Chan's pairwise formula, so whole batches are folded in at once)
+# CoMoments  mean vector and co-moment matrix for correlations
+# DistinctCounter  HyperLogLog sketch of distinct accounts
+#
+# Every accumulator has update(batch) and merge(other), so summaries are
+# built chunk by chunk, per partition or per process and then combined.
+# preprocess keeps one TradeStats per trade day in STATS_PATH; totals are
+# the merge of the days, and late sentiment only recomputes the days it
+# touched.
+
+STATS_PATH = 'data/trade_stats.pkl'
+STATS_COLUMNS = ['Closed PnL', 'Leverage', 'sentiment_score']
+HLL_PRECISION = 12
+# Day key of trades with no timestamp in the per-day summaries.
+UNDATED = ''
+
+class Moments:
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        batch = Moments()
+        batch.n = len(values)
+        batch.total = values.sum()
+        batch.mean = batch.total / batch.n
+        batch.m2 = ((values - batch.mean) ** 2).sum()
+        batch.min, batch.max = values.min(), values.max()
+        return self.merge(batch)
+
+    def merge(self, other):
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.total += other.total
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.n - ddof) if self.n > ddof else np.nan
+
+class CoMoments:
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.n = 0
+        self.mean = np.zeros(len(self.columns))
+        self.comoment = np.zeros((len(self.columns), len(self.columns)))
+
+    def update(self, df):
+        # Rows with every column present, like a dropna() before corr().
+        values = df[self.columns].to_numpy('float64')
+        values = values[~np.isnan(values).any(axis=1)]
+        if not len(values):
+            return self
+        batch = CoMoments(self.columns)
+        batch.n = len(values)
+        batch.mean = values.mean(axis=0)
+        centered = values - batch.mean
+        batch.comoment = centered.T @ centered
+        return self.merge(batch)
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError(f"Cannot merge co-moments of {other.columns} into {self.columns}")
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment += other.comoment + np.outer(delta, delta) * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        return self
+
+    def corr(self):
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.outer(scale, scale)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+def bit_length(values):
+    # Position of the highest set bit of non-zero uint64 values, exactly
+    # (float log2 rounds near powers of two).
+    values = values.copy()
+    length = np.zeros(len(values), dtype='int64')
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= np.uint64(1 << shift)
+        length[big] += shift
+        values[big] >>= np.uint64(shift)
+    return length + 1
+
+class DistinctCounter:
+    # HyperLogLog with 2**precision one-byte registers (~1.04/sqrt(2**p)
+    # relative error); merging is an element-wise max.
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype='uint8')
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if not len(values):
+            return self
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Hash each category once rather than every row.
+            categories = values.cat.categories.astype(str).to_numpy(dtype=object)
+            hashes = pd.util.hash_array(categories)[values.cat.codes.to_numpy()]
+        else:
+            hashes = pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype('int64')
+        # Remaining bits, with a sentinel so an all-zero tail still ranks.
+        rest = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - bit_length(rest)).astype('uint8')
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype('int64')))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+class TradeStats:
+    # Everything the KPI cards, the average-PnL-by-sentiment chart and the
+    # correlation heatmaps need, in one mergeable object.
+    def __init__(self, columns=STATS_COLUMNS, precision=HLL_PRECISION):
+        self.columns = list(columns)
+        self.pnl = Moments()
+        self.wins = 0
+        self.by_sentiment = {}
+        self.comoments = None
+        self.accounts = DistinctCounter(precision)
+
+    def update(self, df):
+        pnl = df['Closed PnL'].to_numpy('float64')
+        self.pnl.update(pnl)
+        self.wins += int((pnl > 0).sum())
+        if 'classification' in df.columns:
+            for label, group in df.groupby('classification', observed=True)['Closed PnL']:
+                self.by_sentiment.setdefault(str(label), Moments()).update(group.to_numpy('float64'))
+        if self.comoments is None:
+            self.comoments = CoMoments([col for col in self.columns if col in df.columns])
+        self.comoments.update(df)
+        if 'Account' in df.columns:
+            self.accounts.update(df['Account'])
+        return self
+
+    def merge(self, other):
+        self.pnl.merge(other.pnl)
+        self.wins += other.wins
+        for label, moments in other.by_sentiment.items():
+            self.by_sentiment.setdefault(label, Moments()).merge(moments)
+        if self.comoments is None:
+            self.comoments = copy.deepcopy(other.comoments)
+        elif other.comoments is not None:
+            self.comoments.merge(other.comoments)
+        self.accounts.merge(other.accounts)
+        return self
+
+    def metrics(self):
+        n = self.pnl.n
+        counts = {label: moments.n for label, moments in self.by_sentiment.items()}
+        return {
+            'active_traders': int(round(self.accounts.estimate())),
+            'avg_pnl': self.pnl.mean if n else 0.0,
+            'win_rate': self.wins / n * 100 if n else 0.0,
+            'total_pnl': self.pnl.total,
+            'market_sentiment': max(counts, key=counts.get) if counts else 'Neutral',
+        }
+
+    def group_means(self):
+        _, order = get_scheme(stored_scheme())
+        labels = sorted(self.by_sentiment, key=lambda label: order.index(label) if label in order else len(order))
+        return pd.DataFrame({
+            'classification': labels,
+            'Closed PnL': [self.by_sentiment[label].mean for label in labels],
+        })
+
+    def corr(self):
+        return self.comoments.corr() if self.comoments is not None else pd.DataFrame()
+
+def merge_stats(parts):
+    total = TradeStats()
+    for part in parts:
+        total.merge(part)
+    return total
+
+def stats_by_day(df):
+    # Trades without a time are kept under UNDATED, as the rollup cube keeps
+    # them, so both give the same totals.
+    days = df['datetime'].dt.strftime('%Y-%m-%d').fillna(UNDATED)
+    return {day: TradeStats().update(group) for day, group in df.groupby(days, sort=False)}
+
+def merge_daily(daily, other):
+    for day, stats in other.items():
+        if day in daily:
+            daily[day].merge(stats)
+        else:
+            daily[day] = stats
+    return daily
+
+def load_daily_stats(path=STATS_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as fh:
+        return pickle.load(fh)
+
+def save_daily_stats(daily, path=STATS_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fh:
+        pickle.dump(daily, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+def rebuild_daily_stats_since(start=None, data_path=None, path=STATS_PATH):
+    # Recomputes the days from `start` onwards (all days when None) from
+    # the merged store.
+    first_day = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+    daily = {}
+    if first_day is not None:
+        # UNDATED sorts first: undated trades are never re-read from a date.
+        daily = {day: stats for day, stats in (load_daily_stats(path) or {}).items() if day < first_day}
+    for batch in iter_merged(data_path, start=first_day):
+        merge_daily(daily, stats_by_day(batch))
+    save_daily_stats(daily, path)
+
+def summarize_files(paths):
+    stats = TradeStats()
+    for path in paths:
+        for batch in iter_merged(path):
+            stats.update(batch)
+    return stats
+
+def summarize_merged(data_path=None, workers=None):
+    # Out-of-core summary of the whole store; Parquet partitions are
+    # summarized in parallel processes and the results merged.
+    data_path = data_path or default_merged_path()
+    if not os.path.isdir(data_path) or not has_arrow():
+        return summarize_files([data_path])
+    partitions = sorted(os.path.join(data_path, name) for name in os.listdir(data_path) if name.startswith('date='))
+    workers = max(1, min(len(partitions), workers or os.cpu_count() or 1))
+    groups = [partitions[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_stats(pool.map(summarize_files, groups))
+
+def load_trade_stats(path=STATS_PATH):
+    # Totals from the per-day summaries kept by preprocess, or None.
+    daily = load_daily_stats(path)
+    return merge_stats(daily.values()) if daily is not None else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="One-pass summary statistics of the merged trades")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    stats = summarize_merged(workers=args.workers)
+    print(json.dumps(stats.metrics(), indent=2, default=float))
+    print(stats.group_means().to_string(index=False))
+    print(stats.corr().round(3).to_string())
@@ -1,12 +1,20 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
-from PIL import Image
 import os
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import warnings
+from store import load_merged, default_merged_path
+from utils import path_fingerprint
+from timeseries import reduce_series
+from query import TradeIndex, page_count
+from refresh import BackgroundLoader
+from thumbnails import gallery
+from live import load_live_state
+from accumulators import STATS_PATH, TradeStats, load_trade_stats
+from synthetic import SAMPLE_ROWS, sample_merged
+from rollup import ROLLUP_DIR, load_cube, build_cube, trades_by_sentiment, top_accounts, pnl_histogram, box_summary, density_summary, period_changes
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
@@ -98,55 +106,303 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load data
-@st.cache_data
+APP_COLUMNS = ['Account', 'Coin', 'Side', 'datetime', 'Closed PnL', 'Leverage', 'sentiment_score', 'classification']
+TIMELINE_POINTS = 2000
+FIGURE_CACHE_ENTRIES = 32
+QUERY_CACHE_ENTRIES = 64
+REFRESH_SECONDS = 5.0
+LIVE_POLL_SECONDS = 1.0
+
 def load_data():
     try:
-        df = pd.read_csv("data/merged_data.csv")
+        df = load_merged(default_merged_path(), columns=APP_COLUMNS)
         return df
     except FileNotFoundError:
-        # Generate sample data for demonstration
-        np.random.seed(42)
-        n_records = 1000
-        accounts = [f"ACC_{i:04d}" for i in range(1, 101)]
-        
-        data = {
-            'Account': np.random.choice(accounts, n_records),
-            'Closed PnL': np.random.normal(50, 200, n_records),
-            'classification': np.random.choice(['Extreme Fear', 'Fear', 'Neutral', 'Greed', 'Extreme Greed'], 
-                                            n_records, p=[0.1, 0.3, 0.2, 0.3, 0.1]),
-            'fear_greed_index': np.random.randint(0, 100, n_records),
-            'timestamp': pd.date_range(start='2024-01-01', periods=n_records, freq='H'),
-            'leverage': np.random.uniform(1, 10, n_records),
-            'trade_side': np.random.choice(['Long', 'Short'], n_records),
-            'trade_count': np.random.randint(1, 10, n_records)
-        }
-        return pd.DataFrame(data)
-
-df = load_data()
+        # Generated sample trades, cleaned and merged like the real data,
+        # for demonstration
+        return sample_merged(SAMPLE_ROWS)[APP_COLUMNS]
+
+def data_fingerprint():
+    # Identity of the inputs (merged store, rollup cube, summaries) from file
+    # names, sizes and mtimes; changes whenever preprocess writes new data
+    return path_fingerprint(default_merged_path(), path_fingerprint(ROLLUP_DIR), path_fingerprint(STATS_PATH))
+
+def load_snapshot():
+    df = load_data()
+    # Pre-aggregated rollup cube written by preprocess; built from the
+    # loaded frame when it is missing (e.g. for the sample data)
+    cube = load_cube()
+    if cube is None:
+        cube = build_cube(df)
+    # Mergeable one-pass summaries (per-day, kept up to date by preprocess)
+    stats = load_trade_stats()
+    if stats is None:
+        stats = TradeStats().update(df)
+    return {'df': df, 'cube': cube, 'index': TradeIndex(df), 'stats': stats}
+
+# One loader per server process: sessions share the snapshot, and a new
+# one is built in the background when the data files change
+@st.cache_resource
+def get_loader():
+    return BackgroundLoader(load_snapshot, data_fingerprint, interval=REFRESH_SECONDS)
+
+loader = get_loader()
+data_version, snapshot = loader.get()
+df, cube, trade_index, trade_stats = snapshot['df'], snapshot['cube'], snapshot['index'], snapshot['stats']
 
 # Calculate metrics
-def calculate_metrics(df):
-    active_traders = df['Account'].nunique()
-    avg_pnl = df['Closed PnL'].mean()
-    win_rate = (df['Closed PnL'] > 0).mean() * 100
-    total_pnl = df['Closed PnL'].sum()
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def calculate_metrics(version, _stats, _cells):
+    summary = _stats.metrics()
     
-    market_sentiment = df['classification'].mode()[0] if not df.empty else "Neutral"
-    
-    trader_change = 12.3  # Simulated
-    pnl_change = 5.8     # Simulated
+    # Latest trade day against the day before; replaced by the live
+    # tailer's rolling windows while it is running
+    changes = period_changes(_cells)
+    trader_change = changes['active_traders']
+    pnl_change = changes['avg_pnl']
     
     return {
-        'active_traders': active_traders,
+        # Exact distinct count from the cube cells; the HLL estimate is only
+        # needed by the out-of-core summary
+        'active_traders': int(_cells['Account'].nunique()),
         'trader_change': trader_change,
-        'avg_pnl': avg_pnl,
+        'avg_pnl': summary['avg_pnl'],
         'pnl_change': pnl_change,
-        'win_rate': win_rate,
-        'market_sentiment': market_sentiment,
-        'total_pnl': total_pnl
+        'win_rate': summary['win_rate'],
+        'market_sentiment': summary['market_sentiment'],
+        'total_pnl': summary['total_pnl'],
+        'period': 'day'
     }
 
-metrics = calculate_metrics(df)
+def apply_live(metrics, live):
+    if not live or not live.get('rows'):
+        return metrics
+    return dict(metrics,
+                trader_change=live['changes']['active_traders'],
+                pnl_change=live['changes']['avg_pnl'],
+                period=live['period'])
+
+def format_change(change):
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+def change_color(change):
+    return "neutral" if change is None else ("positive" if change >= 0 else "negative")
+
+# Figures are memoized per data version (the input fingerprint), so widget
+# interactions rerun the script without rebuilding any chart; old versions
+# are evicted once FIGURE_CACHE_ENTRIES is reached
+SENTIMENT_COLORS = ['#ff4757', '#ff6b6b', '#ffd93d', '#00d4aa', '#ff4757']
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def box_figure(version, _cube):
+    # PnL Distribution by Sentiment (Boxplot style)
+    fig_box = go.Figure()
+
+    for i, stats in enumerate(box_summary(_cube['hist'], _cube['cells'])):
+        color = SENTIMENT_COLORS[i % len(SENTIMENT_COLORS)]
+        fig_box.add_trace(go.Box(
+            x=[stats['label']],
+            q1=[stats['q1']],
+            median=[stats['median']],
+            q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']],
+            upperfence=[stats['upperfence']],
+            mean=[stats['mean']],
+            name=stats['label'],
+            marker_color=color
+        ))
+        fig_box.add_trace(go.Scatter(
+            x=[stats['label']] * len(stats['outliers']),
+            y=stats['outliers'],
+            mode='markers',
+            marker=dict(color=color, size=4),
+            showlegend=False,
+            hoverinfo='y'
+        ))
+
+    fig_box.update_layout(
+        title="PnL Distribution by Sentiment",
+        xaxis_title="Market Sentiment",
+        yaxis_title="PnL ($)",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=400
+    )
+
+    return fig_box
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def violin_figure(version, _cube):
+    # PnL Density Analysis (Violin plot)
+    fig_violin = go.Figure()
+    density = density_summary(_cube['hist'])
+
+    for i, group in enumerate(density['groups']):
+        peak = group['density'].max()
+        width = 0.4 * group['density'] / peak if peak > 0 else group['density']
+        fig_violin.add_trace(go.Scatter(
+            x=np.r_[i - width, (i + width)[::-1]],
+            y=np.r_[density['centers'], density['centers'][::-1]],
+            fill='toself',
+            fillcolor=SENTIMENT_COLORS[i % len(SENTIMENT_COLORS)],
+            opacity=0.7,
+            line_color='white',
+            mode='lines',
+            name=group['label']
+        ))
+        fig_violin.add_trace(go.Scatter(
+            x=[i - 0.2, i + 0.2],
+            y=[group['quartiles'][1]] * 2,
+            mode='lines',
+            line=dict(color='white', width=2),
+            showlegend=False,
+            hoverinfo='y'
+        ))
+
+    fig_violin.update_layout(
+        title="PnL Density Analysis",
+        xaxis_title="Market Sentiment",
+        yaxis_title="PnL ($)",
+        xaxis=dict(tickvals=list(range(len(density['groups']))),
+                   ticktext=[group['label'] for group in density['groups']]),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=400
+    )
+
+    return fig_violin
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def top_traders_figure(version, _cube):
+    # Top Performers
+    top_traders = top_accounts(_cube['cells'], 10)
+
+    fig_top = go.Figure(data=[
+        go.Bar(
+            x=top_traders.values,
+            y=top_traders.index,
+            orientation='h',
+            marker_color='#00d4aa',
+            text=[f'${x:,.0f}' for x in top_traders.values],
+            textposition='auto'
+        )
+    ])
+
+    fig_top.update_layout(
+        title="Top 10 Performing Traders",
+        xaxis_title="Total PnL ($)",
+        yaxis_title="Account",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=400
+    )
+
+    return fig_top
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def pnl_histogram_figure(version, _cube):
+    # PnL Distribution Histogram
+    hist_counts, hist_edges = pnl_histogram(_cube['hist'], 30)
+    fig_hist = go.Figure(data=[
+        go.Bar(
+            x=(hist_edges[:-1] + hist_edges[1:]) / 2,
+            y=hist_counts,
+            width=np.diff(hist_edges),
+            marker_color='#667eea',
+            opacity=0.8
+        )
+    ])
+
+    fig_hist.update_layout(
+        title="PnL Distribution",
+        xaxis_title="PnL ($)",
+        yaxis_title="Frequency",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=400
+    )
+
+    return fig_hist
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def timeline_figure(version, _df, time_col, index_col):
+    df_time = reduce_series(_df, time_col, index_col, n_out=TIMELINE_POINTS)
+
+    fig_time = go.Figure()
+    fig_time.add_trace(go.Scatter(
+        x=df_time[time_col],
+        y=df_time[index_col],
+        mode='lines+markers' if len(df_time) <= 200 else 'lines',
+        name='Fear & Greed Index',
+        line=dict(color='#ffd93d', width=2),
+        marker=dict(size=4)
+    ))
+
+    fig_time.add_hline(y=20, line_dash="dash", line_color="red", 
+                      annotation_text="Extreme Fear")
+    fig_time.add_hline(y=80, line_dash="dash", line_color="green", 
+                      annotation_text="Extreme Greed")
+
+    fig_time.update_layout(
+        title="Fear & Greed Index Timeline",
+        xaxis_title="Time",
+        yaxis_title="Index Value",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=400
+    )
+
+    return fig_time
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def sentiment_pie_figure(version, _cube):
+    sentiment_counts = trades_by_sentiment(_cube['cells'])
+
+    fig_pie = go.Figure(data=[
+        go.Pie(
+            labels=sentiment_counts.index,
+            values=sentiment_counts.values,
+            hole=0.4,
+            marker_colors=SENTIMENT_COLORS
+        )
+    ])
+
+    fig_pie.update_layout(
+        title="Market Sentiment Distribution",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=400
+    )
+
+    return fig_pie
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def correlation_figure(version, _stats):
+    corr_data = _stats.corr()
+
+    fig_corr = go.Figure(data=go.Heatmap(
+        z=corr_data.values,
+        x=corr_data.columns,
+        y=corr_data.columns,
+        colorscale='RdBu',
+        zmid=0
+    ))
+
+    fig_corr.update_layout(
+        title="Correlation Matrix",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=400
+    )
+
+    return fig_corr
 
 # Header
 st.markdown("""
@@ -157,52 +413,64 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Metrics Row
-col1, col2, col3, col4 = st.columns(4)
+# While the live tailer (live.py) is running, only this row reruns every
+# LIVE_POLL_SECONDS and reads its small state file
+@st.fragment(run_every=LIVE_POLL_SECONDS if load_live_state() else None)
+def render_metrics():
+    live = load_live_state()
+    metrics = apply_live(calculate_metrics(data_version, trade_stats, cube['cells']), live)
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-title">📈 Active Traders</div>
+            <div class="metric-value positive">{metrics['active_traders']:,}</div>
+            <div class="metric-change {change_color(metrics['trader_change'])}">{format_change(metrics['trader_change'])} from last {metrics['period']}</div>
+        </div>
+        """, unsafe_allow_html=True)
 
-with col1:
-    st.markdown(f"""
-    <div class="metric-card">
-        <div class="metric-title">📈 Active Traders</div>
-        <div class="metric-value positive">{metrics['active_traders']:,}</div>
-        <div class="metric-change positive">+{metrics['trader_change']:.1f}% from last period</div>
-    </div>
-    """, unsafe_allow_html=True)
+    with col2:
+        pnl_color = "positive" if metrics['avg_pnl'] >= 0 else "negative"
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-title">💰 Avg PnL</div>
+            <div class="metric-value {pnl_color}">${metrics['avg_pnl']:,.0f}</div>
+            <div class="metric-change {change_color(metrics['pnl_change'])}">{format_change(metrics['pnl_change'])} from last {metrics['period']}</div>
+        </div>
+        """, unsafe_allow_html=True)
 
-with col2:
-    pnl_color = "positive" if metrics['avg_pnl'] >= 0 else "negative"
-    st.markdown(f"""
-    <div class="metric-card">
-        <div class="metric-title">💰 Avg PnL</div>
-        <div class="metric-value {pnl_color}">${metrics['avg_pnl']:,.0f}</div>
-        <div class="metric-change">Fear vs Greed analysis</div>
-    </div>
-    """, unsafe_allow_html=True)
+    with col3:
+        sentiment_color = {
+            'Extreme Fear': 'fear',
+            'Fear': 'negative', 
+            'Neutral': 'neutral',
+            'Greed': 'positive',
+            'Extreme Greed': 'fear'
+        }.get(metrics['market_sentiment'], 'neutral')
+    
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-title">📊 Market Sentiment</div>
+            <div class="metric-value {sentiment_color}">{metrics['market_sentiment']}</div>
+            <div class="metric-change">Dominant sentiment: {metrics['market_sentiment']}</div>
+        </div>
+        """, unsafe_allow_html=True)
 
-with col3:
-    sentiment_color = {
-        'Extreme Fear': 'fear',
-        'Fear': 'negative', 
-        'Neutral': 'neutral',
-        'Greed': 'positive',
-        'Extreme Greed': 'fear'
-    }.get(metrics['market_sentiment'], 'neutral')
+    with col4:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-title">🎯 Win Rate</div>
+            <div class="metric-value positive">{metrics['win_rate']:.1f}%</div>
+            <div class="metric-change">Profitable trades</div>
+        </div>
+        """, unsafe_allow_html=True)
     
-    st.markdown(f"""
-    <div class="metric-card">
-        <div class="metric-title">📊 Market Sentiment</div>
-        <div class="metric-value {sentiment_color}">{metrics['market_sentiment']}</div>
-        <div class="metric-change">Dominant sentiment: {metrics['market_sentiment']}</div>
-    </div>
-    """, unsafe_allow_html=True)
+    if live and live.get('rows'):
+        st.caption(f"⚡ Live: {live['rows']:,} new trades tailed, latest at {live['latest_trade']}, "
+                   f"{live['current']['active_traders']:,} traders active in the last {live['period']}")
 
-with col4:
-    st.markdown(f"""
-    <div class="metric-card">
-        <div class="metric-title">🎯 Win Rate</div>
-        <div class="metric-value positive">{metrics['win_rate']:.1f}%</div>
-        <div class="metric-change">Profitable trades</div>
-    </div>
-    """, unsafe_allow_html=True)
+render_metrics()
 
 # Navigation tabs
 st.markdown('<div class="section-header">📊 Analytics Dashboard</div>', unsafe_allow_html=True)
@@ -213,198 +481,42 @@ with tab1:
     col1, col2 = st.columns(2)
     
     with col1:
-        # PnL Distribution by Sentiment (Boxplot style)
-        fig_box = go.Figure()
-        
-        sentiments = df['classification'].unique()
-        colors = ['#ff4757', '#ff6b6b', '#ffd93d', '#00d4aa', '#ff4757']
-        
-        for i, sentiment in enumerate(sentiments):
-            sentiment_data = df[df['classification'] == sentiment]['Closed PnL']
-            fig_box.add_trace(go.Box(
-                y=sentiment_data,
-                name=sentiment,
-                marker_color=colors[i % len(colors)],
-                boxpoints='outliers'
-            ))
-        
-        fig_box.update_layout(
-            title="PnL Distribution by Sentiment",
-            xaxis_title="Market Sentiment",
-            yaxis_title="PnL ($)",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            height=400
-        )
-        
-        st.plotly_chart(fig_box, use_container_width=True)
+        st.plotly_chart(box_figure(data_version, cube), use_container_width=True)
     
     with col2:
-        # PnL Density Analysis (Violin plot)
-        fig_violin = go.Figure()
-        
-        for i, sentiment in enumerate(sentiments):
-            sentiment_data = df[df['classification'] == sentiment]['Closed PnL']
-            fig_violin.add_trace(go.Violin(
-                y=sentiment_data,
-                name=sentiment,
-                fillcolor=colors[i % len(colors)],
-                opacity=0.7,
-                line_color='white'
-            ))
-        
-        fig_violin.update_layout(
-            title="PnL Density Analysis",
-            xaxis_title="Market Sentiment",
-            yaxis_title="PnL ($)",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            height=400
-        )
-        
-        st.plotly_chart(fig_violin, use_container_width=True)
+        st.plotly_chart(violin_figure(data_version, cube), use_container_width=True)
 
 with tab2:
     col1, col2 = st.columns(2)
     
     with col1:
-        # Top Performers
-        top_traders = df.groupby('Account')['Closed PnL'].sum().sort_values(ascending=False).head(10)
-        
-        fig_top = go.Figure(data=[
-            go.Bar(
-                x=top_traders.values,
-                y=top_traders.index,
-                orientation='h',
-                marker_color='#00d4aa',
-                text=[f'${x:,.0f}' for x in top_traders.values],
-                textposition='auto'
-            )
-        ])
-        
-        fig_top.update_layout(
-            title="Top 10 Performing Traders",
-            xaxis_title="Total PnL ($)",
-            yaxis_title="Account",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            height=400
-        )
-        
-        st.plotly_chart(fig_top, use_container_width=True)
+        st.plotly_chart(top_traders_figure(data_version, cube), use_container_width=True)
     
     with col2:
-        # PnL Distribution Histogram
-        fig_hist = go.Figure(data=[
-            go.Histogram(
-                x=df['Closed PnL'],
-                nbinsx=30,
-                marker_color='#667eea',
-                opacity=0.8
-            )
-        ])
-        
-        fig_hist.update_layout(
-            title="PnL Distribution",
-            xaxis_title="PnL ($)",
-            yaxis_title="Frequency",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            height=400
-        )
-        
-        st.plotly_chart(fig_hist, use_container_width=True)
+        st.plotly_chart(pnl_histogram_figure(data_version, cube), use_container_width=True)
 
 with tab3:
     # Fear & Greed Index Over Time
-    if 'timestamp' in df.columns and 'fear_greed_index' in df.columns:
-        df_time = df.sort_values('timestamp')
-        
-        fig_time = go.Figure()
-        fig_time.add_trace(go.Scatter(
-            x=df_time['timestamp'],
-            y=df_time['fear_greed_index'],
-            mode='lines+markers',
-            name='Fear & Greed Index',
-            line=dict(color='#ffd93d', width=2),
-            marker=dict(size=4)
-        ))
-        
-        fig_time.add_hline(y=20, line_dash="dash", line_color="red", 
-                          annotation_text="Extreme Fear")
-        fig_time.add_hline(y=80, line_dash="dash", line_color="green", 
-                          annotation_text="Extreme Greed")
-        
-        fig_time.update_layout(
-            title="Fear & Greed Index Timeline",
-            xaxis_title="Time",
-            yaxis_title="Index Value",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            height=400
-        )
-        
-        st.plotly_chart(fig_time, use_container_width=True)
+    st.plotly_chart(timeline_figure(data_version, df, 'datetime', 'sentiment_score'), use_container_width=True)
     
     # Sentiment Distribution Pie Chart
     col1, col2 = st.columns(2)
     
     with col1:
-        sentiment_counts = df['classification'].value_counts()
-        
-        fig_pie = go.Figure(data=[
-            go.Pie(
-                labels=sentiment_counts.index,
-                values=sentiment_counts.values,
-                hole=0.4,
-                marker_colors=['#ff4757', '#ff6b6b', '#ffd93d', '#00d4aa', '#ff4757']
-            )
-        ])
-        
-        fig_pie.update_layout(
-            title="Market Sentiment Distribution",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            height=400
-        )
-        
-        st.plotly_chart(fig_pie, use_container_width=True)
+        st.plotly_chart(sentiment_pie_figure(data_version, cube), use_container_width=True)
     
     with col2:
         # Correlation Analysis
-        if len(df.select_dtypes(include=[np.number]).columns) > 1:
-            corr_data = df.select_dtypes(include=[np.number]).corr()
-            
-            fig_corr = go.Figure(data=go.Heatmap(
-                z=corr_data.values,
-                x=corr_data.columns,
-                y=corr_data.columns,
-                colorscale='RdBu',
-                zmid=0
-            ))
-            
-            fig_corr.update_layout(
-                title="Correlation Matrix",
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                height=400
-            )
-            
-            st.plotly_chart(fig_corr, use_container_width=True)
+        if len(trade_stats.corr().columns) > 1:
+            st.plotly_chart(correlation_figure(data_version, trade_stats), use_container_width=True)
 
 # Detailed Analysis Plots Section
 st.markdown('<div class="section-header">📈 Detailed Analysis Plots</div>', unsafe_allow_html=True)
 
 output_dir = "output"
 if os.path.exists(output_dir):
-    plot_files = [f for f in os.listdir(output_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+    # Thumbnails are resized once per image version and cached on disk
+    plot_files = gallery(output_dir)
     
     if plot_files:
         # Display plots in a grid
@@ -413,13 +525,17 @@ if os.path.exists(output_dir):
             cols = st.columns(cols_per_row)
             for j, col in enumerate(cols):
                 if i + j < len(plot_files):
-                    plot_path = os.path.join(output_dir, plot_files[i + j])
-                    try:
-                        image = Image.open(plot_path)
+                    name, plot_path, thumb_path, error = plot_files[i + j]
+                    if error is None:
                         with col:
-                            st.image(image, caption=plot_files[i + j], use_container_width=True)
-                    except Exception as e:
-                        col.warning(f"Failed to load {plot_files[i + j]}: {str(e)}")
+                            st.image(thumb_path, caption=name, use_container_width=True)
+                    else:
+                        col.warning(f"Failed to load {name}: {error}")
+        
+        # Full-size images are only read when one is opened
+        full_size = st.selectbox("Open a plot at full size", ["None"] + [name for name, _, _, error in plot_files if error is None])
+        if full_size != "None":
+            st.image(os.path.join(output_dir, full_size), caption=full_size, use_container_width=True)
     else:
         st.info("No plots found in the 'output' directory. Please ensure plots are generated and saved in the 'output' directory.")
 else:
@@ -429,30 +545,66 @@ else:
 st.markdown('<div class="section-header">📋 Raw Data</div>', unsafe_allow_html=True)
 
 # Add filters
-col1, col2, col3 = st.columns(3)
+col1, col2, col3, col4 = st.columns(4)
 with col1:
     sentiment_filter = st.selectbox("Filter by Sentiment", 
-                                   ["All"] + list(df['classification'].unique()))
+                                   ["All"] + trade_index.categories('classification'))
 with col2:
-    min_pnl = st.number_input("Minimum PnL", value=float(df['Closed PnL'].min()))
+    coin_filter = st.selectbox("Filter by Coin",
+                               ["All"] + (trade_index.categories('Coin') if 'Coin' in trade_index.postings else []))
 with col3:
+    min_pnl = st.number_input("Minimum PnL", value=float(df['Closed PnL'].min()))
+with col4:
     max_pnl = st.number_input("Maximum PnL", value=float(df['Closed PnL'].max()))
 
-# Apply filters
-filtered_df = df.copy()
-if sentiment_filter != "All":
-    filtered_df = filtered_df[filtered_df['classification'] == sentiment_filter]
-filtered_df = filtered_df[
-    (filtered_df['Closed PnL'] >= min_pnl) & 
-    (filtered_df['Closed PnL'] <= max_pnl)
-]
+date_range = None
+if 'datetime' in trade_index.ranges and len(df):
+    first_day, last_day = df['datetime'].min().date(), df['datetime'].max().date()
+    date_range = st.date_input("Date range", value=(first_day, last_day), min_value=first_day, max_value=last_day)
+
+# Apply filters through the index and page server-side
+equals = {
+    'classification': None if sentiment_filter == "All" else [sentiment_filter],
+    'Coin': None if coin_filter == "All" else [coin_filter],
+}
+ranges = {'Closed PnL': (min_pnl, max_pnl)}
+if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+    ranges['datetime'] = (np.datetime64(pd.Timestamp(date_range[0])),
+                          np.datetime64(pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')))
+
+# Matching rows are memoized per data version and filter values, so paging
+# and sorting reuse them
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def query_rows(version, _index, equals, ranges):
+    return _index.query({col: values for col, values in equals.items() if col in _index.postings}, ranges)
+
+matching_rows = query_rows(data_version, trade_index, equals, ranges)
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    page_size = st.selectbox("Rows per page", [50, 100, 250, 1000], index=1)
+with col2:
+    sort_by = st.selectbox("Sort by", ["Table order"] + list(trade_index.ranges))
+with col3:
+    n_pages = page_count(len(matching_rows), page_size)
+    page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1)
+
+first_row = (page - 1) * page_size
+st.caption(f"{len(matching_rows):,} matching trades of {len(trade_index):,} | "
+           f"showing {min(first_row + 1, len(matching_rows)):,}-{min(first_row + page_size, len(matching_rows)):,}")
 
 st.dataframe(
-    filtered_df,
+    trade_index.page(matching_rows, page - 1, page_size, sort_by=None if sort_by == "Table order" else sort_by),
     use_container_width=True,
     height=400
 )
 
+# Background refresh status
+if loader.reloading:
+    st.caption("🔄 New data found, refreshing in the background")
+elif loader.error:
+    st.caption("⚠️ Last refresh failed, showing the previous data")
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,226 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from store import MERGED_CSV, MERGED_DATASET, load_merged, default_merged_path
+from preprocess import (TRADES_PATH, SENTIMENT_PATH, load_and_clean_trades, iter_clean_trades,
+                        load_and_clean_sentiment, merge_datasets, run_full)
+from synthetic import SEED, DEFAULT_DAYS, CHUNK_ROWS, write_synthetic
+from model import run_models, peak_memory_mb
+from cluster import run_clustering
+from eda import run_eda
+from sweep import run_sweep
+from rollup import (build_cube, trades_by_sentiment, top_accounts, pnl_histogram, box_summary,
+                    density_summary, period_changes)
+from accumulators import TradeStats
+from query import TradeIndex
+from timeseries import reduce_series
+
+# End-to-end benchmark on generated data. For every scale, synthetic raw
+# inputs are written under BENCHMARK_DIR/<rows>/ (and reused while the
+# generator settings match), then each stage runs in a fresh process with
+# that directory as working directory, so the real outputs are untouched
+# and the peak RSS reported is the stage's own. Results are written as
+# JSON; --baseline compares them with an earlier run and fails on a
+# throughput or memory regression.
+
+BENCHMARK_DIR = 'data/benchmark'
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results.json')
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+GENERATOR_MARKER = '.synthetic.json'
+# Same projection as the dashboard's APP_COLUMNS.
+DASHBOARD_COLUMNS = ['Account', 'Coin', 'Side', 'datetime', 'Closed PnL', 'Leverage', 'sentiment_score', 'classification']
+TOLERANCE = 0.25
+
+# Stages: each runs against the inputs in the working directory. A stage
+# returning a float reports those seconds instead of its whole run time.
+
+def bench_load_and_clean_trades():
+    load_and_clean_trades(TRADES_PATH)
+
+def bench_merge_datasets():
+    # Only the join is timed; reading and cleaning the chunks is not.
+    sentiment = load_and_clean_sentiment(SENTIMENT_PATH).sort_values('datetime')
+    seconds = 0.0
+    for chunk in iter_clean_trades(TRADES_PATH):
+        start = time.perf_counter()
+        merge_datasets(chunk, sentiment)
+        seconds += time.perf_counter() - start
+    return seconds
+
+def bench_dashboard():
+    # What a dashboard snapshot load and a first render aggregate.
+    df = load_merged(default_merged_path(), columns=DASHBOARD_COLUMNS)
+    cube = build_cube(df)
+    index = TradeIndex(df)
+    TradeStats().update(df).metrics()
+    period_changes(cube['cells'])
+    box_summary(cube['hist'], cube['cells'])
+    density_summary(cube['hist'])
+    top_accounts(cube['cells'], 10)
+    pnl_histogram(cube['hist'], 30)
+    trades_by_sentiment(cube['cells'])
+    reduce_series(df, 'datetime', 'sentiment_score', n_out=2000)
+    rows = index.query({'classification': index.categories('classification')[:1]}, {'Closed PnL': (0.0, None)})
+    index.page(rows, 0, 100, sort_by='Closed PnL')
+
+# Stages that read the merged store written by preprocess.
+MERGED_STAGES = {'run_models', 'run_clustering', 'eda', 'sweep', 'dashboard'}
+STAGES = {
+    'load_and_clean_trades': bench_load_and_clean_trades,
+    'merge_datasets': bench_merge_datasets,
+    'preprocess': run_full,
+    'run_models': run_models,
+    'run_clustering': run_clustering,
+    'eda': lambda: run_eda(force=True),
+    'sweep': run_sweep,
+    'dashboard': bench_dashboard,
+}
+
+def run_stage(name, case_dir, verbose=False, rows=None, days=DEFAULT_DAYS, seed=SEED, chunk_rows=CHUNK_ROWS):
+    # Runs in a fresh process: ru_maxrss then only covers this stage and
+    # the worker processes it started.
+    os.chdir(case_dir)
+    baseline = peak_memory_mb()
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+        if name == 'generate':
+            seconds = write_synthetic(rows, days=days, seed=seed, chunk_rows=chunk_rows)
+        else:
+            seconds = STAGES[name]()
+    seconds = seconds if isinstance(seconds, float) else time.perf_counter() - start
+    # Pool workers (eda, clustering, generate) are not in this process's
+    # own RSS; the largest of them counts as the stage's peak when it is
+    # bigger.
+    own, children = peak_memory_mb(), peak_memory_mb(children=True)
+    return {'seconds': seconds, 'peak_rss_mb': max(own, children), 'own_rss_mb': own,
+            'children_rss_mb': children, 'baseline_rss_mb': baseline}
+
+def in_fresh_process(fn, *args, **kwargs):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(fn, *args, **kwargs).result()
+
+def generator_settings(rows, days, seed, chunk_rows):
+    return {'rows': rows, 'days': days, 'seed': seed, 'chunk_rows': chunk_rows}
+
+def data_is_current(case_dir, settings):
+    marker = os.path.join(case_dir, GENERATOR_MARKER)
+    if not os.path.exists(marker) or not os.path.exists(os.path.join(case_dir, TRADES_PATH)):
+        return False
+    with open(marker) as fh:
+        return json.load(fh) == settings
+
+def run_benchmarks(scales=DEFAULT_SCALES, stages=None, workdir=BENCHMARK_DIR, days=DEFAULT_DAYS, seed=SEED,
+                   chunk_rows=CHUNK_ROWS, verbose=False):
+    stages = [stage for stage in STAGES if stage in (stages or STAGES)]
+    results = []
+
+    def record(rows, stage, measured=None, error=None):
+        entry = {'rows': rows, 'stage': stage}
+        if measured is not None:
+            seconds = measured['seconds']
+            entry.update(measured, rows_per_sec=rows / seconds if seconds > 0 else None)
+            print(f"⏱️ {rows:>12,} rows  {stage:<22} {seconds:8.2f}s  {entry['rows_per_sec'] or 0:>14,.0f} rows/s"
+                  f"  {measured['peak_rss_mb']:8,.0f} MB")
+        else:
+            entry['error'] = error
+            print(f"❌ {rows:>12,} rows  {stage:<22} {error}")
+        results.append(entry)
+
+    for rows in scales:
+        case_dir = os.path.abspath(os.path.join(workdir, str(rows)))
+        os.makedirs(case_dir, exist_ok=True)
+        settings = generator_settings(rows, days, seed, chunk_rows)
+        case_stages = list(stages)
+        generated = not data_is_current(case_dir, settings)
+        if generated:
+            try:
+                record(rows, 'generate', in_fresh_process(run_stage, 'generate', case_dir, verbose, rows, days, seed, chunk_rows))
+            except Exception as exc:
+                record(rows, 'generate', error=repr(exc))
+                continue
+            with open(os.path.join(case_dir, GENERATOR_MARKER), 'w') as fh:
+                json.dump(settings, fh)
+        # Stages on the merged store need preprocess output for this data.
+        merged = any(os.path.exists(os.path.join(case_dir, path)) for path in (MERGED_DATASET, MERGED_CSV))
+        if MERGED_STAGES & set(case_stages) and 'preprocess' not in case_stages and (generated or not merged):
+            case_stages.insert(0, 'preprocess')
+        for stage in case_stages:
+            if stage in MERGED_STAGES and any(entry['rows'] == rows and entry['stage'] == 'preprocess'
+                                              and 'error' in entry for entry in results):
+                record(rows, stage, error="skipped, preprocess failed")
+                continue
+            try:
+                record(rows, stage, in_fresh_process(run_stage, stage, case_dir, verbose))
+            except Exception as exc:
+                record(rows, stage, error=repr(exc))
+    return results
+
+def save_results(results, path=RESULTS_PATH, **settings):
+    report = {
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'settings': settings,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    return report
+
+def find_regressions(results, baseline_path, tolerance=TOLERANCE):
+    # Stages whose throughput dropped, or whose peak memory grew, by more
+    # than `tolerance` against the same (rows, stage) in the baseline.
+    with open(baseline_path) as fh:
+        baseline = {(entry['rows'], entry['stage']): entry for entry in json.load(fh)['results']}
+    regressions = []
+    for entry in results:
+        before = baseline.get((entry['rows'], entry['stage']))
+        if before is None or 'error' in before:
+            continue
+        if 'error' in entry:
+            regressions.append(f"{entry['stage']} @ {entry['rows']:,} rows: failed ({entry['error']})")
+            continue
+        if before.get('rows_per_sec') and entry['rows_per_sec'] < before['rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"{entry['stage']} @ {entry['rows']:,} rows: {entry['rows_per_sec']:,.0f} rows/s "
+                               f"vs {before['rows_per_sec']:,.0f}")
+        if entry['peak_rss_mb'] > before['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{entry['stage']} @ {entry['rows']:,} rows: peak RSS {entry['peak_rss_mb']:,.0f} MB "
+                               f"vs {before['peak_rss_mb']:,.0f} MB")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on generated data")
+    parser.add_argument('--rows', type=float, nargs='+', default=DEFAULT_SCALES,
+                        help="trade counts to benchmark, e.g. 1e4 1e6 1e8")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=None)
+    parser.add_argument('--workdir', default=BENCHMARK_DIR, help="where generated inputs and stage outputs go")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--baseline', default=None, help="earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--verbose', action='store_true', help="show the stages' own output")
+    args = parser.parse_args()
+    scales = [int(rows) for rows in args.rows]
+    results = run_benchmarks(scales, args.stages, args.workdir, args.days, args.seed, args.chunk_rows, args.verbose)
+    save_results(results, args.output, rows=scales, days=args.days, seed=args.seed, chunk_rows=args.chunk_rows)
+    print(f"✅ Results saved to {args.output}")
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"🐢 {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"✅ No regressions against {args.baseline}")
@@ -1,32 +1,153 @@
+import argparse
 import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
 import seaborn as sns
 import matplotlib.pyplot as plt
 import os
+from store import load_merged, iter_merged, default_merged_path
 
-def run_clustering(data_path='data/merged_data.csv'):
+CLUSTER_FEATURES = ['Leverage', 'sentiment_score', 'Closed PnL']
+# Written next to the cluster labels so they can be joined back to trades.
+CLUSTER_KEYS = ['Account', 'Coin', 'Side', 'datetime']
+CLUSTER_COLUMNS = CLUSTER_KEYS + CLUSTER_FEATURES
+CLUSTERED_CSV = 'data/clustered_data.csv'
+PLOT_SAMPLE = 5000
+RANDOM_STATE = 42
+
+def keep_smallest_keys(sample, batch, size, rng, by=None):
+    # Bottom-k sampling: every row gets a uniform random key and the rows
+    # with the smallest keys (per group when `by` is set) are kept, which is
+    # a uniform sample of everything seen so far, updated one batch at a time.
+    batch = batch.assign(_key=rng.random(len(batch)))
+    merged = batch if sample is None else pd.concat([sample, batch], ignore_index=True)
+    merged = merged.sort_values('_key', kind='mergesort')
+    if by is None:
+        return merged.head(size)
+    return merged.groupby(by, observed=True, sort=False).head(size)
+
+def plot_clusters(sample, path="output/clustering_plot.png"):
+    os.makedirs("output", exist_ok=True)
+    grid = sns.pairplot(sample, vars=CLUSTER_FEATURES, hue='cluster', palette='tab10')
+    grid.figure.suptitle("🧠 Clustering of Trades", fontsize=16)
+    grid.figure.tight_layout()
+    grid.savefig(path)
+    plt.close(grid.figure)
+    print(f"📊 Saved clustering plot to {path}")
+
+def run_clustering(data_path=None, n_clusters=3, df=None):
+    data_path = data_path or default_merged_path()
     if not os.path.exists(data_path):
         print(f"❌ File not found: {data_path}")
         return
 
-    df = pd.read_csv(data_path).dropna()
-    features = df[['Leverage', 'sentiment_score', 'Closed PnL']]
+    df = load_merged(data_path, columns=CLUSTER_COLUMNS) if df is None else df[CLUSTER_COLUMNS]
+    df = df.dropna(subset=CLUSTER_FEATURES)
+    features = df[CLUSTER_FEATURES]
     scaled = StandardScaler().fit_transform(features)
 
-    kmeans = KMeans(n_clusters=3, random_state=42).fit(scaled)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE).fit(scaled)
     df['cluster'] = kmeans.labels_
 
-    os.makedirs("output", exist_ok=True)
-    sns.pairplot(df, vars=['Leverage', 'sentiment_score', 'Closed PnL'], hue='cluster', palette='tab10')
-    plt.suptitle("🧠 Clustering of Trades", fontsize=16)
-    plt.tight_layout()
-    plt.savefig("output/clustering_plot.png")
-    print("📊 Saved clustering plot to output/clustering_plot.png")
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample = keep_smallest_keys(None, df, PLOT_SAMPLE // n_clusters, rng, by='cluster').drop(columns='_key')
+    plot_clusters(sample)
 
     os.makedirs("data", exist_ok=True)
-    df.to_csv('data/clustered_data.csv', index=False)
-    print("✅ Clustered data saved to data/clustered_data.csv")
+    df.to_csv(CLUSTERED_CSV, index=False)
+    print(f"✅ Clustered data saved to {CLUSTERED_CSV}")
+
+def iter_cluster_batches(data_path, batch_size=None, columns=CLUSTER_FEATURES):
+    kwargs = {'batch_size': batch_size} if batch_size else {}
+    for batch in iter_merged(data_path, columns=columns, **kwargs):
+        batch = batch.dropna(subset=CLUSTER_FEATURES)
+        if len(batch):
+            yield batch
+
+def partial_fit_all(pool, models, scaled):
+    # One mini-batch step of every candidate k on the same scaled chunk,
+    # side by side.
+    list(pool.map(lambda model: model.partial_fit(scaled), models))
+
+def run_clustering_streaming(data_path=None, k_values=(3,), batch_size=None, workers=None):
+    # Chunked clustering: one pass accumulates the scaler statistics with
+    # partial_fit and a uniform sample of up to PLOT_SAMPLE rows; a second
+    # pass updates one MiniBatchKMeans per candidate k with partial_fit on
+    # every chunk, the k models in parallel threads; the best k (by
+    # silhouette on the sample) labels the data chunk by chunk, with the
+    # trade keys, and only a per-cluster sample is plotted.
+    data_path = data_path or default_merged_path()
+    if not os.path.exists(data_path):
+        print(f"❌ File not found: {data_path}")
+        return
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    scaler = StandardScaler()
+    sample = None
+    for batch in iter_cluster_batches(data_path, batch_size):
+        scaler.partial_fit(batch[CLUSTER_FEATURES])
+        sample = keep_smallest_keys(sample, batch, PLOT_SAMPLE, rng)
+    if sample is None:
+        print("❌ No rows to cluster")
+        return
+
+    k_values = sorted(set(k_values))
+    models = {k: MiniBatchKMeans(n_clusters=k, random_state=RANDOM_STATE, n_init=3) for k in k_values}
+    # The first step seeds the centroids, so small leading chunks are held
+    # back until there are a few rows per cluster.
+    min_rows = 3 * k_values[-1]
+    pending = []
+    with ThreadPoolExecutor(max_workers=min(len(k_values), workers or os.cpu_count() or 1)) as pool:
+        for batch in iter_cluster_batches(data_path, batch_size):
+            pending.append(scaler.transform(batch[CLUSTER_FEATURES]))
+            if sum(len(part) for part in pending) >= min_rows:
+                partial_fit_all(pool, models.values(), np.vstack(pending))
+                pending = []
+        if pending:
+            # Fewer rows in total than min_rows: fit the k values they allow.
+            scaled = np.vstack(pending)
+            models = {k: model for k, model in models.items()
+                      if k <= len(scaled) or hasattr(model, 'cluster_centers_')}
+            partial_fit_all(pool, models.values(), scaled)
+    if not models:
+        print("❌ Not enough rows to cluster")
+        return
+
+    if len(models) > 1:
+        scored = scaler.transform(sample[CLUSTER_FEATURES])
+        scores = {k: silhouette_score(scored, model.predict(scored)) for k, model in models.items()}
+        for k, score in scores.items():
+            print(f"🔎 k={k}: silhouette {score:.3f}")
+        best_k = max(scores, key=scores.get)
+    else:
+        (best_k,) = models
+    kmeans = models[best_k]
+    print(f"✅ Using k={best_k}")
+
+    os.makedirs("data", exist_ok=True)
+    plot_sample = None
+    first = True
+    for batch in iter_cluster_batches(data_path, batch_size, columns=CLUSTER_COLUMNS):
+        batch = batch.assign(cluster=kmeans.predict(scaler.transform(batch[CLUSTER_FEATURES])))
+        batch.to_csv(CLUSTERED_CSV, index=False, mode='w' if first else 'a', header=first)
+        first = False
+        plot_sample = keep_smallest_keys(plot_sample, batch, max(1, PLOT_SAMPLE // best_k), rng, by='cluster')
+    print(f"✅ Clustered data saved to {CLUSTERED_CSV}")
+
+    plot_clusters(plot_sample.drop(columns='_key'))
 
 if __name__ == "__main__":
-    run_clustering()
+    parser = argparse.ArgumentParser(description="Cluster trades on leverage, sentiment and PnL")
+    parser.add_argument('--stream', action='store_true', help="chunked mini-batch clustering")
+    parser.add_argument('--k', type=int, nargs='+', default=[3],
+                        help="number of clusters; several values are fitted in parallel and the best kept")
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    if args.stream or len(args.k) > 1:
+        run_clustering_streaming(k_values=args.k, batch_size=args.batch_size, workers=args.workers)
+    else:
+        run_clustering(n_clusters=args.k[0])
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+import joblib
+
+# Array-backed forests. All trees of a fitted RandomForest are flattened
+# into a handful of contiguous .npy arrays (children, split feature,
+# threshold, leaf value) with global node ids, so a packed model loads via
+# np.load(mmap_mode='r') without unpickling any Python objects, and
+# predicts by walking every sample down every tree at once with numpy
+# fancy indexing. Leaves point to themselves, so the walk is a fixed
+# number of branch-free steps; the active set shrinks as paths finish.
+
+PACKED_ARRAYS = ['children', 'feature', 'threshold', 'value', 'roots']
+PREDICT_BATCH = 8192
+
+def packed_path(pickle_path):
+    return os.path.splitext(pickle_path)[0] + '.packed'
+
+def is_forest(model):
+    return hasattr(model, 'estimators_') and all(hasattr(tree, 'tree_') for tree in model.estimators_)
+
+def pack_forest(model):
+    is_classifier = hasattr(model, 'classes_')
+    children, feature, threshold, value, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left < 0
+        own = np.arange(tree.node_count) + offset
+        roots.append(offset)
+        children.append(np.column_stack([
+            np.where(leaf, own, tree.children_left + offset),
+            np.where(leaf, own, tree.children_right + offset),
+        ]))
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        if is_classifier:
+            counts = tree.value[:, 0, :]
+            value.append(counts / counts.sum(axis=1, keepdims=True))
+        else:
+            value.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        'children': np.concatenate(children).astype('int32').ravel(),
+        'feature': np.concatenate(feature).astype('int16'),
+        # sklearn compares float32 inputs against float64 thresholds; keep
+        # them exact so predictions match the original forest.
+        'threshold': np.concatenate(threshold).astype('float64'),
+        'value': np.concatenate(value).astype('float32'),
+        'roots': np.array(roots, dtype='int32'),
+    }
+    meta = {
+        'kind': 'classifier' if is_classifier else 'regressor',
+        'max_depth': int(max_depth),
+        'n_features': int(model.n_features_in_),
+        'feature_names': [str(name) for name in getattr(model, 'feature_names_in_', [])],
+        'classes': model.classes_.tolist() if is_classifier else None,
+    }
+    return arrays, meta
+
+def save_packed(model, path):
+    arrays, meta = pack_forest(model)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+    with open(os.path.join(path, 'meta.json'), 'w') as fh:
+        json.dump(meta, fh)
+    return path
+
+class CompactForest:
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.classes_ = np.array(meta['classes']) if meta['classes'] is not None else None
+        self.feature_names_in_ = np.array(meta['feature_names']) if meta['feature_names'] else None
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        with open(os.path.join(path, 'meta.json')) as fh:
+            meta = json.load(fh)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in PACKED_ARRAYS}
+        return cls(arrays, meta)
+
+    def to_matrix(self, X):
+        if self.feature_names_in_ is not None and hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)]
+        return np.asarray(X, dtype='float32')
+
+    def leaves(self, X):
+        # Node reached in every tree by every sample: shape (n_samples, n_trees).
+        a = self.arrays
+        children, feature, threshold = a['children'], a['feature'], a['threshold']
+        n_trees = len(a['roots'])
+        flat_x = X.ravel()
+        nodes = np.tile(a['roots'], len(X))
+        base = np.repeat(np.arange(len(X)) * X.shape[1], n_trees)
+        active = np.arange(len(nodes))
+        for depth in range(self.meta['max_depth']):
+            current = nodes[active]
+            go_right = flat_x[base[active] + feature[current]] > threshold[current]
+            following = children[2 * current + go_right]
+            nodes[active] = following
+            if depth % 4 == 3:
+                moved = following != current
+                active = active[moved]
+                if not len(active):
+                    break
+        return nodes.reshape(len(X), n_trees)
+
+    def predict_values(self, X):
+        X = self.to_matrix(X)
+        out = []
+        for start in range(0, len(X), PREDICT_BATCH):
+            leaves = self.leaves(X[start:start + PREDICT_BATCH])
+            out.append(self.arrays['value'][leaves].mean(axis=1))
+        if not out:
+            shape = (0, len(self.classes_)) if self.classes_ is not None else (0,)
+            return np.empty(shape, dtype='float32')
+        return np.concatenate(out)
+
+    def predict_proba(self, X):
+        return self.predict_values(X)
+
+    def predict(self, X):
+        values = self.predict_values(X)
+        if self.classes_ is None:
+            return values
+        return self.classes_[values.argmax(axis=1)]
+
+def load_model(pickle_path, mmap_mode='r', prefer_packed=True):
+    # Prefers the packed representation next to a pickle when it exists.
+    packed = packed_path(pickle_path)
+    if prefer_packed and os.path.isdir(packed):
+        return CompactForest.load(packed, mmap_mode=mmap_mode)
+    return joblib.load(pickle_path, mmap_mode=mmap_mode)
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def benchmark(pickle_path, X, repeats=3):
+    packed = packed_path(pickle_path)
+    results = {}
+    for label, loader, size in [
+        ('joblib', lambda: joblib.load(pickle_path), os.path.getsize(pickle_path)),
+        ('packed', lambda: CompactForest.load(packed), dir_size(packed)),
+    ]:
+        load_times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model = loader()
+            load_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        predictions = model.predict(X)
+        predict_seconds = time.perf_counter() - start
+        results[label] = {
+            'size_mb': size / 1e6,
+            'load_ms': min(load_times) * 1000,
+            'predictions_per_sec': len(X) / predict_seconds if predict_seconds > 0 else float('inf'),
+            'predictions': predictions,
+        }
+    same = np.allclose(results['joblib']['predictions'], results['packed']['predictions'], rtol=1e-4, atol=1e-4)
+    for stats in results.values():
+        stats.pop('predictions')
+    results['predictions_match'] = bool(same)
+    return results
+
+def pack_models(paths, sample=None):
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"❌ File not found: {path}")
+            continue
+        model = joblib.load(path)
+        if not is_forest(model):
+            print(f"⚠️ {path} is not a tree ensemble, leaving it as a pickle")
+            continue
+        save_packed(model, packed_path(path))
+        print(f"📦 Packed {path} -> {packed_path(path)}")
+        if sample is not None:
+            print(json.dumps({os.path.basename(path): benchmark(path, sample)}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack saved forests into mmap-able arrays")
+    parser.add_argument('--benchmark-rows', type=int, default=0,
+                        help="score this many merged rows with both formats and compare")
+    args = parser.parse_args()
+    from model import CLASSIFIER_PATH, REGRESSOR_PATH, MODEL_COLUMNS, MODEL_FEATURES, prepare_training_frame
+    sample = None
+    if args.benchmark_rows:
+        from store import load_merged
+        from features import compute_features
+        df = prepare_training_frame(compute_features(load_merged(columns=MODEL_COLUMNS)))
+        sample = df[MODEL_FEATURES].head(args.benchmark_rows)
+    pack_models([CLASSIFIER_PATH, REGRESSOR_PATH], sample=sample)
@@ -1,88 +1,235 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import numpy as np
 import seaborn as sns
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import os
+from concurrent.futures import ProcessPoolExecutor
+from store import load_merged, default_merged_path
+from utils import path_fingerprint, code_fingerprint
+from timeseries import reduce_series
+from accumulators import TradeStats
 
 # Ensure output folder exists
 os.makedirs("output", exist_ok=True)
 
-def load_data(path):
-    return pd.read_csv(path)
-
-def plot_trades_by_sentiment(df):
-    sns.countplot(data=df, x='classification', palette='coolwarm')
-    plt.title('📊 Trader Actions Across Market Sentiment')
-    plt.xlabel('Market Sentiment')
-    plt.ylabel('Number of Trades')
-    plt.tight_layout()
-    plt.savefig('output/sentiment_trade_count.png')
-    plt.clf()
-
-def plot_average_pnl_by_sentiment(df):
-    avg_pnl = df.groupby('classification')['Closed PnL'].mean().reset_index()
-    sns.barplot(data=avg_pnl, x='classification', y='Closed PnL', palette='viridis')
-    plt.title('💰 Average PnL by Market Sentiment')
-    plt.xlabel('Market Sentiment')
-    plt.ylabel('Average Closed PnL')
-    plt.tight_layout()
-    plt.savefig('output/average_pnl_by_sentiment.png')
-    plt.clf()
-
-def plot_leverage_distribution(df):
-    sns.boxplot(data=df, x='classification', y='Leverage', palette='pastel')
-    plt.title('📈 Leverage Distribution by Market Sentiment')
-    plt.xlabel('Market Sentiment')
-    plt.ylabel('Leverage')
-    plt.tight_layout()
-    plt.savefig('output/leverage_by_sentiment.png')
-    plt.clf()
-
-def plot_side_vs_sentiment(df):
-    sns.countplot(data=df, x='classification', hue='Side', palette='Set2')
-    plt.title('🟢 BUY vs 🔴 SELL under Different Market Sentiments')
-    plt.xlabel('Market Sentiment')
-    plt.ylabel('Trade Count')
-    plt.legend(title='Trade Side')
-    plt.tight_layout()
-    plt.savefig('output/trade_side_by_sentiment.png')
-    plt.clf()
-
-def plot_pnl_distribution_violin(df):
-    sns.violinplot(data=df, x='classification', y='Closed PnL', palette='muted', inner='quartile')
-    plt.title('🎻 Closed PnL Distribution by Sentiment')
-    plt.xlabel('Market Sentiment')
-    plt.ylabel('Closed PnL')
-    plt.tight_layout()
-    plt.savefig('output/pnl_violin_by_sentiment.png')
-    plt.clf()
-
-def plot_sentiment_over_time(df):
-    df_sorted = df.sort_values('datetime')
-    sns.lineplot(data=df_sorted, x='datetime', y='sentiment_score', color='orange')
-    plt.title('🕒 Sentiment Score Over Time')
-    plt.xlabel('Datetime')
-    plt.ylabel('Sentiment Score')
-    plt.xticks(rotation=30)
-    plt.tight_layout()
-    plt.savefig('output/sentiment_score_time.png')
-    plt.clf()
-
-def plot_correlation_heatmap(df):
-    numeric_df = df[['Closed PnL', 'Leverage', 'sentiment_score']].dropna()
-    corr = numeric_df.corr()
-    sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f")
-    plt.title('🔥 Correlation Between Numerical Features')
-    plt.tight_layout()
-    plt.savefig('output/correlation_heatmap.png')
-    plt.clf()
+EDA_COLUMNS = ['datetime', 'Side', 'Closed PnL', 'Leverage', 'sentiment_score', 'classification']
+MANIFEST_PATH = 'output/.eda_manifest.json'
+DENSITY_BINS = 100
+MAX_FLIERS = 200
+# A 640px-wide figure cannot show more than a couple of points per pixel.
+TIMELINE_POINTS = 1500
+
+def load_data(path=None, columns=EDA_COLUMNS):
+    return load_merged(path or default_merged_path(), columns=columns)
+
+# Aggregations: each plot is drawn from one of these small summaries, so
+# the workers rendering the plots never receive the trade-level frame.
+
+def sentiment_counts(df):
+    return df['classification'].value_counts(sort=False).rename('count').reset_index()
+
+def mean_pnl_by_sentiment(df):
+    return TradeStats().update(df).group_means()
+
+def box_stats(df, column, by='classification', max_fliers=MAX_FLIERS, seed=0):
+    # Quartiles, 1.5 IQR whiskers and a bounded sample of outliers per group,
+    # in the layout matplotlib's Axes.bxp expects.
+    stats = []
+    rng = np.random.default_rng(seed)
+    for name, values in df.groupby(by, observed=True)[column]:
+        values = values.dropna().to_numpy()
+        if not len(values):
+            continue
+        q1, med, q3 = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        fliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+        if len(fliers) > max_fliers:
+            fliers = rng.choice(fliers, max_fliers, replace=False)
+        stats.append({
+            'label': str(name), 'q1': q1, 'med': med, 'q3': q3,
+            'whislo': inside.min() if len(inside) else q1, 'whishi': inside.max() if len(inside) else q3,
+            'fliers': fliers,
+        })
+    return stats
+
+def side_counts(df):
+    return df.groupby(['classification', 'Side'], observed=True).size().rename('count').reset_index()
+
+def density_by_sentiment(df, column='Closed PnL', bins=DENSITY_BINS):
+    # Histogram densities on shared bins plus quartiles, enough to draw a
+    # violin without the raw values.
+    values = df[column].dropna()
+    if values.empty:
+        return {'edges': np.array([0.0, 1.0]), 'groups': []}
+    edges = np.linspace(values.min(), values.max(), bins + 1)
+    groups = []
+    for name, group in df.groupby('classification', observed=True)[column]:
+        group = group.dropna().to_numpy()
+        if len(group):
+            density, _ = np.histogram(group, bins=edges, density=True)
+            groups.append({'label': str(name), 'density': density,
+                           'quartiles': np.percentile(group, [25, 50, 75])})
+    return {'edges': edges, 'groups': groups}
+
+def sentiment_timeline(df):
+    return reduce_series(df, 'datetime', 'sentiment_score', n_out=TIMELINE_POINTS)
+
+def correlation_matrix(df):
+    return TradeStats(columns=['Closed PnL', 'Leverage', 'sentiment_score']).update(df).corr()
+
+# Renderers: each draws one summary on its own figure.
+
+def plot_trades_by_sentiment(counts, path='output/sentiment_trade_count.png'):
+    fig, ax = plt.subplots()
+    sns.barplot(data=counts, x='classification', y='count', hue='classification', palette='coolwarm', legend=False, ax=ax)
+    ax.set_title('📊 Trader Actions Across Market Sentiment')
+    ax.set_xlabel('Market Sentiment')
+    ax.set_ylabel('Number of Trades')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_average_pnl_by_sentiment(avg_pnl, path='output/average_pnl_by_sentiment.png'):
+    fig, ax = plt.subplots()
+    sns.barplot(data=avg_pnl, x='classification', y='Closed PnL', hue='classification', palette='viridis', legend=False, ax=ax)
+    ax.set_title('💰 Average PnL by Market Sentiment')
+    ax.set_xlabel('Market Sentiment')
+    ax.set_ylabel('Average Closed PnL')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_leverage_distribution(stats, path='output/leverage_by_sentiment.png'):
+    fig, ax = plt.subplots()
+    boxes = ax.bxp(stats, patch_artist=True, showfliers=True)
+    for patch, color in zip(boxes['boxes'], sns.color_palette('pastel', len(stats))):
+        patch.set_facecolor(color)
+    ax.set_title('📈 Leverage Distribution by Market Sentiment')
+    ax.set_xlabel('Market Sentiment')
+    ax.set_ylabel('Leverage')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_side_vs_sentiment(counts, path='output/trade_side_by_sentiment.png'):
+    fig, ax = plt.subplots()
+    sns.barplot(data=counts, x='classification', y='count', hue='Side', palette='Set2', ax=ax)
+    ax.set_title('🟢 BUY vs 🔴 SELL under Different Market Sentiments')
+    ax.set_xlabel('Market Sentiment')
+    ax.set_ylabel('Trade Count')
+    ax.legend(title='Trade Side')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_pnl_distribution_violin(density, path='output/pnl_violin_by_sentiment.png'):
+    fig, ax = plt.subplots()
+    edges = density['edges']
+    centers = (edges[:-1] + edges[1:]) / 2
+    groups = density['groups']
+    for i, (group, color) in enumerate(zip(groups, sns.color_palette('muted', len(groups)))):
+        peak = group['density'].max()
+        width = 0.4 * group['density'] / peak if peak > 0 else group['density']
+        ax.fill_betweenx(centers, i - width, i + width, color=color, alpha=0.8)
+        for q, style in zip(group['quartiles'], ['--', '-', '--']):
+            half = 0.4 * np.interp(q, centers, group['density']) / peak if peak > 0 else 0
+            ax.plot([i - half, i + half], [q, q], color='k', linestyle=style, linewidth=1)
+    ax.set_xticks(range(len(groups)), [group['label'] for group in groups])
+    ax.set_title('🎻 Closed PnL Distribution by Sentiment')
+    ax.set_xlabel('Market Sentiment')
+    ax.set_ylabel('Closed PnL')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_sentiment_over_time(series, path='output/sentiment_score_time.png'):
+    fig, ax = plt.subplots()
+    ax.plot(series['datetime'], series['sentiment_score'], color='orange')
+    ax.set_title('🕒 Sentiment Score Over Time')
+    ax.set_xlabel('Datetime')
+    ax.set_ylabel('Sentiment Score')
+    ax.tick_params(axis='x', rotation=30)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_correlation_heatmap(corr, path='output/correlation_heatmap.png'):
+    fig, ax = plt.subplots()
+    sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f", ax=ax)
+    ax.set_title('🔥 Correlation Between Numerical Features')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+# name -> (aggregation, renderer, output path)
+PLOTS = {
+    'sentiment_trade_count': (sentiment_counts, plot_trades_by_sentiment, 'output/sentiment_trade_count.png'),
+    'average_pnl_by_sentiment': (mean_pnl_by_sentiment, plot_average_pnl_by_sentiment, 'output/average_pnl_by_sentiment.png'),
+    'leverage_by_sentiment': (lambda df: box_stats(df, 'Leverage'), plot_leverage_distribution, 'output/leverage_by_sentiment.png'),
+    'trade_side_by_sentiment': (side_counts, plot_side_vs_sentiment, 'output/trade_side_by_sentiment.png'),
+    'pnl_violin_by_sentiment': (density_by_sentiment, plot_pnl_distribution_violin, 'output/pnl_violin_by_sentiment.png'),
+    'sentiment_score_time': (sentiment_timeline, plot_sentiment_over_time, 'output/sentiment_score_time.png'),
+    'correlation_heatmap': (correlation_matrix, plot_correlation_heatmap, 'output/correlation_heatmap.png'),
+}
+
+def plot_fingerprint(name, data_fingerprint, code=None):
+    # Changes when the input data, the output path or the code changes:
+    # this module and every local module it imports (loading, schema,
+    # downsampling, accumulators), since any of them can change a plot.
+    path = PLOTS[name][2]
+    code = code or code_fingerprint('eda')
+    return hashlib.sha1(f'{data_fingerprint}:{name}:{path}:{code}'.encode()).hexdigest()[:16]
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    with open(path, 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+def render_plot(name, summary):
+    _, render, path = PLOTS[name]
+    render(summary, path)
+    return name
+
+def run_eda(data_path=None, force=False, workers=None, df=None):
+    # `df`: merged rows already in memory (e.g. from the pipeline), used
+    # instead of reading data_path again.
+    data_path = data_path or default_merged_path()
+    if not os.path.exists(data_path):
+        print(f"❌ File not found: {data_path}")
+        return
+    data_fingerprint = path_fingerprint(data_path)
+    manifest = {} if force else load_manifest()
+    code = code_fingerprint('eda')
+    fingerprints = {name: plot_fingerprint(name, data_fingerprint, code) for name in PLOTS}
+    stale = [name for name in PLOTS
+             if manifest.get(name) != fingerprints[name] or not os.path.exists(PLOTS[name][2])]
+    if not stale:
+        print("✅ All EDA plots are up to date")
+        return
+
+    df = load_data(data_path) if df is None else df[EDA_COLUMNS]
+    summaries = {name: PLOTS[name][0](df) for name in stale}
+    del df
+    with ProcessPoolExecutor(max_workers=min(len(stale), workers or os.cpu_count() or 1)) as pool:
+        for name in pool.map(render_plot, stale, [summaries[name] for name in stale]):
+            manifest[name] = fingerprints[name]
+            print(f"🖼️ Rendered {PLOTS[name][2]}")
+    save_manifest(manifest)
+    print(f"✅ {len(stale)} EDA plots saved to /output folder, {len(PLOTS) - len(stale)} already up to date")
 
 if __name__ == "__main__":
-    df = load_data('data/merged_data.csv')
-    plot_trades_by_sentiment(df)
-    plot_average_pnl_by_sentiment(df)
-    plot_leverage_distribution(df)
-    plot_side_vs_sentiment(df)
-    plot_pnl_distribution_violin(df)
-    plot_sentiment_over_time(df)
-    plot_correlation_heatmap(df)
-    print("✅ All EDA plots saved to /output folder")
+    parser = argparse.ArgumentParser(description="Render the EDA plots, skipping those already up to date")
+    parser.add_argument('--force', action='store_true', help="re-render every plot")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    run_eda(force=args.force, workers=args.workers)
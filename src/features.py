@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Per-account rolling features. Trades are laid out sorted by
+# (Account, datetime); each window is resolved for every row at once with a
+# binary search over a combined (account, time) key, and window sums come
+# from differences of prefix sums, so there is no Python loop per account.
+# Windows only look at earlier trades of the same account: the current
+# trade's own PnL never leaks into its features.
+
+DEFAULT_WINDOWS = ('1h', '24h', '7D')
+FEATURE_INPUTS = ['Account', 'datetime', 'Closed PnL', 'Size USD', 'sentiment_score']
+
+def feature_columns(windows=DEFAULT_WINDOWS):
+    columns = []
+    for window in windows:
+        columns += [f'pnl_{window}', f'trades_{window}', f'exposure_{window}']
+    return columns + ['sentiment_delta', 'secs_since_prev']
+
+def sort_for_features(df):
+    df = df.dropna(subset=['Account', 'datetime'])
+    return df.sort_values(['Account', 'datetime'], kind='mergesort', ignore_index=True)
+
+def account_codes(accounts):
+    # Dense, non-decreasing ids for an account-sorted column.
+    changed = accounts.ne(accounts.shift()).to_numpy()
+    return np.cumsum(changed) - 1
+
+def prefix_sum(values):
+    return np.concatenate([[0.0], np.cumsum(np.nan_to_num(values.astype('float64')))])
+
+def compute_features(df, windows=DEFAULT_WINDOWS, presorted=False):
+    if not presorted:
+        df = sort_for_features(df)
+    if df.empty:
+        return df.assign(**{col: pd.Series(dtype='float64') for col in feature_columns(windows)})
+    codes = account_codes(df['Account'])
+    seconds = df['datetime'].to_numpy('datetime64[s]').astype('int64')
+    rows = np.arange(len(df))
+    features = {}
+
+    offsets = seconds - seconds.min()
+    longest = max(int(pd.Timedelta(w).total_seconds()) for w in windows)
+    key = codes * (int(offsets.max()) + longest + 1) + offsets
+    pnl_sums = prefix_sum(df['Closed PnL'].to_numpy())
+    size_sums = prefix_sum(df['Size USD'].to_numpy())
+
+    for window in windows:
+        width = int(pd.Timedelta(window).total_seconds())
+        # First earlier trade of the same account strictly inside the window.
+        start = np.minimum(np.searchsorted(key, key - width, side='right'), rows)
+        features[f'pnl_{window}'] = pnl_sums[rows] - pnl_sums[start]
+        features[f'trades_{window}'] = (rows - start).astype('int32')
+        features[f'exposure_{window}'] = (size_sums[rows] - size_sums[start]).astype('float32')
+
+    same_account = np.zeros(len(df), dtype=bool)
+    same_account[1:] = codes[1:] == codes[:-1]
+    sentiment = df['sentiment_score'].to_numpy('float64')
+    previous_sentiment = np.roll(sentiment, 1)
+    previous_seconds = np.roll(seconds, 1)
+    features['sentiment_delta'] = np.where(same_account, sentiment - previous_sentiment, np.nan).astype('float32')
+    features['secs_since_prev'] = np.where(same_account, seconds - previous_seconds, np.nan).astype('float32')
+
+    return df.assign(**features)
+
+def history_tail(df, windows=DEFAULT_WINDOWS):
+    # The rows later trades can still see: everything inside the longest
+    # window of the newest trade, plus each account's latest trade.
+    # df must be in compute_features order.
+    if df.empty:
+        return df.loc[:, FEATURE_INPUTS]
+    longest = max(pd.Timedelta(w) for w in windows)
+    recent = df['datetime'] > df['datetime'].max() - longest
+    latest = ~df['Account'].duplicated(keep='last')
+    return df.loc[recent | latest, FEATURE_INPUTS].reset_index(drop=True)
+
+def build_history_tail(batches, windows=DEFAULT_WINDOWS):
+    # history_tail of earlier trades given in time-ordered batches, without
+    # computing their features: seeds update_features for later trades.
+    tail = None
+    for batch in batches:
+        combined = batch.loc[:, FEATURE_INPUTS]
+        if tail is not None:
+            combined = pd.concat([tail, combined], ignore_index=True)
+        combined['Account'] = combined['Account'].astype('category')
+        tail = history_tail(sort_for_features(combined), windows)
+    return tail
+
+def update_features(new_trades, tail=None, windows=DEFAULT_WINDOWS):
+    # Computes features for new_trades given the tail kept from earlier
+    # updates; returns (features for the new trades, tail for the next call).
+    # Columns besides FEATURE_INPUTS are passed through for the new trades.
+    dtypes = new_trades.dtypes.to_dict()
+    new_trades = new_trades.assign(_new=True)
+    if tail is not None and len(tail):
+        combined = pd.concat([tail.assign(_new=False), new_trades], ignore_index=True)
+    else:
+        combined = new_trades
+    combined['Account'] = combined['Account'].astype('category')
+    featured = compute_features(combined, windows)
+    fresh = featured.loc[featured['_new']].drop(columns='_new').reset_index(drop=True)
+    return fresh.astype(dtypes), history_tail(featured, windows)
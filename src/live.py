@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+import pandas as pd
+from preprocess import (TRADES_PATH, SENTIMENT_PATH, TRADE_USECOLS, TRADE_DTYPES,
+                        clean_trades, attach_sentiment, load_and_clean_sentiment, stored_scheme)
+from accumulators import TradeStats
+
+# Live tail of new trades. Producers (a growing trades CSV and/or a local
+# TCP socket fed with CSV lines) push complete lines onto one queue; the
+# consumer drains it in micro-batches, applies the preprocess cleaning and
+# sentiment join, folds the batch into per-step TradeStats buckets and
+# rewrites a small JSON state file. The dashboard polls that file, so KPIs
+# and period-over-period changes update without touching the history.
+
+LIVE_STATE_PATH = 'data/live_state.json'
+DEFAULT_PERIOD = '1h'
+WINDOW_STEPS = 60
+POLL_SECONDS = 0.1
+WRITE_SECONDS = 0.25
+MAX_BATCH_ROWS = 50_000
+MAX_BATCH_WAIT = 0.05
+# An idle tailer still rewrites its state this often, well inside the
+# dashboard's max_age, so it is not taken for a stopped one.
+HEARTBEAT_SECONDS = 10.0
+READ_BYTES = 1 << 20
+
+class LiveKPIs:
+    # Rolling windows over trade time: the last `period` up to the newest
+    # trade versus the `period` before it, each merged from fixed buckets
+    # of period / steps, so an update never rescans earlier trades.
+    def __init__(self, period=DEFAULT_PERIOD, steps=WINDOW_STEPS):
+        self.label = str(period)
+        self.period = pd.Timedelta(period)
+        self.step = self.period / steps
+        self.buckets = {}
+        self.total = TradeStats()
+        self.rows = 0
+        self.latest = None
+
+    def update(self, merged):
+        merged = merged.dropna(subset=['datetime'])
+        if merged.empty:
+            return
+        self.total.update(merged)
+        self.rows += len(merged)
+        newest = merged['datetime'].max()
+        self.latest = newest if self.latest is None else max(self.latest, newest)
+        # Only the last two periods are kept in buckets.
+        oldest = (self.latest - 2 * self.period).floor(self.step)
+        recent = merged[merged['datetime'] >= oldest]
+        for bucket, group in recent.groupby(recent['datetime'].dt.floor(self.step), sort=False):
+            self.buckets.setdefault(bucket, TradeStats()).update(group)
+        for bucket in [bucket for bucket in self.buckets if bucket < oldest]:
+            del self.buckets[bucket]
+
+    def window(self, end):
+        stats = TradeStats()
+        for bucket, part in self.buckets.items():
+            if end - self.period < bucket <= end:
+                stats.merge(part)
+        return stats
+
+    def state(self):
+        if self.latest is None:
+            return {'rows': 0}
+        current = self.window(self.latest).metrics()
+        previous = self.window(self.latest - self.period).metrics()
+        changes = {}
+        for key in ('active_traders', 'avg_pnl', 'win_rate', 'total_pnl'):
+            before = previous[key]
+            changes[key] = (current[key] - before) / abs(before) * 100 if before else None
+        return {
+            'rows': self.rows,
+            'period': self.label,
+            'latest_trade': self.latest.isoformat(),
+            'current': current,
+            'previous': previous,
+            'changes': changes,
+            'total': self.total.metrics(),
+        }
+
+def write_state(state, path=LIVE_STATE_PATH):
+    state = dict(state, updated=time.time())
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(state, fh, default=float)
+    os.replace(tmp, path)
+
+def load_live_state(path=LIVE_STATE_PATH, max_age=60.0):
+    # The tailer's latest state, or None when it is not running.
+    try:
+        with open(path) as fh:
+            state = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if time.time() - state.get('updated', 0) > max_age:
+        return None
+    return state
+
+def parse_lines(header, lines):
+    df = pd.read_csv(io.StringIO(header + ''.join(lines)), usecols=lambda col: col in TRADE_USECOLS,
+                     dtype=TRADE_DTYPES)
+    return clean_trades(df)
+
+def read_header(path):
+    with open(path, 'rb') as fh:
+        return fh.readline()
+
+async def follow_file(path, queue, from_start=False, poll=POLL_SECONDS, block_size=READ_BYTES):
+    # tail -f: only complete lines are queued, read in blocks of at most
+    # block_size bytes so a replay from the start stays bounded; a
+    # truncated or replaced file is followed again from its first row,
+    # with its own header.
+    header = b''
+    while not header.endswith(b'\n'):
+        if os.path.exists(path):
+            header = read_header(path)
+        if not header.endswith(b'\n'):
+            await asyncio.sleep(poll)
+    offset = len(header) if from_start else os.path.getsize(path)
+    identity = os.stat(path).st_ino
+    partial = b''
+    while True:
+        data = b''
+        try:
+            # Identity, size and data come from one open file, so a
+            # rotation between the checks cannot mix two files.
+            with open(path, 'rb') as fh:
+                stat = os.fstat(fh.fileno())
+                if stat.st_ino != identity or stat.st_size < offset:
+                    new_header = fh.readline()
+                    # A new file is only followed once its header is complete.
+                    if new_header.endswith(b'\n'):
+                        header, identity, offset, partial = new_header, stat.st_ino, len(new_header), b''
+                if stat.st_ino == identity and stat.st_size > offset:
+                    fh.seek(offset)
+                    data = fh.read(block_size)
+        except FileNotFoundError:  # between a rotation's rename and create
+            pass
+        offset += len(data)
+        complete, _, partial = (partial + data).rpartition(b'\n')
+        if complete:
+            await queue.put((header.decode(), (complete + b'\n').decode().splitlines(keepends=True)))
+        # A full block means the file is ahead of us: keep reading without
+        # a pause.
+        await asyncio.sleep(0 if len(data) == block_size else poll)
+
+async def serve_socket(host, port, queue):
+    # Each connection sends a CSV header line followed by trade rows.
+    async def handle(reader, writer):
+        header = (await reader.readline()).decode()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            await queue.put((header, [line.decode()]))
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"🔌 Accepting trades on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+class SentimentSource:
+    # Fear/greed index reloaded whenever the file changes.
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.df = None
+
+    def get(self):
+        mtime = os.path.getmtime(self.path)
+        if mtime != self.mtime:
+            self.df = load_and_clean_sentiment(self.path).sort_values('datetime')
+            self.mtime = mtime
+        return self.df
+
+def process_batch(pending, sentiment, kpis):
+    frames = []
+    for header in dict.fromkeys(header for header, _ in pending):
+        lines = [line for batch_header, batch in pending if batch_header == header for line in batch]
+        frames.append(parse_lines(header, lines))
+    # Live trades are banded like the stored ones.
+    merged = attach_sentiment(pd.concat(frames, ignore_index=True), sentiment.get(), stored_scheme())
+    kpis.update(merged)
+    return len(merged)
+
+async def consume(queue, kpis, sentiment, state_path, max_rows=MAX_BATCH_ROWS, max_wait=MAX_BATCH_WAIT,
+                  heartbeat=HEARTBEAT_SECONDS):
+    write_state(kpis.state(), state_path)
+    written = time.monotonic()
+    while True:
+        try:
+            pending = [await asyncio.wait_for(queue.get(), timeout=heartbeat)]
+        except asyncio.TimeoutError:
+            # No new trades: the same KPIs are written again with a fresh
+            # timestamp, which is the tailer's heartbeat.
+            write_state(kpis.state(), state_path)
+            written = time.monotonic()
+            continue
+        rows = len(pending[0][1])
+        deadline = time.monotonic() + max_wait
+        while rows < max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            rows += len(item[1])
+        started = time.perf_counter()
+        try:
+            # Parsing and the join run off the event loop, so the producers
+            # keep reading while a batch is processed.
+            count = await asyncio.to_thread(process_batch, pending, sentiment, kpis)
+        except (ValueError, KeyError) as exc:
+            print(f"⚠️ Skipped a malformed batch: {exc}")
+            continue
+        if time.monotonic() - written >= WRITE_SECONDS or queue.empty():
+            state = kpis.state()
+            state['batch_ms'] = (time.perf_counter() - started) * 1000
+            write_state(state, state_path)
+            written = time.monotonic()
+            print(f"⚡ +{count:,} trades, {kpis.rows:,} since start")
+
+async def run_live(trades_path=TRADES_PATH, sentiment_path=SENTIMENT_PATH, listen=None, from_start=False,
+                   period=DEFAULT_PERIOD, state_path=LIVE_STATE_PATH):
+    queue = asyncio.Queue(maxsize=10_000)
+    kpis = LiveKPIs(period)
+    tasks = [consume(queue, kpis, SentimentSource(sentiment_path), state_path)]
+    if trades_path:
+        tasks.append(follow_file(trades_path, queue, from_start))
+        print(f"👀 Following {trades_path}")
+    if listen:
+        host, port = listen.rsplit(':', 1)
+        tasks.append(serve_socket(host, int(port), queue))
+    await asyncio.gather(*tasks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tail new trades and keep live dashboard KPIs")
+    parser.add_argument('--trades', default=TRADES_PATH, help="growing trades CSV to follow ('' to disable)")
+    parser.add_argument('--listen', default=None, help="also accept CSV lines on host:port")
+    parser.add_argument('--from-start', action='store_true', help="replay the existing rows first")
+    parser.add_argument('--period', default=DEFAULT_PERIOD, help="length of the period-over-period windows")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_live(args.trades, listen=args.listen, from_start=args.from_start, period=args.period))
+    except KeyboardInterrupt:
+        pass
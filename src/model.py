@@ -1,40 +1,199 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import SGDClassifier, SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, mean_squared_error
 import joblib
-import os
+import shutil
+from store import load_merged, iter_merged_by_time, default_merged_path
+from features import FEATURE_INPUTS, compute_features, feature_columns, update_features, build_history_tail
+from compact import is_forest, packed_path, save_packed
 
-def run_models(data_path='data/merged_data.csv'):
-    if not os.path.exists(data_path):
-        print(f"❌ File not found: {data_path}")
-        return
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
-    df = pd.read_csv(data_path).dropna()
+MODEL_FEATURES = ['sentiment_score', 'Leverage'] + feature_columns()
+MODEL_COLUMNS = list(dict.fromkeys(FEATURE_INPUTS + ['Leverage', 'classification', 'label']))
+CLASSIFIER_PATH = 'models/sentiment_classifier.pkl'
+REGRESSOR_PATH = 'models/pnl_regressor.pkl'
+# Streaming mode trains scaled SGD pipelines, kept apart from the forests.
+STREAM_CLASSIFIER_PATH = 'models/sentiment_classifier_sgd.pkl'
+STREAM_REGRESSOR_PATH = 'models/pnl_regressor_sgd.pkl'
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+# Bounded trees keep the saved forests (and their packed arrays) small.
+FOREST_PARAMS = {'n_estimators': 100, 'max_depth': 16, 'min_samples_leaf': 5}
 
-    df['label'] = df['classification'].map({'Fear': 0, 'Neutral': 1, 'Greed': 2})
-    X_cls = df[['sentiment_score', 'Leverage']]
-    y_cls = df['label']
+def peak_memory_mb(children=False):
+    # Peak RSS of this process, or with children=True of its largest
+    # finished child process (e.g. a pool worker).
+    if resource is None:
+        return float('nan')
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss / 1024
 
-    X_reg = df[['sentiment_score', 'Leverage']]
-    y_reg = df['Closed PnL']
+def prepare_training_frame(df):
+    df = df.fillna({col: 0 for col in feature_columns()})
+    df = df.dropna(subset=['sentiment_score', 'Leverage', 'Closed PnL'])
+    return df[df['label'] >= 0]
 
-    Xc_train, Xc_test, yc_train, yc_test = train_test_split(X_cls, y_cls, test_size=0.2, random_state=42)
-    Xr_train, Xr_test, yr_train, yr_test = train_test_split(X_reg, y_reg, test_size=0.2, random_state=42)
+def holdout_mask(n_rows, batch_number, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    # One deterministic train/test assignment per batch, shared by the
+    # classifier and the regressor and reproduced on every pass.
+    rng = np.random.default_rng([random_state, batch_number])
+    return rng.random(n_rows) < test_size
 
-    clf = RandomForestClassifier().fit(Xc_train, yc_train)
-    acc = accuracy_score(yc_test, clf.predict(Xc_test))
+def split_cores(n_fits):
+    # Fits that run at the same time share the cores instead of each
+    # starting one job per core.
+    cores = os.cpu_count() or 1
+    return [max(1, cores // n_fits + (i < cores % n_fits)) for i in range(n_fits)]
 
-    reg = RandomForestRegressor().fit(Xr_train, yr_train)
-    mse = mean_squared_error(yr_test, reg.predict(Xr_test))
+def fit_concurrently(*jobs):
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [pool.submit(fn, *args) for fn, *args in jobs]
+        return [future.result() for future in futures]
 
+def save_models(clf, reg, paths=(CLASSIFIER_PATH, REGRESSOR_PATH)):
+    # Forests are also written in packed form for fast cold loads; a stale
+    # packed copy is removed when the new model is not a forest.
     os.makedirs("models", exist_ok=True)
-    joblib.dump(clf, 'models/sentiment_classifier.pkl')
-    joblib.dump(reg, 'models/pnl_regressor.pkl')
+    for model, path in zip((clf, reg), paths):
+        joblib.dump(model, path)
+        if is_forest(model):
+            save_packed(model, packed_path(path))
+        elif os.path.isdir(packed_path(path)):
+            shutil.rmtree(packed_path(path))
+
+def run_models(data_path=None, df=None):
+    data_path = data_path or default_merged_path()
+    if not os.path.exists(data_path):
+        print(f"❌ File not found: {data_path}")
+        return
+
+    df = load_merged(data_path, columns=MODEL_COLUMNS) if df is None else df[MODEL_COLUMNS]
+    df = prepare_training_frame(compute_features(df))
+
+    X = df[MODEL_FEATURES]
+    train_idx, test_idx = train_test_split(np.arange(len(df)), test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+    yc, yr = df['label'], df['Closed PnL']
+
+    clf_jobs, reg_jobs = split_cores(2)
+    start = time.perf_counter()
+    clf, reg = fit_concurrently(
+        (RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=clf_jobs, **FOREST_PARAMS).fit,
+         X_train, yc.iloc[train_idx]),
+        (RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=reg_jobs, **FOREST_PARAMS).fit,
+         X_train, yr.iloc[train_idx]),
+    )
+    fit_seconds = time.perf_counter() - start
+    acc = accuracy_score(yc.iloc[test_idx], clf.predict(X_test))
+    mse = mean_squared_error(yr.iloc[test_idx], reg.predict(X_test))
+
+    save_models(clf, reg)
 
     print(f"✅ Classification Accuracy: {acc:.2f}")
     print(f"✅ Regression MSE: {mse:.2f}")
+    print(f"⏱️ Fit time: {fit_seconds:.1f}s, peak memory: {peak_memory_mb():,.0f} MB")
     print("✅ Models saved to 'models/'")
 
+def iter_training_batches(data_path, since=None, batch_size=None):
+    # Batches with rolling features, carried across batch boundaries by the
+    # per-account history tail. Batches come in trade time order across
+    # coins, so the features match compute_features whatever the batch
+    # size. With `since`, the tail starts from the stored trades before
+    # that day.
+    kwargs = {'batch_size': batch_size} if batch_size else {}
+    tail = None
+    if since is not None:
+        before = pd.Timestamp(since).floor('D') - pd.Timedelta(days=1)
+        tail = build_history_tail(iter_merged_by_time(data_path, columns=FEATURE_INPUTS, end=before, **kwargs))
+    batches = iter_merged_by_time(data_path, columns=MODEL_COLUMNS, start=since, **kwargs)
+    for batch_number, batch in enumerate(batches):
+        featured, tail = update_features(batch, tail)
+        featured = prepare_training_frame(featured)
+        if len(featured):
+            yield batch_number, featured
+
+def run_models_streaming(data_path=None, since=None, batch_size=None):
+    # Out-of-core training: scaler, classifier and regressor are updated
+    # batch by batch with partial_fit, so memory is bounded by the batch
+    # size. With `since`, the saved models are loaded and only trained
+    # further on rows from that date onwards.
+    data_path = data_path or default_merged_path()
+    if not os.path.exists(data_path):
+        print(f"❌ File not found: {data_path}")
+        return
+
+    if since is not None and os.path.exists(STREAM_CLASSIFIER_PATH) and os.path.exists(STREAM_REGRESSOR_PATH):
+        clf_pipe, reg_pipe = joblib.load(STREAM_CLASSIFIER_PATH), joblib.load(STREAM_REGRESSOR_PATH)
+        scaler, clf, reg = clf_pipe.named_steps['scale'], clf_pipe.named_steps['model'], reg_pipe.named_steps['model']
+    else:
+        since = None
+        scaler = StandardScaler()
+        clf = SGDClassifier(loss='log_loss', random_state=RANDOM_STATE)
+        reg = SGDRegressor(random_state=RANDOM_STATE)
+
+    # Only the partial_fit calls are timed, not reading or features.
+    fit_seconds = 0.0
+    rows = 0
+    for batch_number, df in iter_training_batches(data_path, since, batch_size):
+        train = ~holdout_mask(len(df), batch_number)
+        if not train.any():
+            continue
+        # partial_fit needs every class up front: take them from the scheme.
+        classes = np.arange(len(df['classification'].cat.categories))
+        start = time.perf_counter()
+        scaler.partial_fit(df.loc[train, MODEL_FEATURES])
+        X_train = scaler.transform(df.loc[train, MODEL_FEATURES])
+        fit_concurrently(
+            (clf.partial_fit, X_train, df.loc[train, 'label'], classes),
+            (reg.partial_fit, X_train, df.loc[train, 'Closed PnL']),
+        )
+        fit_seconds += time.perf_counter() - start
+        rows += int(train.sum())
+    if rows == 0:
+        print("❌ No training rows found")
+        return
+
+    # Second pass over the same batches scores only the held-out rows.
+    correct = total = 0
+    squared_error = 0.0
+    for batch_number, df in iter_training_batches(data_path, since, batch_size):
+        test = holdout_mask(len(df), batch_number)
+        if not test.any():
+            continue
+        X_test = scaler.transform(df.loc[test, MODEL_FEATURES])
+        correct += int((clf.predict(X_test) == df.loc[test, 'label'].to_numpy()).sum())
+        squared_error += float(((reg.predict(X_test) - df.loc[test, 'Closed PnL'].to_numpy()) ** 2).sum())
+        total += int(test.sum())
+
+    save_models(Pipeline([('scale', scaler), ('model', clf)]), Pipeline([('scale', scaler), ('model', reg)]),
+                (STREAM_CLASSIFIER_PATH, STREAM_REGRESSOR_PATH))
+
+    print(f"✅ Trained on {rows:,} rows in {fit_seconds:.1f}s, peak memory: {peak_memory_mb():,.0f} MB")
+    if total:
+        print(f"✅ Classification Accuracy: {correct / total:.2f}")
+        print(f"✅ Regression MSE: {squared_error / total:.2f}")
+    print(f"✅ Models saved to {STREAM_CLASSIFIER_PATH} and {STREAM_REGRESSOR_PATH}")
+
 if __name__ == "__main__":
-    run_models()
+    parser = argparse.ArgumentParser(description="Train the sentiment classifier and PnL regressor")
+    parser.add_argument('--stream', action='store_true', help="train out-of-core in batches with partial_fit")
+    parser.add_argument('--since', default=None, help="continue training saved streaming models on rows from this date")
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+    if args.stream or args.since:
+        run_models_streaming(since=args.since, batch_size=args.batch_size)
+    else:
+        run_models()
@@ -0,0 +1,206 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from store import load_merged, default_merged_path, has_arrow, write_snapshot, load_snapshot
+from utils import path_fingerprint, code_fingerprint
+from preprocess import TRADES_PATH, SENTIMENT_PATH, STATE_PATH, run_incremental
+from eda import EDA_COLUMNS, PLOTS, run_eda
+from model import MODEL_COLUMNS, CLASSIFIER_PATH, REGRESSOR_PATH, run_models
+from cluster import CLUSTER_COLUMNS, CLUSTERED_CSV, run_clustering
+from sweep import SWEEP_COLUMNS, SWEEP_RESULTS, SWEEP_HEATMAP, run_sweep
+
+# One entry point for the whole batch workflow, as a DAG:
+#
+#   preprocess -> eda, model, cluster, sweep
+#
+# A stage is skipped when its fingerprint (input files and the source of
+# its module and every local module it imports) matches the manifest and
+# its outputs exist; inputs are fingerprinted only once the upstream
+# stages finished. Stale stages run concurrently, each in a fresh spawned
+# process: pyplot is not thread-safe, and eda and cluster start process
+# pools of their own, which must not fork while another stage's threads
+# are running. The merged store is read once, into an Arrow snapshot of
+# the columns the stale stages need, which every stage memory-maps.
+
+PIPELINE_MANIFEST = 'data/.pipeline_manifest.json'
+PIPELINE_SNAPSHOT = 'data/.pipeline_input.arrow'
+
+class Stage:
+    def __init__(self, name, run, module, deps=(), inputs=(), outputs=(), columns=None):
+        self.name = name
+        self.run = run
+        # The module the stage runs; its fingerprint covers what it imports.
+        self.module = module
+        self.deps = list(deps)
+        # Callables, so paths such as the merged store resolve at run time.
+        self.inputs = inputs
+        self.outputs = outputs
+        self.columns = columns
+
+def merged_inputs():
+    return [default_merged_path()]
+
+STAGES = [
+    Stage('preprocess', lambda df: run_incremental(), 'preprocess',
+          inputs=lambda: [TRADES_PATH, SENTIMENT_PATH],
+          outputs=lambda: [STATE_PATH, default_merged_path()]),
+    Stage('eda', lambda df: run_eda(df=df), 'eda', deps=['preprocess'], inputs=merged_inputs,
+          outputs=lambda: [path for _, _, path in PLOTS.values()], columns=EDA_COLUMNS),
+    Stage('model', lambda df: run_models(df=df), 'model', deps=['preprocess'], inputs=merged_inputs,
+          outputs=lambda: [CLASSIFIER_PATH, REGRESSOR_PATH], columns=MODEL_COLUMNS),
+    Stage('cluster', lambda df: run_clustering(df=df), 'cluster', deps=['preprocess'], inputs=merged_inputs,
+          outputs=lambda: [CLUSTERED_CSV, 'output/clustering_plot.png'], columns=CLUSTER_COLUMNS),
+    Stage('sweep', lambda df: run_sweep(df=df), 'sweep', deps=['preprocess'], inputs=merged_inputs,
+          outputs=lambda: [SWEEP_RESULTS, SWEEP_HEATMAP], columns=SWEEP_COLUMNS),
+]
+
+def stage_fingerprint(stage):
+    inputs = [path_fingerprint(path) for path in stage.inputs()]
+    return path_fingerprint(os.devnull, stage.name, inputs, code_fingerprint(stage.module))
+
+def load_manifest(path=PIPELINE_MANIFEST):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+def save_manifest(manifest, path=PIPELINE_MANIFEST):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def run_stage(name, snapshot=None):
+    # Runs in a worker process; stages are looked up by name since their
+    # callables do not pickle. snapshot is the shared Arrow file, when
+    # there is one.
+    stage = {stage.name: stage for stage in STAGES}[name]
+    start = time.perf_counter()
+    df = None
+    if stage.columns:
+        if snapshot:
+            df = load_snapshot(snapshot, stage.columns)
+        else:
+            df = load_merged(default_merged_path(), columns=stage.columns)
+        print(f"📥 {name}: loaded {len(df):,} merged rows in {time.perf_counter() - start:.1f}s")
+    stage.run(df)
+    return time.perf_counter() - start
+
+def select_stages(names=None):
+    # The named stages plus everything upstream of them, in STAGES order.
+    by_name = {stage.name: stage for stage in STAGES}
+    unknown = set(names or ()) - set(by_name)
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(sorted(unknown))}")
+    selected = set(names or by_name)
+    frontier = list(selected)
+    while frontier:
+        for dep in by_name[frontier.pop()].deps:
+            if dep not in selected:
+                selected.add(dep)
+                frontier.append(dep)
+    return [stage for stage in STAGES if stage.name in selected]
+
+def write_stage_snapshot(stages, path=PIPELINE_SNAPSHOT):
+    # One read of the store for every stage that loads it: the union of
+    # their columns, written once for all of them to memory-map. Returns
+    # the snapshot path and its columns, or (None, []) without pyarrow.
+    columns = list(dict.fromkeys(column for stage in stages for column in stage.columns or ()))
+    if not columns or not has_arrow() or not os.path.exists(default_merged_path()):
+        return None, []
+    start = time.perf_counter()
+    snapshot = write_snapshot(path, columns)
+    if snapshot:
+        print(f"📦 Read the merged store once for {len(stages)} stages in {time.perf_counter() - start:.1f}s")
+    return snapshot, columns
+
+def run_pipeline(stages=None, force=False, dry_run=False, workers=None):
+    pending = select_stages(stages)
+    manifest = {} if force else load_manifest()
+    status = {}
+    snapshot, snapshot_columns = None, None
+
+    def is_fresh(stage):
+        return (manifest.get(stage.name) == stage_fingerprint(stage)
+                and all(os.path.exists(path) for path in stage.outputs()))
+
+    def finish(stage, future):
+        seconds = future.result()
+        if not all(os.path.exists(path) for path in stage.outputs()):
+            raise RuntimeError("finished without writing its outputs")
+        manifest[stage.name] = stage_fingerprint(stage)
+        save_manifest(manifest)
+        return seconds
+
+    start = time.perf_counter()
+    # A fresh process per stage, so one stage's plotting or pool state
+    # never leaks into the next.
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=workers or len(pending), mp_context=context,
+                                 max_tasks_per_child=1) as pool:
+            running = {}
+            while pending or running:
+                stale = []
+                for stage in list(pending):
+                    deps = [status.get(dep) for dep in stage.deps]
+                    if any(state in ('failed', 'blocked') for state in deps):
+                        status[stage.name] = 'blocked'
+                        print(f"⏭️ {stage.name}: skipped, an upstream stage failed")
+                    elif all(state in ('fresh', 'done', 'stale') for state in deps):
+                        if is_fresh(stage):
+                            status[stage.name] = 'fresh'
+                            print(f"✅ {stage.name}: up to date")
+                        elif dry_run:
+                            status[stage.name] = 'stale'
+                            print(f"🔸 {stage.name}: stale")
+                        else:
+                            stale.append(stage)
+                    else:
+                        continue
+                    pending.remove(stage)
+                if snapshot_columns is None and any(stage.columns for stage in stale):
+                    # Upstream stages are done by now: the store is final.
+                    snapshot, snapshot_columns = write_stage_snapshot(
+                        [stage for stage in stale + pending if stage.columns])
+                for stage in stale:
+                    print(f"▶️ {stage.name}")
+                    shared = snapshot if set(stage.columns or ()) <= set(snapshot_columns or ()) else None
+                    running[pool.submit(run_stage, stage.name, shared)] = stage
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        seconds = finish(stage, future)
+                        status[stage.name] = 'done'
+                        print(f"✅ {stage.name}: done in {seconds:.1f}s")
+                    except Exception as exc:
+                        status[stage.name] = 'failed'
+                        print(f"❌ {stage.name} failed: {exc}")
+    finally:
+        if snapshot and os.path.exists(snapshot):
+            os.remove(snapshot)
+
+    counts = {state: list(status.values()).count(state) for state in ('done', 'fresh', 'stale', 'failed', 'blocked')}
+    summary = f"{counts['done']} ran, {counts['fresh']} up to date, {counts['failed']} failed, {counts['blocked']} skipped"
+    if dry_run:
+        summary = f"{counts['stale']} stale, {counts['fresh']} up to date"
+    print(f"🏁 Pipeline finished in {time.perf_counter() - start:.1f}s: {summary}")
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the preprocess -> eda/model/cluster/sweep pipeline, skipping up-to-date stages")
+    parser.add_argument('stages', nargs='*', help="stages to run (with their upstream stages); all by default")
+    parser.add_argument('--force', action='store_true', help="rerun every selected stage")
+    parser.add_argument('--dry-run', action='store_true', help="only report which stages are stale")
+    parser.add_argument('--workers', type=int, default=None, help="stages run at the same time")
+    args = parser.parse_args()
+    status = run_pipeline(args.stages, force=args.force, dry_run=args.dry_run, workers=args.workers)
+    if any(state in ('failed', 'blocked') for state in status.values()):
+        raise SystemExit(1)
@@ -1,41 +1,482 @@
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
+from store import save_merged, rewrite_merged_since
+from utils import (SENTIMENT_SCHEMES, DEFAULT_SCHEME, STATE_PATH, apply_schema, sentiment_labels, get_scheme,
+                   stored_scheme)
+from rollup import build_cube, merge_cubes, load_cube, save_cube, rebuild_cube, rebuild_cube_since
+from accumulators import stats_by_day, merge_daily, load_daily_stats, save_daily_stats, rebuild_daily_stats_since
 
-def load_and_clean_sentiment(path):
-    df = pd.read_csv(path)
+TRADE_TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M"
+TRADE_USECOLS = ['Account', 'Coin', 'Execution Price', 'Size USD', 'Side', 'Timestamp IST', 'Closed PnL']
+TRADE_DTYPES = {
+    'Account': 'category',
+    'Coin': 'category',
+    'Side': 'category',
+    'Execution Price': 'float32',
+    'Size USD': 'float32',
+    'Timestamp IST': 'string',
+    'Closed PnL': 'string',
+}
+CHUNK_SIZE = 500_000
+# Bytes hashed at the start of the trades file and just before the
+# watermark offset to tell an appended file from a replaced one.
+IDENTITY_BYTES = 4096
+# Chunk cubes are folded into the running cube this many at a time.
+CUBE_MERGE_CHUNKS = 8
+
+TRADES_PATH = 'data/historical_data.csv'
+SENTIMENT_PATH = 'data/fear_greed_index.csv'
+# Cleaned trade files are spilled here while they are merged.
+SPILL_ROOT = 'data'
+SENTIMENT_COLS = ['sentiment_score', 'label', 'classification']
+
+def clean_sentiment(df):
     df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
     df['label'] = df['classification'].map({'Fear': 0, 'Greed': 1})
-    df = df[['datetime', 'value', 'label']]
-    df.rename(columns={'value': 'sentiment_score'}, inplace=True)
-    return df
+    return df[['datetime', 'value', 'label']].rename(columns={'value': 'sentiment_score'})
 
-def load_and_clean_trades(path):
-    df = pd.read_csv(path)
-    df['datetime'] = pd.to_datetime(df['Timestamp IST'], format="%d-%m-%Y %H:%M")
+def load_and_clean_sentiment(path):
+    return clean_sentiment(pd.read_csv(path))
+
+def parse_trade_timestamps(values):
+    # Trade timestamps have minute resolution, so a chunk holds far fewer
+    # distinct strings than rows: parse each distinct string once.
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed = pd.to_datetime(pd.Index(uniques), format=TRADE_TIMESTAMP_FORMAT)
+    result = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(result, index=values.index)
+
+def clean_trades(df):
+    df['datetime'] = parse_trade_timestamps(df['Timestamp IST'])
     df['Closed PnL'] = pd.to_numeric(df['Closed PnL'], errors='coerce')
     df['Leverage'] = df['Size USD'] / df['Execution Price']
-    df = df[['Account', 'Coin', 'Execution Price', 'Size USD', 'Side', 'datetime', 'Closed PnL', 'Leverage']]
-    return df
-
-def merge_datasets(trades_df, sentiment_df):
-    sentiment_df = sentiment_df.set_index('datetime').resample('H').ffill().reset_index()
-    trades_df['datetime_rounded'] = trades_df['datetime'].dt.floor('H')
-    merged = pd.merge(trades_df, sentiment_df, left_on='datetime_rounded', right_on='datetime', how='left')
-    merged = merged.drop(columns=['datetime_rounded', 'datetime_y']).rename(columns={'datetime_x': 'datetime'})
-    return merged
-
-def classify_sentiment(score):
-    if score >= 60:
-        return "Greed"
-    elif score >= 40:
-        return "Neutral"
+    df = df.loc[:, ['Account', 'Coin', 'Execution Price', 'Size USD', 'Side', 'datetime', 'Closed PnL', 'Leverage']]
+    return apply_schema(df)
+
+def iter_clean_trades(path, chunksize=CHUNK_SIZE):
+    reader = pd.read_csv(path, usecols=TRADE_USECOLS, dtype=TRADE_DTYPES, chunksize=chunksize)
+    for chunk in reader:
+        yield clean_trades(chunk)
+
+def load_and_clean_trades(path, chunksize=None):
+    if chunksize is not None:
+        return iter_clean_trades(path, chunksize)
+    df = pd.read_csv(path, usecols=TRADE_USECOLS, dtype=TRADE_DTYPES)
+    return clean_trades(df)
+
+def resolve_trade_files(pattern):
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.csv')
+    return sorted(glob.glob(pattern))
+
+def clean_trade_file(path, spill_prefix, chunksize=CHUNK_SIZE):
+    # Cleans and sorts one file in a worker and spills it as sorted chunks,
+    # so the parent only ever reads back the chunk the merge is at.
+    start = time.perf_counter()
+    df = load_and_clean_trades(path)
+    df = df.sort_values('datetime', kind='mergesort', ignore_index=True)
+    spills = []
+    for number, begin in enumerate(range(0, len(df), chunksize)):
+        spill = f'{spill_prefix}-{number:05d}.pkl'
+        df.iloc[begin:begin + chunksize].to_pickle(spill)
+        spills.append(spill)
+    return path, spills, len(df), time.perf_counter() - start
+
+def read_spills(spills):
+    for spill in spills:
+        df = pd.read_pickle(spill)
+        os.remove(spill)
+        yield df
+
+def iter_trade_files(paths, spill_dir, workers=None, max_in_flight=None, chunksize=CHUNK_SIZE):
+    # Cleans files across a process pool, yielding (path, spills, rows,
+    # seconds) in input order. At most max_in_flight files are queued
+    # ahead of the one being yielded.
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for number, path in enumerate(paths):
+            prefix = os.path.join(spill_dir, f'{number:05d}')
+            pending.append(pool.submit(clean_trade_file, path, prefix, chunksize))
+            if len(pending) >= max_in_flight:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+def spill_directory():
+    os.makedirs(SPILL_ROOT, exist_ok=True)
+    return tempfile.TemporaryDirectory(prefix='trades-', dir=SPILL_ROOT)
+
+def report_file(path, rows, seconds):
+    rate = rows / seconds if seconds > 0 else float('inf')
+    print(f"📄 {os.path.basename(path)}: {rows:,} rows in {seconds:.2f}s ({rate:,.0f} rows/s)")
+
+def spilled_sources(paths, spill_dir, workers=None, max_in_flight=None, verbose=True):
+    # One lazy chunk iterator per cleaned file, for merge_by_datetime.
+    sources = []
+    for path, spills, rows, seconds in iter_trade_files(paths, spill_dir, workers, max_in_flight):
+        if verbose:
+            report_file(path, rows, seconds)
+        sources.append(read_spills(spills))
+    return sources
+
+def datetime_keys(df):
+    # Sortable int64 trade times, with missing times last as in sort_values.
+    keys = df['datetime'].to_numpy().view('int64')
+    return np.where(pd.isnull(df['datetime']).to_numpy(), np.iinfo('int64').max, keys)
+
+def merge_by_datetime(sources, chunksize=CHUNK_SIZE):
+    # k-way merge of sources that are each sorted by datetime, yielding
+    # chunks in datetime order (ties keep input order). A source is a frame
+    # or an iterator of consecutive sorted chunks; only its head chunk is
+    # held, and the next one is pulled when the head runs out. Every step
+    # takes up to chunksize rows from each head, up to the earliest of
+    # their last times, so each chunk is complete.
+    sources = [iter([source]) if isinstance(source, pd.DataFrame) else iter(source) for source in sources]
+    heads = [None] * len(sources)
+    keys = [None] * len(sources)
+    positions = [0] * len(sources)
+
+    def advance(i):
+        heads[i] = keys[i] = None
+        for df in sources[i]:
+            if len(df):
+                heads[i], keys[i], positions[i] = df, datetime_keys(df), 0
+                return
+
+    for i in range(len(sources)):
+        advance(i)
+    while True:
+        active = [i for i in range(len(sources)) if heads[i] is not None]
+        if not active:
+            return
+        cutoff = min(keys[i][min(positions[i] + chunksize, len(keys[i])) - 1] for i in active)
+        parts = []
+        for i in active:
+            # The next chunk of a source may start at the cutoff itself.
+            while heads[i] is not None:
+                end = int(np.searchsorted(keys[i], cutoff, side='right'))
+                if end > positions[i]:
+                    parts.append(heads[i].iloc[positions[i]:end])
+                    positions[i] = end
+                if positions[i] < len(keys[i]):
+                    break
+                advance(i)
+        chunk = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+        yield apply_schema(chunk.sort_values('datetime', kind='mergesort', ignore_index=True))
+
+def load_trade_files(pattern, workers=None, max_in_flight=None, verbose=True):
+    paths = resolve_trade_files(pattern)
+    if not paths:
+        raise FileNotFoundError(f"No trade files match {pattern}")
+    with spill_directory() as spill_dir:
+        sources = spilled_sources(paths, spill_dir, workers, max_in_flight, verbose)
+        merged = pd.concat(list(merge_by_datetime(sources)), ignore_index=True)
+    return apply_schema(merged)
+
+def take_readings(column, positions):
+    # Sentiment values at the given row positions, -1 meaning unmatched.
+    # Numeric readings come out as float64 with NaN, as with the hourly
+    # grid; other columns keep their dtype and take its missing value.
+    if pd.api.types.is_numeric_dtype(column) and not isinstance(column.dtype, pd.CategoricalDtype):
+        values = column.to_numpy(dtype='float64')
+        return np.where(positions >= 0, values[positions.clip(0)] if len(values) else np.nan, np.nan)
+    return column.array.take(positions, allow_fill=True)
+
+def merge_datasets(trades_df, sentiment_df, tolerance=None, resolution='h'):
+    # As-of join: each trade gets the latest sentiment reading at or before
+    # its (floored) timestamp, found by binary search over the sorted
+    # sentiment times instead of expanding sentiment onto an hourly grid.
+    # As with that grid, the last reading only covers its own bucket:
+    # later trades stay unmatched until a newer reading arrives.
+    # tolerance also drops matches staler than the given offset.
+    sentiment_df = sentiment_df.sort_values('datetime')
+    columns = sentiment_df.columns.drop('datetime')
+    if not len(sentiment_df):
+        positions = np.full(len(trades_df), -1)
+    else:
+        sentiment_times = sentiment_df['datetime'].to_numpy()
+        keys = trades_df['datetime']
+        if resolution is not None:
+            keys = keys.dt.floor(resolution)
+        keys = keys.to_numpy()
+
+        idx = np.searchsorted(sentiment_times, keys, side='right') - 1
+        matched = (idx >= 0) & (keys <= sentiment_times[-1]) & ~pd.isnull(keys)
+        idx = idx.clip(0)
+        if tolerance is not None:
+            matched &= (keys - sentiment_times[idx]) <= pd.Timedelta(tolerance)
+        positions = np.where(matched, idx, -1)
+
+    for col in columns:
+        trades_df[col] = pd.Series(take_readings(sentiment_df[col], positions), index=trades_df.index)
+    return trades_df
+
+def merge_stream(trade_chunks, sentiment_df, tolerance=None, resolution='h'):
+    sentiment_df = sentiment_df.sort_values('datetime')
+    for chunk in trade_chunks:
+        yield merge_datasets(chunk, sentiment_df, tolerance=tolerance, resolution=resolution)
+
+def band_sentiment(scores, scheme=DEFAULT_SCHEME):
+    thresholds, labels = get_scheme(scheme)
+    values = np.asarray(scores, dtype='float64')
+    codes = np.searchsorted(np.asarray(thresholds, dtype='float64'), values, side='right')
+    codes[np.isnan(values)] = -1
+    bands = pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+    if isinstance(scores, pd.Series):
+        return pd.Series(bands, index=scores.index, name='classification')
+    return bands
+
+def classify_sentiment(score, scheme=DEFAULT_SCHEME):
+    thresholds, labels = get_scheme(scheme)
+    if score is None or pd.isna(score):
+        return None
+    return labels[int(np.searchsorted(thresholds, score, side='right'))]
+
+def attach_sentiment(trades_df, sentiment_df, scheme=DEFAULT_SCHEME):
+    merged = merge_datasets(trades_df, sentiment_df)
+    merged["classification"] = band_sentiment(merged["sentiment_score"], scheme)
+    merged["label"] = sentiment_labels(merged["classification"])
+    return apply_schema(merged, scheme)
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+def scheme_state(scheme):
+    # JSON form of a scheme: its name, or [thresholds, labels].
+    return scheme if isinstance(scheme, str) else list(get_scheme(scheme))
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(state, fh, indent=2)
+    os.replace(tmp_path, path)
+
+def complete_size(path):
+    # Byte length up to and including the last newline, so a row that is
+    # still being written is left for the next run.
+    size = os.path.getsize(path)
+    with open(path, 'rb') as fh:
+        while size > 0:
+            start = max(0, size - 65536)
+            fh.seek(start)
+            block = fh.read(size - start)
+            pos = block.rfind(b'\n')
+            if pos != -1:
+                return start + pos + 1
+            size = start
+    return 0
+
+class BoundedReader(io.RawIOBase):
+    # Read-only view of a file that stops at a fixed byte position.
+    def __init__(self, fh, remaining):
+        self.fh = fh
+        self.remaining = remaining
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.fh.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+def iter_new_trades(path, offset, end, chunksize=CHUNK_SIZE):
+    # Streams the complete rows between byte offsets [offset, end).
+    with open(path, 'rb') as fh:
+        header = fh.readline()
+        columns = pd.read_csv(io.BytesIO(header), nrows=0).columns
+        fh.seek(max(offset, len(header)))
+        if fh.tell() >= end:
+            return
+        body = io.BufferedReader(BoundedReader(fh, end - fh.tell()))
+        reader = pd.read_csv(body, header=None, names=columns, usecols=TRADE_USECOLS,
+                             dtype=TRADE_DTYPES, chunksize=chunksize)
+        for chunk in reader:
+            yield clean_trades(chunk)
+
+def file_identity(path, offset, n_bytes=IDENTITY_BYTES):
+    # Same inode, same first bytes and same bytes up to the offset: the
+    # file was only appended to since the offset was recorded.
+    def digest(start, stop):
+        fh.seek(start)
+        return hashlib.sha1(fh.read(stop - start)).hexdigest()
+
+    with open(path, 'rb') as fh:
+        return {'inode': os.fstat(fh.fileno()).st_ino,
+                'head': digest(0, min(n_bytes, offset)),
+                'tail': digest(max(0, offset - n_bytes), offset)}
+
+def sentiment_fingerprints(sentiment_df):
+    # One hash per reading, keyed by its time, so the next run can tell
+    # which readings were added, corrected or removed.
+    hashes = pd.util.hash_pandas_object(sentiment_df, index=False)
+    times = sentiment_df['datetime'].map(pd.Timestamp.isoformat)
+    return {time: f'{value:016x}' for time, value in zip(times, hashes)}
+
+def sentiment_changed_since(sentiment_state, sentiment_df):
+    # Earliest time from which stored trades may join differently with
+    # sentiment_df than with the readings recorded in the watermark, or
+    # None when nothing changed.
+    mark = sentiment_state.get('last_datetime')
+    if mark is None:
+        return sentiment_df['datetime'].min() if len(sentiment_df) else None
+    recorded = sentiment_state.get('readings')
+    current = sentiment_fingerprints(sentiment_df)
+    if recorded is None:
+        # State written before readings were fingerprinted.
+        changed = [time for time in current if pd.Timestamp(time) > pd.Timestamp(mark)]
     else:
-        return "Fear"
+        changed = [time for time in set(recorded) | set(current) if recorded.get(time) != current.get(time)]
+    if not changed:
+        return None
+    # Trades after the previous last reading were unmatched, so a newer
+    # reading re-labels them from that reading on.
+    return min(min(pd.Timestamp(time) for time in changed), pd.Timestamp(mark))
+
+def save_watermarks(state_path, trades_path, offset, last_datetime, sentiment_path, sentiment_df,
+                    scheme=DEFAULT_SCHEME):
+    last_sentiment = sentiment_df['datetime'].max() if len(sentiment_df) else None
+    save_state({
+        'scheme': scheme_state(scheme),
+        'trades': {'path': trades_path, 'offset': offset,
+                   'identity': file_identity(trades_path, offset) if offset is not None else None,
+                   'last_datetime': last_datetime.isoformat() if last_datetime is not None else None},
+        'sentiment': {'path': sentiment_path,
+                      'last_datetime': last_sentiment.isoformat() if last_sentiment is not None else None,
+                      'readings': sentiment_fingerprints(sentiment_df)},
+    }, state_path)
+
+def process_trades(trade_chunks, sentiment_df, append, scheme=DEFAULT_SCHEME):
+    sentiment_df = sentiment_df.sort_values('datetime')
+    rows = 0
+    last_datetime = None
+    chunks = 0
+    cube = load_cube() if append else None
+    pending = []
+    daily = (load_daily_stats() or {}) if append else {}
+    for chunk in trade_chunks:
+        merged = attach_sentiment(chunk, sentiment_df, scheme)
+        save_merged(merged, append=append or rows > 0)
+        pending.append(build_cube(merged))
+        if len(pending) >= CUBE_MERGE_CHUNKS:
+            cube = merge_cubes(cube, *pending)
+            pending = []
+        chunks += 1
+        merge_daily(daily, stats_by_day(merged))
+        rows += len(merged)
+        chunk_max = merged['datetime'].max()
+        if pd.notna(chunk_max) and (last_datetime is None or chunk_max > last_datetime):
+            last_datetime = chunk_max
+    # The dashboard's rollup cube and per-day summaries are kept in step
+    # with the merged store. Chunk cubes are folded into a running cube a
+    # few at a time, so neither memory nor merge passes grow with the
+    # number of chunks.
+    if chunks:
+        save_cube(merge_cubes(cube, *pending))
+        save_daily_stats(daily)
+    return rows, last_datetime
+
+def run_full(trades_path=TRADES_PATH, sentiment_path=SENTIMENT_PATH, state_path=STATE_PATH, scheme=DEFAULT_SCHEME):
+    sentiment = load_and_clean_sentiment(sentiment_path)
+    end = complete_size(trades_path)
+    trades = iter_new_trades(trades_path, 0, end)
+    rows, last_datetime = process_trades(trades, sentiment, append=False, scheme=scheme)
+    save_watermarks(state_path, trades_path, end, last_datetime, sentiment_path, sentiment, scheme)
+    print(f"✅ Merged {rows:,} trades")
+
+def run_incremental(trades_path=TRADES_PATH, sentiment_path=SENTIMENT_PATH, state_path=STATE_PATH,
+                    scheme=DEFAULT_SCHEME):
+    state = load_state(state_path)
+    trade_state = state.get('trades', {})
+    end = complete_size(trades_path)
+    if trade_state.get('path') != trades_path or trade_state.get('offset') is None or trade_state['offset'] > end:
+        print("⚠️ No usable watermark for these inputs, rebuilding from scratch")
+        return run_full(trades_path, sentiment_path, state_path, scheme)
+    if trade_state.get('identity') != file_identity(trades_path, trade_state['offset']):
+        # Rotated, regenerated or edited before the offset: the offset no
+        # longer points past the rows already stored.
+        print("⚠️ Trades file was replaced since the last run, rebuilding from scratch")
+        return run_full(trades_path, sentiment_path, state_path, scheme)
+    if get_scheme(state.get('scheme', DEFAULT_SCHEME)) != get_scheme(scheme):
+        # Every stored label, the cube and the daily stats depend on the
+        # scheme, so a new one relabels everything.
+        print("⚠️ Sentiment scheme changed, rebuilding from scratch")
+        return run_full(trades_path, sentiment_path, state_path, scheme)
+
+    sentiment = load_and_clean_sentiment(sentiment_path)
+    # Readings added, corrected or removed since the last run may change
+    # the label of trades already stored from the first of them onwards:
+    # re-join just that tail of the store.
+    since = sentiment_changed_since(state.get('sentiment', {}), sentiment)
+    backfilled = 0
+    if since is not None:
+        backfilled = rewrite_merged_since(
+            since, lambda df: attach_sentiment(df.drop(columns=SENTIMENT_COLS, errors='ignore'), sentiment, scheme))
+    if load_cube() is None:
+        rebuild_cube()
+    elif backfilled:
+        rebuild_cube_since(since)
+    if load_daily_stats() is None:
+        rebuild_daily_stats_since()
+    elif backfilled:
+        rebuild_daily_stats_since(since)
+
+    trades = iter_new_trades(trades_path, trade_state['offset'], end)
+    rows, last_datetime = process_trades(trades, sentiment, append=True, scheme=scheme)
+    if last_datetime is None and trade_state.get('last_datetime'):
+        last_datetime = pd.Timestamp(trade_state['last_datetime'])
+    save_watermarks(state_path, trades_path, end, last_datetime, sentiment_path, sentiment, scheme)
+    print(f"✅ Appended {rows:,} new trades, re-labelled {backfilled:,} stored trades")
+
+def run_files(pattern, sentiment_path=SENTIMENT_PATH, workers=None, state_path=STATE_PATH, scheme=DEFAULT_SCHEME):
+    # Files are cleaned in parallel and merged by trade time, so the store
+    # is written in time order whatever the file order.
+    paths = resolve_trade_files(pattern)
+    if not paths:
+        raise FileNotFoundError(f"No trade files match {pattern}")
+    sentiment = load_and_clean_sentiment(sentiment_path)
+    start = time.perf_counter()
+
+    with spill_directory() as spill_dir:
+        sources = spilled_sources(paths, spill_dir, workers)
+        rows, last_datetime = process_trades(merge_by_datetime(sources), sentiment, append=False, scheme=scheme)
+    # No byte offset into a set of files: the next incremental run on a
+    # single trades file starts from scratch.
+    save_watermarks(state_path, pattern, None, last_datetime, sentiment_path, sentiment, scheme)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Merged {rows:,} trades from {len(paths)} files in {elapsed:.1f}s")
 
 if __name__ == "__main__":
-    sentiment = load_and_clean_sentiment('data/fear_greed_index.csv')
-    trades = load_and_clean_trades('data/historical_data.csv')
-    merged = merge_datasets(trades, sentiment)
-    merged["classification"] = merged["sentiment_score"].apply(classify_sentiment)
-    merged.to_csv('data/merged_data.csv', index=False)
-    print("✅ Merged data saved to data/merged_data.csv")
+    parser = argparse.ArgumentParser(description="Clean trades and join them with the fear/greed index")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only merge trades added since the last run and backfill late sentiment")
+    parser.add_argument('--trades', default=TRADES_PATH,
+                        help="trades CSV, or a directory/glob of CSVs to clean in parallel")
+    parser.add_argument('--workers', type=int, default=None, help="processes used for multi-file ingestion")
+    parser.add_argument('--scheme', default=DEFAULT_SCHEME, choices=sorted(SENTIMENT_SCHEMES),
+                        help="sentiment banding; changing it rebuilds the store")
+    args = parser.parse_args()
+    if args.trades != TRADES_PATH and not os.path.isfile(args.trades):
+        if args.incremental:
+            parser.error("--incremental needs a single trades CSV, not a directory or glob")
+        run_files(args.trades, workers=args.workers, scheme=args.scheme)
+    elif args.incremental:
+        run_incremental(args.trades, scheme=args.scheme)
+    else:
+        run_full(args.trades, scheme=args.scheme)
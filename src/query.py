@@ -0,0 +1,111 @@
+import numpy as np
+
+# In-memory indexes for filtering the merged trades without scanning them.
+#
+# Range columns keep the row order that sorts them, so a [low, high] filter
+# is two binary searches. Categorical columns keep their rows grouped by
+# category code (one stable argsort), so the rows of any category are a
+# contiguous, already ascending slice. A query starts from the smallest
+# candidate set, checks the remaining filters only on those rows, and the
+# caller pages through the result.
+
+RANGE_COLUMNS = ['Closed PnL', 'datetime']
+EQUALITY_COLUMNS = ['classification', 'Account', 'Coin']
+PAGE_SIZE = 100
+
+class TradeIndex:
+    def __init__(self, df, range_columns=RANGE_COLUMNS, equality_columns=EQUALITY_COLUMNS):
+        self.df = df
+        self.ranges = {}
+        for col in range_columns:
+            if col in df.columns:
+                values = df[col].to_numpy()
+                order = np.argsort(values, kind='stable')
+                self.ranges[col] = (order, values[order])
+        self.postings = {}
+        for col in equality_columns:
+            if col in df.columns:
+                values = df[col].astype('category')
+                codes = values.cat.codes.to_numpy()
+                order = np.argsort(codes, kind='stable')
+                bounds = np.searchsorted(codes[order], np.arange(len(values.cat.categories) + 1))
+                self.postings[col] = (values.cat.categories, order, bounds)
+
+    def __len__(self):
+        return len(self.df)
+
+    def categories(self, col):
+        categories, _, bounds = self.postings[col]
+        return [category for i, category in enumerate(categories) if bounds[i + 1] > bounds[i]]
+
+    def range_bounds(self, col, low=None, high=None):
+        _, ordered = self.ranges[col]
+        start = 0 if low is None else np.searchsorted(ordered, low, side='left')
+        stop = len(ordered) if high is None else np.searchsorted(ordered, high, side='right')
+        return start, max(start, stop)
+
+    def range_rows(self, col, low=None, high=None):
+        order, _ = self.ranges[col]
+        start, stop = self.range_bounds(col, low, high)
+        return np.sort(order[start:stop])
+
+    def equal_rows(self, col, values):
+        categories, order, bounds = self.postings[col]
+        parts = []
+        for code in categories.get_indexer(list(values)):
+            if code >= 0:
+                parts.append(order[bounds[code]:bounds[code + 1]])
+        if not parts:
+            return np.empty(0, dtype='int64')
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def equal_count(self, col, values):
+        categories, _, bounds = self.postings[col]
+        codes = categories.get_indexer(list(values))
+        codes = codes[codes >= 0]
+        return int((bounds[codes + 1] - bounds[codes]).sum())
+
+    def query(self, equals=None, ranges=None):
+        # equals: {column: values}; ranges: {column: (low, high)}, either
+        # bound may be None. Returns matching row positions in table order.
+        filters = []
+        for col, values in (equals or {}).items():
+            if values is not None:
+                filters.append(('equals', col, values, self.equal_count(col, values)))
+        for col, (low, high) in (ranges or {}).items():
+            if low is not None or high is not None:
+                start, stop = self.range_bounds(col, low, high)
+                filters.append(('range', col, (low, high), stop - start))
+        if not filters:
+            return np.arange(len(self.df))
+
+        filters.sort(key=lambda f: f[3])
+        kind, col, arg, _ = filters[0]
+        rows = self.equal_rows(col, arg) if kind == 'equals' else self.range_rows(col, *arg)
+        for kind, col, arg, _ in filters[1:]:
+            if not len(rows):
+                break
+            values = self.df[col].to_numpy()[rows] if kind == 'range' else self.df[col].iloc[rows]
+            if kind == 'equals':
+                keep = values.isin(list(arg)).to_numpy()
+            else:
+                low, high = arg
+                keep = np.ones(len(rows), dtype=bool)
+                if low is not None:
+                    keep &= values >= low
+                if high is not None:
+                    keep &= values <= high
+            rows = rows[keep]
+        return rows
+
+    def page(self, rows, page=0, page_size=PAGE_SIZE, sort_by=None, ascending=True):
+        # One page of the result; sorting only touches the matching rows.
+        if sort_by is not None and len(rows):
+            keys = self.df[sort_by].to_numpy()[rows]
+            order = np.argsort(keys, kind='stable')
+            rows = rows[order if ascending else order[::-1]]
+        start = page * page_size
+        return self.df.iloc[rows[start:start + page_size]]
+
+def page_count(n_rows, page_size=PAGE_SIZE):
+    return max(1, -(-n_rows // page_size))
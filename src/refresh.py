@@ -0,0 +1,50 @@
+import threading
+import time
+import traceback
+
+# Shared, change-aware data snapshot for the dashboard.
+#
+# The first caller loads synchronously. Afterwards every call returns the
+# current snapshot immediately; at most once per `interval` seconds the
+# input fingerprint (file names, sizes and mtimes) is checked, and when it
+# changed a single background thread builds the new snapshot and swaps it
+# in. Sessions keep using the previous snapshot until the swap, and a
+# failed reload keeps the previous snapshot.
+
+class BackgroundLoader:
+    def __init__(self, load, fingerprint, interval=5.0):
+        self.load = load
+        self.fingerprint = fingerprint
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.version = None
+        self.checked = 0.0
+        self.reloading = False
+        self.error = None
+
+    def get(self):
+        with self.lock:
+            if self.snapshot is None:
+                self.version = self.fingerprint()
+                self.snapshot = self.load()
+                self.checked = time.monotonic()
+                return self.version, self.snapshot
+            if not self.reloading and time.monotonic() - self.checked >= self.interval:
+                self.checked = time.monotonic()
+                version = self.fingerprint()
+                if version != self.version:
+                    self.reloading = True
+                    threading.Thread(target=self.reload, args=(version,), daemon=True).start()
+            return self.version, self.snapshot
+
+    def reload(self, version):
+        try:
+            snapshot = self.load()
+        except Exception:
+            self.error = traceback.format_exc()
+            snapshot = None
+        with self.lock:
+            if snapshot is not None:
+                self.snapshot, self.version, self.error = snapshot, version, None
+            self.reloading = False
@@ -0,0 +1,269 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from store import iter_merged, has_arrow
+from utils import apply_schema
+
+# Rollup cube for the dashboard, materialized by preprocess.
+#
+# cells: one row per sentiment x day x coin x account with additive
+#        statistics (trades, wins, PnL sum / sum of squares / min / max,
+#        leverage sum and count).
+# hist:  one row per sentiment x day x coin x PnL bin with a trade count.
+#        Bins are fixed log-spaced magnitudes mirrored around zero, so
+#        histograms of any slice add up, and quantiles read from them are
+#        within RELATIVE_ACCURACY of the true value.
+#
+# Both tables only ever need sums, mins and maxes to merge, so new trades
+# are folded in without touching the rest of the cube, and every KPI and
+# chart costs the same whatever the raw trade count.
+
+ROLLUP_DIR = 'data/rollup'
+CUBE_KEYS = ['classification', 'date', 'Coin', 'Account']
+HIST_KEYS = ['classification', 'date', 'Coin']
+SUM_COLUMNS = ['trades', 'wins', 'pnl_sum', 'pnl_sumsq', 'leverage_sum', 'leverage_n']
+
+RELATIVE_ACCURACY = 0.02
+MIN_ABS_PNL = 0.01
+MAX_BIN = 1000
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+
+def pnl_bins(values):
+    # 0 for |pnl| < MIN_ABS_PNL, +-k for magnitudes in [MIN*GAMMA^(k-1), MIN*GAMMA^k).
+    values = np.nan_to_num(np.asarray(values, dtype='float64'))
+    magnitude = np.abs(values)
+    with np.errstate(divide='ignore'):
+        k = np.floor(np.log(magnitude / MIN_ABS_PNL) / np.log(GAMMA)) + 1
+    k = np.clip(np.where(magnitude < MIN_ABS_PNL, 0, k), 0, MAX_BIN).astype('int16')
+    return np.sign(values).astype('int16') * k
+
+def bin_values(bins):
+    # Representative PnL of each bin (within RELATIVE_ACCURACY of its members).
+    bins = np.asarray(bins)
+    k = np.abs(bins).astype('float64')
+    value = MIN_ABS_PNL * GAMMA ** (k - 1) * 2 * GAMMA / (1 + GAMMA)
+    return np.where(bins == 0, 0.0, np.sign(bins) * value)
+
+def cube_keys(df, keys):
+    return [key for key in keys if key in df.columns]
+
+def with_date(df):
+    if 'datetime' in df.columns and 'date' not in df.columns:
+        df = df.assign(date=df['datetime'].dt.floor('D'))
+    return df
+
+def build_cube(df):
+    df = with_date(df).dropna(subset=['Closed PnL'])
+    pnl = df['Closed PnL'].to_numpy('float64')
+    leverage = df['Leverage'].to_numpy('float64') if 'Leverage' in df.columns else np.full(len(df), np.nan)
+    frame = pd.DataFrame({
+        'trades': np.ones(len(df), dtype='int64'),
+        'wins': (pnl > 0).astype('int64'),
+        'pnl_sum': pnl,
+        'pnl_sumsq': pnl * pnl,
+        'pnl_min': pnl,
+        'pnl_max': pnl,
+        'leverage_sum': np.nan_to_num(leverage),
+        'leverage_n': (~np.isnan(leverage)).astype('int64'),
+        'bin': pnl_bins(pnl),
+    }, index=df.index)
+    keys = cube_keys(df, CUBE_KEYS)
+    frame = pd.concat([df[keys], frame], axis=1)
+    cells = aggregate_cells(frame, keys)
+    hist_keys = cube_keys(df, HIST_KEYS) + ['bin']
+    hist = frame.groupby(hist_keys, observed=True, sort=False, dropna=False).size().rename('count').reset_index()
+    return {'cells': cells, 'hist': hist}
+
+# Trades with a missing key (e.g. no sentiment reading yet) keep a cell of
+# their own, so cube totals match the merged store.
+
+def aggregate_cells(frame, keys):
+    aggregations = {col: 'sum' for col in SUM_COLUMNS}
+    aggregations.update(pnl_min='min', pnl_max='max')
+    return frame.groupby(keys, observed=True, sort=False, dropna=False).agg(aggregations).reset_index()
+
+def concat_tables(tables):
+    return pd.concat([table for table in tables if len(table)] or tables[:1], ignore_index=True)
+
+def merge_cubes(*cubes):
+    # Merges any number of cubes in one pass.
+    cubes = [cube for cube in cubes if cube is not None]
+    if len(cubes) <= 1:
+        return cubes[0] if cubes else None
+    cells = concat_tables([cube['cells'] for cube in cubes])
+    hist = restore_keys(concat_tables([cube['hist'] for cube in cubes]))
+    hist_keys = cube_keys(hist, HIST_KEYS) + ['bin']
+    return {
+        'cells': aggregate_cells(restore_keys(cells), cube_keys(cells, CUBE_KEYS)),
+        'hist': hist.groupby(hist_keys, observed=True, sort=False, dropna=False)['count'].sum().reset_index(),
+    }
+
+def restore_keys(df):
+    # Keys come back as categoricals and the date as a day timestamp,
+    # whether the tables were read from Parquet, CSV or built in memory.
+    df = apply_schema(df)
+    if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'])
+    return df
+
+def table_path(path, name):
+    return os.path.join(path, f"{name}.parquet" if has_arrow() else f"{name}.csv")
+
+def save_cube(cube, path=ROLLUP_DIR):
+    # Written next to the old tables and swapped in, so a dashboard reading
+    # the cube never sees a half-written table.
+    tmp = path + '.tmp'
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    for name, table in cube.items():
+        if has_arrow():
+            table.to_parquet(table_path(tmp, name), index=False, compression='zstd')
+        else:
+            table.to_csv(table_path(tmp, name), index=False)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return path
+
+def load_cube(path=ROLLUP_DIR):
+    if not all(os.path.exists(table_path(path, name)) for name in ('cells', 'hist')):
+        return None
+    read = pd.read_parquet if has_arrow() else pd.read_csv
+    return {name: restore_keys(read(table_path(path, name))) for name in ('cells', 'hist')}
+
+def update_cube(df, path=ROLLUP_DIR):
+    # Folds a batch of new merged trades into the stored cube.
+    return save_cube(merge_cubes(load_cube(path), build_cube(df)), path)
+
+def rebuild_cube_since(start, data_path=None, path=ROLLUP_DIR):
+    # Recomputes every cell from the day of `start` onwards from the merged
+    # store, e.g. after late sentiment re-labelled those trades.
+    first_day = pd.Timestamp(start).floor('D')
+    cube = load_cube(path)
+    if cube is not None:
+        cube = {name: table[table['date'] < first_day] for name, table in cube.items()}
+    cube = merge_cubes(cube, *(build_cube(batch) for batch in iter_merged(data_path, start=first_day)))
+    if cube is not None:
+        save_cube(cube, path)
+
+def rebuild_cube(data_path=None, path=ROLLUP_DIR):
+    cube = merge_cubes(*(build_cube(batch) for batch in iter_merged(data_path)))
+    if cube is not None:
+        save_cube(cube, path)
+    return cube
+
+# Dashboard queries
+
+def trades_by_sentiment(cells):
+    counts = cells.groupby('classification', observed=True)['trades'].sum()
+    return counts[counts > 0].sort_values(ascending=False)
+
+def top_accounts(cells, n=10):
+    return cells.groupby('Account', observed=True)['pnl_sum'].sum().sort_values(ascending=False).head(n)
+
+def pnl_histogram(hist, nbins=30):
+    # Re-bins the fixed log bins onto nbins equal-width display bins.
+    counts = hist.groupby('bin')['count'].sum()
+    values = bin_values(counts.index.to_numpy())
+    if not len(values):
+        return np.array([]), np.array([0.0, 1.0])
+    return np.histogram(values, bins=nbins, weights=counts.to_numpy())
+
+def bin_bounds(bins):
+    # [low, high) PnL range covered by each fixed bin.
+    bins = np.asarray(bins)
+    k = np.abs(bins).astype('float64')
+    inner, outer = MIN_ABS_PNL * GAMMA ** (k - 1), MIN_ABS_PNL * GAMMA ** k
+    low = np.where(bins > 0, inner, -outer)
+    high = np.where(bins > 0, outer, -inner)
+    return np.where(bins == 0, -MIN_ABS_PNL, low), np.where(bins == 0, MIN_ABS_PNL, high)
+
+def hist_counts(hist):
+    counts = hist.groupby('bin')['count'].sum().sort_index()
+    counts = counts[counts > 0]
+    return counts.index.to_numpy(), counts.to_numpy()
+
+def weighted_quantiles(values, counts, quantiles):
+    cumulative = np.cumsum(counts)
+    ranks = np.asarray(quantiles) * (cumulative[-1] - 1)
+    return values[np.searchsorted(cumulative, ranks, side='right')]
+
+def spread(values, size):
+    # At most `size` values, always keeping both ends.
+    if len(values) <= size:
+        return values
+    return values[np.unique(np.linspace(0, len(values) - 1, size).round().astype('int64'))]
+
+def box_summary(hist, cells, max_outliers=50):
+    # Box plot statistics per sentiment from the PnL sketch: quartiles,
+    # 1.5 IQR whiskers, a bounded set of outlier values (bin values plus the
+    # exact extremes from the cells) and the exact mean.
+    totals = cells.groupby('classification', observed=True).agg(
+        trades=('trades', 'sum'), pnl_sum=('pnl_sum', 'sum'), pnl_min=('pnl_min', 'min'), pnl_max=('pnl_max', 'max'))
+    summary = []
+    for label, group in hist.groupby('classification', observed=True):
+        bins, counts = hist_counts(group)
+        if not len(bins):
+            continue
+        values = bin_values(bins)
+        q1, median, q3 = weighted_quantiles(values, counts, [0.25, 0.5, 0.75])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        inside = values[(values >= low) & (values <= high)]
+        extremes = totals.loc[label, ['pnl_min', 'pnl_max']].to_numpy('float64')
+        outliers = np.concatenate([values[(values < low) | (values > high)], extremes[(extremes < low) | (extremes > high)]])
+        summary.append({
+            'label': str(label),
+            'q1': q1, 'median': median, 'q3': q3,
+            'lowerfence': inside.min() if len(inside) else q1,
+            'upperfence': inside.max() if len(inside) else q3,
+            'mean': totals.loc[label, 'pnl_sum'] / totals.loc[label, 'trades'],
+            'outliers': spread(np.unique(outliers), max_outliers),
+        })
+    return summary
+
+def density_summary(hist, bins=60, span=(0.005, 0.995)):
+    # Density of PnL per sentiment on shared equal-width bins over the
+    # central `span` of all trades. Each fixed bin's count is spread
+    # uniformly over its range, i.e. the density comes from the piecewise
+    # linear CDF of the sketch.
+    all_bins, all_counts = hist_counts(hist)
+    if not len(all_bins):
+        return {'centers': np.array([]), 'groups': []}
+    low, high = weighted_quantiles(bin_values(all_bins), all_counts, span)
+    if high <= low:
+        low, high = low - 1, high + 1
+    edges = np.linspace(low, high, bins + 1)
+    groups = []
+    for label, group in hist.groupby('classification', observed=True):
+        group_bins, counts = hist_counts(group)
+        if not len(group_bins):
+            continue
+        bin_low, bin_high = bin_bounds(group_bins)
+        cumulative = np.cumsum(counts)
+        cdf = np.interp(edges, np.column_stack([bin_low, bin_high]).ravel(),
+                        np.column_stack([cumulative - counts, cumulative]).ravel())
+        groups.append({
+            'label': str(label),
+            'density': np.diff(cdf) / np.diff(edges) / counts.sum(),
+            'quartiles': weighted_quantiles(bin_values(group_bins), counts, [0.25, 0.5, 0.75]),
+        })
+    return {'centers': (edges[:-1] + edges[1:]) / 2, 'groups': groups}
+
+def period_changes(cells):
+    # Latest trade day against the day before it, in % (None when there is
+    # no earlier day to compare with).
+    changes = {'active_traders': None, 'avg_pnl': None}
+    if 'date' not in cells.columns or 'Account' not in cells.columns:
+        return changes
+    days = np.sort(cells['date'].dropna().unique())
+    if len(days) < 2:
+        return changes
+    latest, previous = (cells[cells['date'] == day] for day in days[-2:][::-1])
+    for key, now, before in [
+        ('active_traders', latest['Account'].nunique(), previous['Account'].nunique()),
+        ('avg_pnl', latest['pnl_sum'].sum() / latest['trades'].sum(), previous['pnl_sum'].sum() / previous['trades'].sum()),
+    ]:
+        changes[key] = (now - before) / abs(before) * 100 if before else None
+    return changes
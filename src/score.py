@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from store import iter_merged_by_time, save_merged, default_merged_path, has_arrow
+from features import update_features
+from model import (MODEL_FEATURES, MODEL_COLUMNS, CLASSIFIER_PATH, REGRESSOR_PATH, STREAM_CLASSIFIER_PATH,
+                   STREAM_REGRESSOR_PATH)
+from compact import load_model
+
+SCORED_DATASET = 'data/scored'
+SCORED_CSV = 'data/scored_data.csv'
+LATENCY_WINDOW = 10_000
+
+def load_models(clf_path=CLASSIFIER_PATH, reg_path=REGRESSOR_PATH, prefer_packed=True):
+    # Packed forests (or the numpy arrays inside plain pickles) are mapped
+    # read-only instead of being copied into every process. Bulk scoring
+    # is throughput-bound and uses the pickles' compiled predict instead.
+    return load_model(clf_path, prefer_packed=prefer_packed), load_model(reg_path, prefer_packed=prefer_packed)
+
+def predict_frame(X, clf, reg):
+    X = X.reindex(columns=MODEL_FEATURES).fillna(0)
+    return clf.predict(X), reg.predict(X)
+
+def score_dataset(data_path=None, output_path=None, batch_size=None, model_paths=(CLASSIFIER_PATH, REGRESSOR_PATH)):
+    data_path = data_path or default_merged_path()
+    if not os.path.exists(data_path):
+        print(f"❌ File not found: {data_path}")
+        return
+    output_path = output_path or (SCORED_DATASET if has_arrow() else SCORED_CSV)
+    clf, reg = load_models(*model_paths, prefer_packed=False)
+
+    start = time.perf_counter()
+    rows = 0
+    tail = None
+    kwargs = {'batch_size': batch_size} if batch_size else {}
+    # Batches in trade time order across coins, so the rolling features
+    # match compute_features whatever the batch size.
+    for batch in iter_merged_by_time(data_path, columns=MODEL_COLUMNS + ['Coin'], **kwargs):
+        featured, tail = update_features(batch, tail)
+        labels, pnl = predict_frame(featured, clf, reg)
+        categories = featured['classification'].cat.categories
+        scored = featured.loc[:, ['Account', 'Coin', 'datetime', 'Closed PnL', 'sentiment_score', 'label']].assign(
+            predicted_label=labels.astype('int8'),
+            predicted_classification=pd.Categorical.from_codes(labels, categories=categories),
+            predicted_pnl=pnl.astype('float32'),
+        )
+        save_merged(scored, append=rows > 0, path=output_path)
+        rows += len(scored)
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"✅ Scored {rows:,} trades in {elapsed:.1f}s ({rate:,.0f} rows/s) -> {output_path}")
+
+class MicroBatcher:
+    # Collects concurrent requests for up to max_wait seconds (or max_rows
+    # rows) and scores them with a single predict call per model.
+    def __init__(self, clf, reg, max_rows=4096, max_wait=0.005):
+        self.clf = clf
+        self.reg = reg
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.rows_scored = 0
+        self.requests_scored = 0
+        self.batches = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def score(self, frame):
+        done = threading.Event()
+        item = {'frame': frame, 'done': done, 'received': time.perf_counter()}
+        self.requests.put(item)
+        done.wait()
+        if 'error' in item:
+            raise item['error']
+        return item['labels'], item['pnl']
+
+    def run(self):
+        while True:
+            pending = [self.requests.get()]
+            rows = len(pending[0]['frame'])
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                rows += len(item['frame'])
+            self.score_pending(pending)
+
+    def score_pending(self, pending):
+        try:
+            frames = pd.concat([item['frame'] for item in pending], ignore_index=True)
+            labels, pnl = predict_frame(frames, self.clf, self.reg)
+        except Exception as exc:
+            for item in pending:
+                item['error'] = exc
+                item['done'].set()
+            return
+        offset = 0
+        now = time.perf_counter()
+        with self.lock:
+            for item in pending:
+                n = len(item['frame'])
+                item['labels'], item['pnl'] = labels[offset:offset + n], pnl[offset:offset + n]
+                offset += n
+                self.latencies.append(now - item['received'])
+            self.rows_scored += len(frames)
+            self.requests_scored += len(pending)
+            self.batches += 1
+        for item in pending:
+            item['done'].set()
+
+    def stats(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            elapsed = time.perf_counter() - self.started
+            stats = {
+                'requests': self.requests_scored,
+                'rows': self.rows_scored,
+                'batches': self.batches,
+                'rows_per_sec': self.rows_scored / elapsed if elapsed > 0 else 0.0,
+                'requests_per_sec': self.requests_scored / elapsed if elapsed > 0 else 0.0,
+            }
+        if len(latencies):
+            for p in (50, 95, 99):
+                stats[f'latency_p{p}_ms'] = float(np.percentile(latencies, p))
+        return stats
+
+def make_handler(batcher):
+    class ScoreHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self.send_json(200, batcher.stats())
+            elif self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            # Body: one record or a list of records keyed by MODEL_FEATURES;
+            # missing features are scored as 0.
+            if self.path != '/score':
+                self.send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                records = json.loads(self.rfile.read(length) or b'[]')
+                if isinstance(records, dict):
+                    records = [records]
+                frame = pd.DataFrame.from_records(records, columns=MODEL_FEATURES).apply(pd.to_numeric, errors='coerce')
+                labels, pnl = batcher.score(frame)
+            except (ValueError, TypeError) as exc:
+                self.send_json(400, {'error': str(exc)})
+                return
+            self.send_json(200, {'label': labels.tolist(), 'pnl': pnl.tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoreHandler
+
+class ScoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+def serve(host='127.0.0.1', port=8000, max_rows=4096, max_wait=0.005, model_paths=(CLASSIFIER_PATH, REGRESSOR_PATH)):
+    clf, reg = load_models(*model_paths)
+    batcher = MicroBatcher(clf, reg, max_rows=max_rows, max_wait=max_wait)
+    server = ScoreServer((host, port), make_handler(batcher))
+    print(f"🚀 Scoring on http://{host}:{port}/score (metrics at /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📈 {json.dumps(batcher.stats())}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score trades with the saved classifier and regressor")
+    parser.add_argument('--streaming', action='store_true', help="use the models trained by model.py --stream")
+    commands = parser.add_subparsers(dest='command', required=True)
+    batch = commands.add_parser('batch', help="score the whole merged dataset")
+    batch.add_argument('--data', default=None)
+    batch.add_argument('--output', default=None)
+    batch.add_argument('--batch-size', type=int, default=None)
+    http = commands.add_parser('serve', help="serve a local HTTP scoring endpoint")
+    http.add_argument('--host', default='127.0.0.1')
+    http.add_argument('--port', type=int, default=8000)
+    http.add_argument('--max-rows', type=int, default=4096)
+    http.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+    paths = (STREAM_CLASSIFIER_PATH, STREAM_REGRESSOR_PATH) if args.streaming else (CLASSIFIER_PATH, REGRESSOR_PATH)
+    if args.command == 'batch':
+        score_dataset(args.data, args.output, args.batch_size, paths)
+    else:
+        serve(args.host, args.port, args.max_rows, args.max_wait_ms / 1000, paths)
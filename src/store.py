@@ -0,0 +1,316 @@
+import os
+import shutil
+import tempfile
+import uuid
+import pandas as pd
+from utils import apply_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to the merged CSV
+    pa = None
+    ds = None
+    pq = None
+
+MERGED_CSV = 'data/merged_data.csv'
+MERGED_DATASET = 'data/merged'
+PARTITION_COLS = ['date', 'Coin']
+# A batch covering a year of trades across a few dozen coins already
+# exceeds Arrow's default limit of 1024 partitions per write.
+MAX_PARTITIONS = 1 << 20
+BATCH_SIZE = 500_000
+
+def has_arrow():
+    return pq is not None
+
+def default_merged_path():
+    if has_arrow() and os.path.isdir(MERGED_DATASET):
+        return MERGED_DATASET
+    return MERGED_CSV
+
+def partition_dates(datetimes):
+    codes, uniques = pd.factorize(datetimes.dt.floor('D'))
+    labels = pd.Index(uniques).strftime('%Y-%m-%d')
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+def save_merged(df, append=False, path=None):
+    # Writes one batch of merged rows; the first call of a full rebuild
+    # passes append=False to drop the previous output.
+    if path is None:
+        path = MERGED_DATASET if has_arrow() else MERGED_CSV
+    if not path.endswith('.csv'):
+        if not append and os.path.isdir(path):
+            shutil.rmtree(path)
+        table = pa.Table.from_pandas(df.assign(date=partition_dates(df['datetime'])), preserve_index=False)
+        pq.write_to_dataset(
+            table, path,
+            partition_cols=PARTITION_COLS,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            max_partitions=MAX_PARTITIONS,
+            compression='zstd',
+        )
+    else:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        write_header = not append or not os.path.exists(path)
+        df.to_csv(path, index=False, mode='a' if append else 'w', header=write_header)
+    return path
+
+def build_filters(start=None, end=None, coins=None):
+    filters = []
+    if start is not None:
+        filters.append(('date', '>=', pd.Timestamp(start).strftime('%Y-%m-%d')))
+    if end is not None:
+        filters.append(('date', '<=', pd.Timestamp(end).strftime('%Y-%m-%d')))
+    if coins is not None:
+        filters.append(('Coin', 'in', list(coins)))
+    return filters or None
+
+def csv_usecols(columns, start, end, coins):
+    if columns is None:
+        return None
+    usecols = set(columns)
+    if start is not None or end is not None:
+        usecols.add('datetime')
+    if coins is not None:
+        usecols.add('Coin')
+    return usecols
+
+def filter_frame(df, columns, start, end, coins):
+    if start is not None:
+        df = df[df['datetime'] >= pd.Timestamp(start).floor('D')]
+    if end is not None:
+        df = df[df['datetime'] < pd.Timestamp(end).floor('D') + pd.Timedelta(days=1)]
+    if coins is not None:
+        df = df[df['Coin'].isin(list(coins))]
+    if columns is not None:
+        df = df.loc[:, list(columns)]
+    return df
+
+def load_merged(path=None, columns=None, start=None, end=None, coins=None):
+    # Reads the merged dataset with column projection. For the partitioned
+    # Parquet store, date/coin filters prune whole partitions; for the CSV
+    # fallback the same filters are applied after parsing.
+    if path is None:
+        path = default_merged_path()
+    if os.path.isdir(path):
+        if not has_arrow():
+            raise ImportError("pyarrow is required to read the partitioned merged dataset")
+        table = pq.read_table(path, columns=columns, filters=build_filters(start, end, coins))
+        df = table.to_pandas()
+        if columns is None:
+            df = df.drop(columns=['date'], errors='ignore')
+        return apply_schema(df)
+
+    df = apply_schema(pd.read_csv(path, usecols=csv_usecols(columns, start, end, coins)))
+    return filter_frame(df, columns, start, end, coins)
+
+def arrow_batches_to_frame(batches, columns):
+    df = pa.Table.from_batches(batches).to_pandas()
+    if columns is None:
+        df = df.drop(columns=['date'], errors='ignore')
+    return apply_schema(df)
+
+def iter_merged(path=None, columns=None, start=None, end=None, coins=None, batch_size=BATCH_SIZE):
+    # Same projection and filters as load_merged, but yields bounded
+    # batches in partition (date) order instead of one frame.
+    if path is None:
+        path = default_merged_path()
+    if os.path.isdir(path):
+        if not has_arrow():
+            raise ImportError("pyarrow is required to read the partitioned merged dataset")
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        filters = build_filters(start, end, coins)
+        expression = pq.filters_to_expression(filters) if filters else None
+        # Partitions hold a date/coin each, so small record batches are
+        # coalesced until a batch reaches batch_size rows.
+        pending, pending_rows = [], 0
+        batches = dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size)
+        for batch in batches:
+            if batch.num_rows:
+                pending.append(batch)
+                pending_rows += batch.num_rows
+            if pending_rows >= batch_size:
+                yield arrow_batches_to_frame(pending, columns)
+                pending, pending_rows = [], 0
+        if pending:
+            yield arrow_batches_to_frame(pending, columns)
+        return
+
+    reader = pd.read_csv(path, usecols=csv_usecols(columns, start, end, coins), chunksize=batch_size)
+    for df in reader:
+        df = filter_frame(apply_schema(df), columns, start, end, coins)
+        if len(df):
+            yield df
+
+def rebatch(frames, batch_size):
+    # Cuts a stream of frames into batches of batch_size rows.
+    pending, rows = [], 0
+    for df in frames:
+        if not len(df):
+            continue
+        pending.append(df)
+        rows += len(df)
+        while rows >= batch_size:
+            df = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            yield apply_schema(df.iloc[:batch_size].reset_index(drop=True))
+            rest = df.iloc[batch_size:]
+            pending, rows = ([rest] if len(rest) else []), len(rest)
+    if pending:
+        df = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+        yield apply_schema(df.reset_index(drop=True))
+
+def iter_days(path, columns, start, end, coins, batch_size):
+    # Every stored day as one frame, in date order with undated rows last.
+    if os.path.isdir(path):
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        filters = build_filters(start, end, coins)
+        expression = pq.filters_to_expression(filters) if filters else None
+        days = {ds.get_partition_keys(fragment.partition_expression).get('date')
+                for fragment in dataset.get_fragments(filter=expression)}
+        for day in sorted(days, key=lambda day: (day is None, day or '')):
+            day_filter = ds.field('date').is_null() if day is None else ds.field('date') == day
+            table = dataset.to_table(columns=columns, filter=day_filter if expression is None else expression & day_filter)
+            yield arrow_batches_to_frame(table.to_batches(), columns)
+        return
+
+    # CSV rows are in file order: bucket them into per-day spills first.
+    with tempfile.TemporaryDirectory(prefix='days-', dir=os.path.dirname(os.path.abspath(path))) as spill_dir:
+        spills = {}
+        for df in iter_merged(path, columns, start, end, coins, batch_size):
+            days = df['datetime'].dt.strftime('%Y-%m-%d').fillna('')
+            for day, part in df.groupby(days, sort=False):
+                spill = os.path.join(spill_dir, f'{day or "undated"}-{len(spills.get(day, [])):06d}.pkl')
+                part.to_pickle(spill)
+                spills.setdefault(day, []).append(spill)
+        for day in sorted(spills, key=lambda day: (day == '', day)):
+            yield apply_schema(pd.concat([pd.read_pickle(spill) for spill in spills[day]], ignore_index=True))
+
+def iter_merged_by_time(path=None, columns=None, start=None, end=None, coins=None, batch_size=BATCH_SIZE):
+    # Same rows as iter_merged, but in datetime order across coins (ties
+    # keep store order, as in a stable sort of load_merged): one day of
+    # every coin is held at a time, sorted and cut into batches.
+    if path is None:
+        path = default_merged_path()
+    if os.path.isdir(path) and not has_arrow():
+        raise ImportError("pyarrow is required to read the partitioned merged dataset")
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ['datetime']))
+    days = (df.sort_values('datetime', kind='mergesort', ignore_index=True)
+            for df in iter_days(path, read_columns, start, end, coins, batch_size))
+    for batch in rebatch(days, batch_size):
+        yield batch if columns is None else batch.loc[:, list(columns)]
+
+def plain_table(df):
+    # Arrow table of a merged frame with categoricals as plain strings, so
+    # batches with different categories share one schema.
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema = pa.schema([pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                        for field in table.schema])
+    return table.cast(schema)
+
+def write_snapshot(path, columns, data_path=None, batch_size=BATCH_SIZE):
+    # Projects the merged store once into an uncompressed Arrow IPC file
+    # that other processes memory-map (see load_snapshot) instead of each
+    # re-reading the store, or re-parsing the CSV fallback. Returns None
+    # when there are no rows to write.
+    writer = None
+    try:
+        for df in iter_merged(data_path, columns=columns, batch_size=batch_size):
+            table = plain_table(df)
+            if writer is None:
+                writer = pa.ipc.new_file(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path if writer is not None else None
+
+def load_snapshot(path, columns=None):
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        df = table.to_pandas()
+    return apply_schema(df)
+
+def csv_row_offset(path, row):
+    # Byte offset of data row `row` (0-based) in a CSV of one-line rows.
+    with open(path, 'rb') as fh:
+        offset = len(fh.readline())
+        while row:
+            block = fh.read(1 << 20)
+            if not block:
+                break
+            count = block.count(b'\n')
+            if count < row:
+                row -= count
+                offset += len(block)
+                continue
+            pos = -1
+            for _ in range(row):
+                pos = block.index(b'\n', pos + 1)
+            return offset + pos + 1
+        return offset
+
+def first_row_since(path, first_day):
+    # Position of the first row dated first_day or later, reading only the
+    # datetime column; None when there is none.
+    row = 0
+    for chunk in pd.read_csv(path, usecols=['datetime'], chunksize=BATCH_SIZE):
+        later = (pd.to_datetime(chunk['datetime']) >= first_day).to_numpy()
+        if later.any():
+            return row + int(later.argmax())
+        row += len(chunk)
+    return None
+
+def rewrite_merged_since(start, transform, path=None):
+    # Replaces every stored row from the day of `start` onwards with
+    # transform(rows); returns how many rows were rewritten.
+    if path is None:
+        path = default_merged_path()
+    if not os.path.exists(path):
+        return 0
+    first_day = pd.Timestamp(start).strftime('%Y-%m-%d')
+    if os.path.isdir(path):
+        stale = load_merged(path, start=first_day)
+        if stale.empty:
+            return 0
+        updated = transform(stale)
+        # The new partitions are written next to the store and swapped in
+        # one date at a time, so a failed rewrite leaves the old rows.
+        tmp, old = path + '.tmp', path + '.old'
+        for leftover in (tmp, old):
+            if os.path.isdir(leftover):
+                shutil.rmtree(leftover)
+        save_merged(updated, path=tmp)
+        os.makedirs(old)
+        for name in sorted(os.listdir(path)):
+            if name.startswith('date=') and name[len('date='):] >= first_day:
+                if not os.path.isdir(os.path.join(tmp, name)):
+                    os.replace(os.path.join(path, name), os.path.join(old, name))
+        for name in sorted(os.listdir(tmp)):
+            if os.path.isdir(os.path.join(path, name)):
+                os.replace(os.path.join(path, name), os.path.join(old, name))
+            os.replace(os.path.join(tmp, name), os.path.join(path, name))
+        shutil.rmtree(tmp)
+        shutil.rmtree(old)
+        return len(updated)
+
+    # CSV: rows are appended in time order, so only the file from the first
+    # row of first_day onwards is re-read, truncated and written again
+    # (any earlier-dated rows after that point are rewritten as well).
+    row = first_row_since(path, pd.Timestamp(first_day))
+    if row is None:
+        return 0
+    offset = csv_row_offset(path, row)
+    columns = pd.read_csv(path, nrows=0).columns
+    with open(path, 'rb') as fh:
+        fh.seek(offset)
+        stale = apply_schema(pd.read_csv(fh, header=None, names=columns))
+    updated = transform(stale)
+    with open(path, 'r+b') as fh:
+        fh.truncate(offset)
+    updated[columns].to_csv(path, index=False, mode='a', header=False)
+    return len(updated)
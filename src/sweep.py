@@ -0,0 +1,148 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from store import iter_merged, default_merged_path
+from preprocess import get_scheme, DEFAULT_SCHEME
+
+# Fear/Neutral/Greed cut-off sweep. The merged trades are reduced once to
+# per-score sums (trades, PnL, wins, leverage), sorted by score; prefix
+# sums over that profile give every band of every (lower, upper) pair as
+# a difference of two rows, so the whole grid is a handful of array ops.
+# A score belongs to the upper band when it reaches the threshold, as in
+# preprocess.band_sentiment.
+
+SWEEP_COLUMNS = ['sentiment_score', 'Closed PnL', 'Leverage']
+SWEEP_RESULTS = 'output/sentiment_sweep.csv'
+SWEEP_HEATMAP = 'output/sentiment_sweep_heatmap.png'
+PROFILE_COLUMNS = ['trades', 'pnl', 'wins', 'leverage', 'leverage_n']
+DEFAULT_METRIC = 'pnl_spread'
+MIN_BAND_TRADES = 100
+
+def score_profile(df):
+    # Sums per distinct sentiment score, sorted by score.
+    df = df.dropna(subset=['sentiment_score', 'Closed PnL'])
+    pnl = df['Closed PnL'].to_numpy('float64')
+    leverage = df['Leverage'].to_numpy('float64')
+    has_leverage = ~np.isnan(leverage)
+    profile = pd.DataFrame({
+        'trades': np.ones(len(df), dtype='int64'),
+        'pnl': pnl,
+        'wins': (pnl > 0).astype('int64'),
+        'leverage': np.where(has_leverage, leverage, 0.0),
+        'leverage_n': has_leverage.astype('int64'),
+    }, index=pd.Index(df['sentiment_score'].to_numpy('float64'), name='sentiment_score'))
+    return profile.groupby(level=0).sum()
+
+def merge_profiles(profiles):
+    profiles = [profile for profile in profiles if len(profile)]
+    if not profiles:
+        return pd.DataFrame(columns=PROFILE_COLUMNS, index=pd.Index([], name='sentiment_score', dtype='float64'))
+    return pd.concat(profiles).groupby(level=0).sum()
+
+def load_profile(data_path=None):
+    return merge_profiles(score_profile(batch) for batch in iter_merged(data_path, columns=SWEEP_COLUMNS))
+
+def threshold_grid(start=0, stop=100, step=1):
+    return np.round(np.arange(start, stop + step / 2, step), 6)
+
+def band_metrics(sums):
+    trades, pnl, wins, leverage, leverage_n = sums.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'trades': trades.astype('int64'),
+            'total_pnl': pnl,
+            'avg_pnl': pnl / trades,
+            'win_rate': wins / trades * 100,
+            'avg_leverage': leverage / leverage_n,
+        }
+
+def sweep(profile, thresholds):
+    # One row per (lower, upper) pair with lower < upper.
+    scores = profile.index.to_numpy('float64')
+    cumulative = np.vstack([np.zeros((1, len(PROFILE_COLUMNS))), profile[PROFILE_COLUMNS].to_numpy('float64').cumsum(axis=0)])
+    thresholds = np.unique(np.asarray(thresholds, dtype='float64'))
+    # Profile rows strictly below each threshold.
+    below = np.searchsorted(scores, thresholds, side='left')
+    lower, upper = np.triu_indices(len(thresholds), k=1)
+    fear = cumulative[below[lower]]
+    greed_start = cumulative[below[upper]]
+    bands = {
+        'fear': fear,
+        'neutral': greed_start - fear,
+        'greed': cumulative[-1] - greed_start,
+    }
+    results = {'lower': thresholds[lower], 'upper': thresholds[upper]}
+    for band, sums in bands.items():
+        for name, values in band_metrics(sums).items():
+            results[f'{band}_{name}'] = values
+    results = pd.DataFrame(results)
+    results['pnl_spread'] = results['greed_avg_pnl'] - results['fear_avg_pnl']
+    results['win_rate_spread'] = results['greed_win_rate'] - results['fear_win_rate']
+    results['min_band_trades'] = results[['fear_trades', 'neutral_trades', 'greed_trades']].min(axis=1)
+    return results
+
+def best_pairs(results, metric=DEFAULT_METRIC, min_trades=MIN_BAND_TRADES, n=10):
+    eligible = results[results['min_band_trades'] >= min_trades]
+    return eligible.reindex(eligible[metric].abs().sort_values(ascending=False).index).head(n)
+
+def plot_sweep(results, metric=DEFAULT_METRIC, min_trades=MIN_BAND_TRADES, path=SWEEP_HEATMAP):
+    grid = results.pivot(index='upper', columns='lower', values=metric)
+    counts = results.pivot(index='upper', columns='lower', values='min_band_trades')
+    grid = grid.where(counts >= min_trades)
+    fig, ax = plt.subplots(figsize=(7, 6))
+    limit = np.nanmax(np.abs(grid.to_numpy())) if grid.notna().any().any() else 1.0
+    mesh = ax.pcolormesh(grid.columns, grid.index, grid.to_numpy(), cmap='coolwarm',
+                         vmin=-limit, vmax=limit, shading='nearest')
+    fig.colorbar(mesh, ax=ax, label=metric)
+    thresholds, _ = get_scheme(DEFAULT_SCHEME)
+    ax.plot(*thresholds, marker='*', color='black', markersize=14, linestyle='none',
+            label=f'{DEFAULT_SCHEME} ({thresholds[0]}/{thresholds[1]})')
+    ax.set_title(f'🎯 Sentiment Band Sweep: {metric}')
+    ax.set_xlabel('Fear / Neutral cut-off')
+    ax.set_ylabel('Neutral / Greed cut-off')
+    ax.legend(loc='lower right')
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fig.savefig(path)
+    plt.close(fig)
+
+def run_sweep(data_path=None, start=0, stop=100, step=1, metric=DEFAULT_METRIC, min_trades=MIN_BAND_TRADES, df=None):
+    data_path = data_path or default_merged_path()
+    if not os.path.exists(data_path):
+        print(f"❌ File not found: {data_path}")
+        return None
+    started = time.perf_counter()
+    profile = load_profile(data_path) if df is None else score_profile(df)
+    loaded = time.perf_counter()
+    results = sweep(profile, threshold_grid(start, stop, step))
+    swept = time.perf_counter()
+    print(f"📥 {int(profile['trades'].sum()):,} trades over {len(profile):,} distinct scores in {loaded - started:.2f}s")
+    print(f"🧮 Swept {len(results):,} threshold pairs in {swept - loaded:.3f}s")
+
+    os.makedirs(os.path.dirname(SWEEP_RESULTS), exist_ok=True)
+    results.to_csv(SWEEP_RESULTS, index=False)
+    plot_sweep(results, metric, min_trades)
+    top = best_pairs(results, metric, min_trades)
+    columns = ['lower', 'upper', metric, 'fear_trades', 'neutral_trades', 'greed_trades']
+    print(f"🏆 Top pairs by |{metric}| (every band >= {min_trades:,} trades):")
+    print(top[columns].to_string(index=False))
+    print(f"✅ Results saved to {SWEEP_RESULTS} and {SWEEP_HEATMAP}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep Fear/Neutral/Greed cut-offs over the merged trades")
+    parser.add_argument('--data', default=None)
+    parser.add_argument('--start', type=float, default=0)
+    parser.add_argument('--stop', type=float, default=100)
+    parser.add_argument('--step', type=float, default=1)
+    parser.add_argument('--metric', default=DEFAULT_METRIC,
+                        help="results column drawn in the heatmap and used to rank pairs")
+    parser.add_argument('--min-trades', type=int, default=MIN_BAND_TRADES,
+                        help="hide pairs where any band has fewer trades")
+    args = parser.parse_args()
+    run_sweep(args.data, args.start, args.stop, args.step, args.metric, args.min_trades)
@@ -0,0 +1,186 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from preprocess import (TRADES_PATH, SENTIMENT_PATH, TRADE_USECOLS, TRADE_DTYPES, TRADE_TIMESTAMP_FORMAT,
+                        clean_trades, clean_sentiment, attach_sentiment, band_sentiment)
+
+# Seeded generator for the raw inputs: a daily fear/greed index in the
+# layout of fear_greed_index.csv and trades in the layout of
+# historical_data.csv, so generated data goes through the real
+# preprocess / merge path. Trades are produced in time-ordered chunks, each
+# from its own seeded stream, and appended to disk one chunk at a time, so
+# any size can be written in bounded memory.
+#
+# Shape of the data: a mean-reverting daily index, a skewed account
+# activity distribution, per-coin price random walks, log-normal order
+# sizes, and a Closed PnL that is zero on opening fills and heavy-tailed
+# with a small sentiment-dependent drift on closing fills.
+
+SEED = 42
+CHUNK_ROWS = 1_000_000
+START = pd.Timestamp('2023-01-01')
+DEFAULT_DAYS = 365
+ACCOUNTS = 64
+# coin -> (starting price, share of trades)
+COINS = {
+    'BTC': (42_000.0, 0.30),
+    'ETH': (2_300.0, 0.20),
+    'SOL': (100.0, 0.15),
+    'HYPE': (15.0, 0.15),
+    '@107': (25.0, 0.08),
+    'XRP': (0.6, 0.07),
+    'DOGE': (0.09, 0.05),
+}
+# Trade timestamps are written in IST, the sentiment index in UTC epochs.
+IST_OFFSET = pd.Timedelta(hours=5, minutes=30)
+TRADE_COLUMNS = ['Account', 'Coin', 'Execution Price', 'Size Tokens', 'Size USD', 'Side', 'Timestamp IST',
+                 'Start Position', 'Direction', 'Closed PnL', 'Transaction Hash', 'Order ID', 'Crossed',
+                 'Fee', 'Trade ID', 'Timestamp']
+SAMPLE_ROWS = 5_000
+
+def generate_sentiment(days=DEFAULT_DAYS, start=START, seed=SEED):
+    rng = np.random.default_rng([seed, 0])
+    values = np.empty(days)
+    level = 50.0
+    for day, shock in enumerate(rng.normal(0, 7, days)):
+        level = 50 + 0.93 * (level - 50) + shock
+        values[day] = level
+    values = np.clip(np.round(values), 1, 99).astype('int64')
+    dates = pd.date_range(start, periods=days, freq='D')
+    return pd.DataFrame({
+        'timestamp': dates.asi8 // 10**9,
+        'value': values,
+        'classification': np.asarray(band_sentiment(values, '5-class')).astype(str),
+        'date': dates.strftime('%Y-%m-%d'),
+    })
+
+def price_paths(days, seed=SEED):
+    # Daily price level of every coin (days x coins), a log-normal walk.
+    rng = np.random.default_rng([seed, 1])
+    starts = np.array([price for price, _ in COINS.values()])
+    returns = rng.normal(0, 0.035, (days, len(COINS)))
+    returns[0] = 0
+    return starts * np.exp(np.cumsum(returns, axis=0))
+
+def format_minutes(times):
+    # TRADE_TIMESTAMP_FORMAT text from a per-day date string and a
+    # per-minute-of-day clock string, instead of strftime on every row.
+    minutes = times.asi8 // (60 * 10**9)
+    days, minute_of_day = np.divmod(minutes, 1440)
+    first = days.min()
+    dates = pd.date_range(pd.Timestamp(first * 86_400, unit='s'), periods=days.max() - first + 1, freq='D')
+    date_text = dates.strftime(TRADE_TIMESTAMP_FORMAT.split(' ')[0] + ' ').to_numpy()
+    clock_text = pd.date_range('2000-01-01', periods=1440, freq='min').strftime('%H:%M').to_numpy()
+    return date_text[days - first] + clock_text[minute_of_day]
+
+def trade_chunk(chunk, first_row, n_rows, total_rows, sentiment, prices, seed=SEED):
+    rng = np.random.default_rng([seed, 2, chunk])
+    days = len(sentiment)
+    # Trades are spread evenly from the first index reading to the last
+    # one, on the IST clock the merge compares with the readings, so every
+    # trade has a reading to join (none falls after the last reading).
+    span = (days - 1) * 86_400
+    lo, hi = first_row / total_rows * span, (first_row + n_rows) / total_rows * span
+    seconds = np.sort(rng.uniform(lo, hi, n_rows))
+    utc = START - IST_OFFSET + pd.to_timedelta(seconds.astype('int64'), unit='s')
+    day = np.minimum((seconds // 86_400).astype('int64'), days - 1)
+    score = sentiment['value'].to_numpy()[day]
+
+    weights = 1 / np.arange(1, ACCOUNTS + 1) ** 1.1
+    account = rng.choice(ACCOUNTS, n_rows, p=weights / weights.sum())
+    coin = rng.choice(len(COINS), n_rows, p=[share for _, share in COINS.values()])
+    price = prices[day, coin] * np.exp(rng.normal(0, 0.004, n_rows))
+    size_usd = rng.lognormal(6.0, 1.6, n_rows)
+    buy = rng.random(n_rows) < 0.5
+    closing = rng.random(n_rows) < 0.45
+    direction = np.where(buy, np.where(closing, 'Close Short', 'Open Long'),
+                         np.where(closing, 'Close Long', 'Open Short'))
+    drift = (score - 50) / 50 * 0.01
+    pnl = np.where(closing, size_usd * (drift + 0.03 * rng.standard_t(3, n_rows)), 0.0)
+    rows = np.arange(first_row, first_row + n_rows)
+    return pd.DataFrame({
+        'Account': np.array([f'0x{i:040x}' for i in range(ACCOUNTS)])[account],
+        'Coin': np.array(list(COINS))[coin],
+        'Execution Price': price.round(6),
+        'Size Tokens': (size_usd / price).round(6),
+        'Size USD': size_usd.round(2),
+        'Side': np.where(buy, 'BUY', 'SELL'),
+        'Timestamp IST': format_minutes(utc + IST_OFFSET),
+        'Start Position': rng.normal(0, 1_000, n_rows).round(4),
+        'Direction': direction,
+        'Closed PnL': pnl.round(6),
+        'Transaction Hash': np.char.add('0x', np.char.zfill(np.char.mod('%x', rng.integers(0, 2**62, n_rows)), 16)),
+        'Order ID': rows * 2 + 1,
+        'Crossed': rng.random(n_rows) < 0.7,
+        'Fee': (size_usd * 0.00035).round(6),
+        'Trade ID': rows,
+        'Timestamp': utc.asi8 // 10**6,
+    }, columns=TRADE_COLUMNS)
+
+def chunk_bounds(n_rows, chunk_rows=CHUNK_ROWS):
+    return [(chunk, first_row, min(chunk_rows, n_rows - first_row))
+            for chunk, first_row in enumerate(range(0, n_rows, chunk_rows))]
+
+def iter_trades(n_rows, sentiment, seed=SEED, chunk_rows=CHUNK_ROWS):
+    prices = price_paths(len(sentiment), seed)
+    for chunk, first_row, rows in chunk_bounds(n_rows, chunk_rows):
+        yield trade_chunk(chunk, first_row, rows, n_rows, sentiment, prices, seed)
+
+def chunk_csv(chunk, first_row, rows, n_rows, sentiment, seed):
+    df = trade_chunk(chunk, first_row, rows, n_rows, sentiment, price_paths(len(sentiment), seed), seed)
+    return df.to_csv(None, index=False, header=chunk == 0).encode()
+
+def iter_trade_csv(n_rows, sentiment, seed=SEED, chunk_rows=CHUNK_ROWS, workers=None):
+    # Encoded CSV chunks in order; generation and formatting (most of the
+    # cost) run across a process pool, with a bounded number in flight.
+    workers = workers or os.cpu_count() or 1
+    bounds = chunk_bounds(n_rows, chunk_rows)
+    if workers == 1 or len(bounds) == 1:
+        for bound in bounds:
+            yield chunk_csv(*bound, n_rows, sentiment, seed)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for bound in bounds:
+            pending.append(pool.submit(chunk_csv, *bound, n_rows, sentiment, seed))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+def write_synthetic(n_rows, trades_path=TRADES_PATH, sentiment_path=SENTIMENT_PATH, days=DEFAULT_DAYS,
+                    seed=SEED, chunk_rows=CHUNK_ROWS, workers=None):
+    sentiment = generate_sentiment(days, seed=seed)
+    for path in (trades_path, sentiment_path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    sentiment.to_csv(sentiment_path, index=False)
+    with open(trades_path, 'wb') as fh:
+        for data in iter_trade_csv(n_rows, sentiment, seed, chunk_rows, workers):
+            fh.write(data)
+    return trades_path, sentiment_path
+
+def sample_merged(n_rows=SAMPLE_ROWS, days=90, seed=SEED):
+    # Generated trades cleaned and joined in memory, in the merge_datasets
+    # output layout.
+    sentiment = generate_sentiment(days, seed=seed)
+    raw = next(iter_trades(n_rows, sentiment, seed, chunk_rows=n_rows))
+    trades = clean_trades(raw[TRADE_USECOLS].astype(TRADE_DTYPES))
+    return attach_sentiment(trades, clean_sentiment(sentiment))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write seeded synthetic trades and fear/greed data")
+    parser.add_argument('--rows', type=float, default=100_000, help="number of trades, e.g. 1e6")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--trades', default=TRADES_PATH)
+    parser.add_argument('--sentiment', default=SENTIMENT_PATH)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    write_synthetic(int(args.rows), args.trades, args.sentiment, args.days, args.seed, args.chunk_rows, args.workers)
+    print(f"✅ Wrote {int(args.rows):,} trades to {args.trades} and {args.days} days to {args.sentiment} "
+          f"in {time.perf_counter() - start:.1f}s")
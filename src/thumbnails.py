@@ -0,0 +1,70 @@
+import hashlib
+import os
+import uuid
+from PIL import Image
+
+# Derivative cache for the dashboard's plot gallery. Each image is decoded
+# and resized once per (path, size, mtime); the resized copy is stored
+# pre-encoded under THUMBNAIL_DIR, so a gallery render only stats the
+# output folder and serves small files. Full-size images are only read
+# when one is opened.
+
+OUTPUT_DIR = 'output'
+THUMBNAIL_DIR = os.path.join(OUTPUT_DIR, '.thumbnails')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+THUMBNAIL_WIDTH = 480
+
+def list_images(output_dir=OUTPUT_DIR):
+    # (name, path, stat) of every image, sorted by name, from one directory scan.
+    if not os.path.isdir(output_dir):
+        return []
+    with os.scandir(output_dir) as entries:
+        images = [(entry.name, entry.path, entry.stat()) for entry in entries
+                  if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)]
+    return sorted(images)
+
+def thumbnail_key(path, stat, width=THUMBNAIL_WIDTH):
+    return hashlib.sha1(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{width}'.encode()).hexdigest()[:20]
+
+def get_thumbnail(path, stat=None, width=THUMBNAIL_WIDTH, cache_dir=THUMBNAIL_DIR):
+    stat = stat or os.stat(path)
+    thumb = os.path.join(cache_dir, thumbnail_key(path, stat, width) + '.webp')
+    if not os.path.exists(thumb):
+        os.makedirs(cache_dir, exist_ok=True)
+        with Image.open(path) as image:
+            image.thumbnail((width, width * 4))
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            tmp = f'{thumb}.{uuid.uuid4().hex}.tmp'
+            image.save(tmp, format='WEBP', quality=85)
+        os.replace(tmp, thumb)
+    return thumb
+
+def prune_thumbnails(keep, cache_dir=THUMBNAIL_DIR):
+    # Removes thumbnails of images that changed or disappeared.
+    if not os.path.isdir(cache_dir):
+        return 0
+    keep = {os.path.basename(path) for path in keep}
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith('.webp') and name not in keep:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+                removed += 1
+            except FileNotFoundError:  # already pruned by another session
+                pass
+    return removed
+
+def gallery(output_dir=OUTPUT_DIR, width=THUMBNAIL_WIDTH, cache_dir=None):
+    # [(name, full-size path, thumbnail path, error)] for the output folder.
+    cache_dir = cache_dir or os.path.join(output_dir, '.thumbnails')
+    items, thumbs = [], []
+    for name, path, stat in list_images(output_dir):
+        try:
+            thumb = get_thumbnail(path, stat, width, cache_dir)
+            thumbs.append(thumb)
+            items.append((name, path, thumb, None))
+        except Exception as exc:
+            items.append((name, path, None, str(exc)))
+    prune_thumbnails(thumbs, cache_dir)
+    return items
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Time-series reduction for plotting. The trade-level sentiment column
+# repeats the same value for every trade in a period, so the series is
+# first collapsed to one point per timestamp and to the endpoints of runs
+# of equal values (lossless for a step series), then reduced to a fixed
+# number of points with a shape-preserving downsampler. Plots then draw
+# at most `n_out` points whatever the trade volume.
+
+TARGET_POINTS = 2000
+
+def as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype('int64').astype('float64')
+    return x.astype('float64')
+
+def dedupe_series(frame, time_col='datetime', value_col='sentiment_score'):
+    series = frame[[time_col, value_col]].dropna()
+    series = series.groupby(time_col, sort=True)[value_col].mean().reset_index()
+    values = series[value_col].to_numpy()
+    if len(values) < 3:
+        return series
+    # Keep the first and last point of every run of equal values.
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:-1] = (values[1:-1] != values[:-2]) | (values[1:-1] != values[2:])
+    return series[keep].reset_index(drop=True)
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: one point per bucket, chosen to
+    # maximise the triangle with the previously kept point and the mean of
+    # the next bucket. One Python step per output point, vectorized inside.
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = as_float(x), as_float(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    selected = np.empty(n_out, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        px, py = x[previous], y[previous]
+        area = np.abs((px - next_x) * (y[start:stop] - py) - (px - x[start:stop]) * (next_y - py))
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+def minmax_indices(x, y, n_buckets):
+    # Lowest and highest point of every equal-width time bucket (one bucket
+    # per pixel column), plus both endpoints.
+    n = len(x)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    xf, y = as_float(x), as_float(y)
+    span = xf[-1] - xf[0]
+    if span <= 0:
+        buckets = np.zeros(n, dtype='int64')
+    else:
+        buckets = np.minimum(((xf - xf[0]) / span * n_buckets).astype('int64'), n_buckets - 1)
+    order = np.lexsort((y, buckets))
+    ordered = buckets[order]
+    first = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.concatenate([[0, n - 1], order[first], order[last]]))
+
+def downsample_indices(x, y, n_out=TARGET_POINTS, method='lttb'):
+    if method == 'lttb':
+        return lttb_indices(x, y, n_out)
+    if method == 'minmax':
+        # Two points per bucket plus the endpoints stay within n_out.
+        return minmax_indices(x, y, max(1, (n_out - 2) // 2))
+    raise ValueError(f"Unknown downsampling method: {method}")
+
+def reduce_series(frame, time_col='datetime', value_col='sentiment_score', n_out=TARGET_POINTS, method='lttb'):
+    # Sorted, deduplicated and downsampled (time, value) frame ready to plot.
+    series = dedupe_series(frame, time_col, value_col)
+    if len(series) <= n_out:
+        return series
+    indices = downsample_indices(series[time_col].to_numpy(), series[value_col].to_numpy(), n_out, method)
+    return series.iloc[indices].reset_index(drop=True)
@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import accuracy_score, mean_squared_error
+from store import default_merged_path
+from utils import path_fingerprint, code_fingerprint
+from model import MODEL_FEATURES, RANDOM_STATE, iter_training_batches
+
+TUNE_CACHE = 'models/tune_cache'
+TUNING_RESULTS = 'models/tuning_results.json'
+SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [8, 12, 16, 24, None],
+    'min_samples_leaf': [1, 2, 5, 10, 20],
+    'max_features': ['sqrt', 0.5, 1.0],
+}
+TARGETS = {
+    'classifier': (RandomForestClassifier, 'label', lambda y, p: accuracy_score(y, p)),
+    # Higher is better for every target, so the regressor is ranked on -MSE.
+    'regressor': (RandomForestRegressor, 'Closed PnL', lambda y, p: -mean_squared_error(y, p)),
+}
+
+def build_fold_cache(data_path=None, n_splits=5, seed=RANDOM_STATE, cache_dir=TUNE_CACHE):
+    # Materializes features, targets and a fold id per row once, as .npy
+    # files keyed by the input fingerprint and the feature code, so an
+    # edited feature definition is not tuned on stale columns. Rows are
+    # shuffled so any prefix of a fold's training rows is a random subsample.
+    data_path = data_path or default_merged_path()
+    key = path_fingerprint(data_path, MODEL_FEATURES, n_splits, seed, code_fingerprint('features'))
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(path, 'folds.npy')):
+        return path
+
+    X, labels, pnl = [], [], []
+    for _, df in iter_training_batches(data_path):
+        X.append(df[MODEL_FEATURES].to_numpy('float32'))
+        labels.append(df['label'].to_numpy('int8'))
+        pnl.append(df['Closed PnL'].to_numpy('float64'))
+    if not X:
+        raise ValueError(f"No training rows in {data_path}")
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(sum(len(part) for part in X))
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'X.npy'), np.concatenate(X)[order])
+    np.save(os.path.join(path, 'label.npy'), np.concatenate(labels)[order])
+    np.save(os.path.join(path, 'Closed PnL.npy'), np.concatenate(pnl)[order])
+    # folds.npy is written last and marks the cache as complete.
+    np.save(os.path.join(path, 'folds.npy'), rng.integers(0, n_splits, len(order)).astype('int8'))
+    return path
+
+_loaded_caches = {}
+
+def load_fold_cache(path):
+    # Memory-mapped, so every worker process shares the page cache.
+    if path not in _loaded_caches:
+        _loaded_caches[path] = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in ['X', 'label', 'Closed PnL', 'folds']
+        }
+    return _loaded_caches[path]
+
+def evaluate(cache_path, target, params, fold, n_rows):
+    estimator, column, scorer = TARGETS[target]
+    data = load_fold_cache(cache_path)
+    folds = data['folds']
+    train = np.flatnonzero(folds != fold)[:n_rows]
+    test = np.flatnonzero(folds == fold)
+    model = estimator(random_state=RANDOM_STATE, n_jobs=1, **params)
+    model.fit(data['X'][train], data[column][train])
+    return scorer(data[column][test], model.predict(data['X'][test]))
+
+def sample_candidates(n_candidates, seed=RANDOM_STATE):
+    rng = np.random.default_rng(seed)
+    seen, candidates = set(), []
+    total = np.prod([len(values) for values in SEARCH_SPACE.values()])
+    while len(candidates) < min(n_candidates, total):
+        params = {name: values[rng.integers(len(values))] for name, values in SEARCH_SPACE.items()}
+        key = json.dumps(params, sort_keys=True, default=str)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+def successive_halving(pool, cache_path, target, candidates, n_splits, n_rows, eta=3, min_rows=2000, deadline=None):
+    # Each rung scores the survivors on every fold with a growing share of
+    # the training rows and keeps the best 1/eta; configurations that lose
+    # early never see the full data. Stops promoting at the deadline.
+    rungs = max(1, int(np.floor(np.log(max(len(candidates), 1)) / np.log(eta))) + 1)
+    rows = max(min_rows, n_rows // eta ** (rungs - 1))
+    survivors = list(range(len(candidates)))
+    history = []
+    best = None
+    while survivors:
+        rows = min(rows, n_rows)
+        futures = {
+            pool.submit(evaluate, cache_path, target, candidates[i], fold, rows): i
+            for i in survivors for fold in range(n_splits)
+        }
+        scores = {i: [] for i in survivors}
+        pending = set(futures)
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                scores[futures[future]].append(future.result())
+            if deadline is not None and time.monotonic() >= deadline:
+                for future in pending:
+                    future.cancel()
+                break
+        complete = {i: float(np.mean(s)) for i, s in scores.items() if len(s) == n_splits}
+        for i, score in complete.items():
+            history.append({'params': candidates[i], 'rows': int(rows), 'score': score})
+        if complete:
+            best_i = max(complete, key=complete.get)
+            best = {'params': candidates[best_i], 'rows': int(rows), 'score': complete[best_i]}
+        print(f"🔎 {target}: {len(complete)}/{len(survivors)} configs on {rows:,} rows, best {best['score'] if best else float('nan'):.4f}")
+        if rows >= n_rows or len(complete) <= 1 or (deadline is not None and time.monotonic() >= deadline):
+            break
+        ranked = sorted(complete, key=complete.get, reverse=True)
+        survivors = ranked[:max(1, len(ranked) // eta)]
+        rows *= eta
+    return best, history
+
+def run_tuning(data_path=None, n_candidates=27, n_splits=5, eta=3, budget=None, workers=None):
+    start = time.monotonic()
+    cache_path = build_fold_cache(data_path, n_splits)
+    data = load_fold_cache(cache_path)
+    n_train_rows = int((np.asarray(data['folds']) != 0).sum())
+    print(f"📦 Fold cache {cache_path}: {len(data['folds']):,} rows, built in {time.monotonic() - start:.1f}s")
+
+    candidates = sample_candidates(n_candidates)
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for position, target in enumerate(TARGETS):
+            # Whatever budget is left is split evenly over the remaining targets.
+            deadline = None
+            if budget is not None:
+                remaining = start + budget - time.monotonic()
+                deadline = time.monotonic() + remaining / (len(TARGETS) - position)
+            best, history = successive_halving(pool, cache_path, target, candidates, n_splits,
+                                               n_train_rows, eta=eta, deadline=deadline)
+            results[target] = {'best': best, 'history': history}
+            if best:
+                print(f"✅ Best {target}: {best['params']} (score {best['score']:.4f})")
+
+    os.makedirs(os.path.dirname(TUNING_RESULTS), exist_ok=True)
+    with open(TUNING_RESULTS, 'w') as fh:
+        json.dump(results, fh, indent=2, default=str)
+    print(f"✅ Tuning finished in {time.monotonic() - start:.1f}s, results saved to {TUNING_RESULTS}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated successive-halving search for both models")
+    parser.add_argument('--candidates', type=int, default=27)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=None, help="wall-clock budget in seconds")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    run_tuning(n_candidates=args.candidates, n_splits=args.folds, eta=args.eta,
+               budget=args.budget, workers=args.workers)
@@ -0,0 +1,68 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# Raw input layouts, as in data/historical_data.csv and data/fear_greed_index.csv.
+TRADE_COLUMNS = ['Account', 'Coin', 'Execution Price', 'Size USD', 'Side', 'Timestamp IST', 'Closed PnL']
+SENTIMENT_COLUMNS = ['timestamp', 'value', 'classification', 'date']
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Every stage reads and writes paths relative to the repository root.
+    monkeypatch.chdir(tmp_path)
+    for name in ('data', 'output', 'models'):
+        os.makedirs(name, exist_ok=True)
+    return tmp_path
+
+@pytest.fixture
+def write_trades():
+    def write(path, rows):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        pd.DataFrame(rows, columns=TRADE_COLUMNS).to_csv(path, index=False)
+        return path
+    return write
+
+@pytest.fixture
+def write_sentiment():
+    # rows: (ISO date or datetime, value, classification)
+    def write(path, rows):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        times = pd.to_datetime([row[0] for row in rows])
+        pd.DataFrame({
+            'timestamp': times.asi8 // 10**9,
+            'value': [row[1] for row in rows],
+            'classification': [row[2] for row in rows],
+            'date': times.strftime('%Y-%m-%d'),
+        }, columns=SENTIMENT_COLUMNS).to_csv(path, index=False)
+        return path
+    return write
+
+def make_merged(rows=200, days=5, seed=0):
+    # Cleaned trades joined with a daily index, as preprocess stores them.
+    from preprocess import attach_sentiment
+    from utils import apply_schema
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    trades = pd.DataFrame({
+        'Account': rng.choice(['0xa', '0xb', '0xc', '0xd'], rows),
+        'Coin': rng.choice(['BTC', 'ETH', 'SOL'], rows),
+        'Execution Price': rng.uniform(10, 100, rows),
+        'Size USD': rng.uniform(10, 1000, rows),
+        'Side': rng.choice(['BUY', 'SELL'], rows),
+        'datetime': start + pd.to_timedelta(np.sort(rng.integers(0, days * 1440, rows)), unit='min'),
+        'Closed PnL': rng.normal(0, 50, rows).round(2),
+    })
+    trades['Leverage'] = trades['Size USD'] / trades['Execution Price']
+    sentiment = pd.DataFrame({'datetime': pd.date_range(start, periods=days + 1, freq='D'),
+                              'sentiment_score': rng.integers(5, 95, days + 1).astype('float64'),
+                              'label': np.nan})
+    return attach_sentiment(apply_schema(trades), sentiment)
+
+@pytest.fixture
+def merged_df():
+    return make_merged()
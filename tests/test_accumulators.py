@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from conftest import make_merged
+from accumulators import (Moments, CoMoments, DistinctCounter, TradeStats, stats_by_day, merge_daily,
+                          merge_stats, save_daily_stats, load_trade_stats, rebuild_daily_stats_since, summarize_merged,
+                          UNDATED)
+from rollup import build_cube
+from store import save_merged
+
+def test_moments_merge_matches_one_pass():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(1e6, 1, 5000), [np.nan], rng.normal(-3, 10, 100)])
+    merged = Moments()
+    for part in np.array_split(values, 7):
+        merged.merge(Moments().update(part))
+    clean = values[~np.isnan(values)]
+    assert merged.n == len(clean)
+    assert np.isclose(merged.mean, clean.mean())
+    assert np.isclose(merged.variance(), clean.var(ddof=1))
+    assert (merged.min, merged.max) == (clean.min(), clean.max())
+    assert np.isnan(Moments().update([1.0]).variance())
+
+def test_comoments_match_pandas_corr():
+    df = make_merged(rows=600)
+    df.loc[df.index[::7], 'Leverage'] = np.nan
+    columns = ['Closed PnL', 'Leverage', 'sentiment_score']
+    sketch = CoMoments(columns)
+    for part in np.array_split(np.arange(len(df)), 4):
+        sketch.merge(CoMoments(columns).update(df.iloc[part]))
+    expected = df[columns].astype('float64').dropna().corr()
+    np.testing.assert_allclose(sketch.corr().to_numpy(), expected.to_numpy(), atol=1e-9)
+
+def test_distinct_counter_estimates_and_merges():
+    values = pd.Series([f'0x{i:040x}' for i in range(20_000)])
+    halves = DistinctCounter().update(values[:12_000]).merge(DistinctCounter().update(values[8_000:]))
+    assert abs(halves.estimate() - 20_000) / 20_000 < 0.05
+    small = DistinctCounter().update(pd.Series(['a', 'b', 'c', 'a', None]).astype('category'))
+    assert round(small.estimate()) == 3
+    assert DistinctCounter().update(values[:10]).estimate() == DistinctCounter().update(values[:10].astype('category')).estimate()
+
+def test_trade_stats_match_the_frame():
+    df = make_merged(rows=800, days=6)
+    metrics = merge_stats(stats_by_day(df).values()).metrics()
+    assert metrics['active_traders'] == df['Account'].nunique()
+    assert np.isclose(metrics['avg_pnl'], df['Closed PnL'].mean())
+    assert np.isclose(metrics['win_rate'], (df['Closed PnL'] > 0).mean() * 100)
+    assert metrics['market_sentiment'] == str(df['classification'].value_counts().idxmax())
+    means = TradeStats().update(df).group_means().set_index('classification')['Closed PnL']
+    expected = df.groupby('classification', observed=True)['Closed PnL'].mean()
+    for label, value in expected.items():
+        assert np.isclose(means[str(label)], value)
+
+def test_daily_stats_rebuild_and_totals(workdir):
+    df = make_merged(rows=500, days=4)
+    path = save_merged(df, path='data/merged_data.csv')
+    daily = stats_by_day(df.iloc[:250])
+    merge_daily(daily, stats_by_day(df.iloc[250:]))
+    save_daily_stats(daily)
+    assert load_trade_stats().pnl.n == 500
+    rebuild_daily_stats_since(df['datetime'].iloc[300], data_path=path)
+    totals = load_trade_stats()
+    assert totals.pnl.n == 500
+    assert np.isclose(totals.pnl.total, df['Closed PnL'].sum())
+    assert summarize_merged(path).pnl.n == 500
+
+def test_partitioned_store_is_summarized_per_process(workdir):
+    df = make_merged(rows=400, days=5)
+    path = save_merged(df, path='data/merged')
+    stats = summarize_merged(path, workers=2)
+    assert stats.pnl.n == 400
+    assert np.isclose(stats.pnl.mean, df['Closed PnL'].mean())
+
+def test_undated_trades_count_in_the_stats_and_the_cube():
+    df = make_merged(rows=300, days=3, seed=2)
+    df.loc[df.index[:5], 'datetime'] = pd.NaT
+    daily = stats_by_day(df)
+    assert daily[UNDATED].pnl.n == 5
+    cells = build_cube(df)['cells']
+    assert merge_stats(daily.values()).pnl.n == cells['trades'].sum() == len(df)
+    # The dashboard's exact trader count comes from the cube cells.
+    assert cells['Account'].nunique() == df['Account'].nunique()
@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+import benchmark
+from preprocess import load_and_clean_trades
+from synthetic import generate_sentiment, iter_trades, write_synthetic, sample_merged
+from benchmark import run_stage, save_results, find_regressions
+
+def test_generated_data_is_seeded_and_ordered(workdir):
+    chunked = write_synthetic(3000, 'data/many.csv', 'data/sentiment.csv', days=20, chunk_rows=700, workers=2)
+    trades = load_and_clean_trades(chunked[0])
+    assert len(trades) == 3000 and trades['datetime'].is_monotonic_increasing
+    # The same file whether the chunks are written by a pool or in order.
+    again = write_synthetic(3000, 'data/again.csv', 'data/sentiment.csv', days=20, chunk_rows=700, workers=1)
+    with open(chunked[0], 'rb') as many, open(again[0], 'rb') as repeat:
+        assert many.read() == repeat.read()
+
+def test_every_generated_trade_has_a_reading():
+    for days in (2, 30):
+        merged = sample_merged(5000, days=days)
+        assert merged['sentiment_score'].notna().all()
+    sentiment = generate_sentiment(10)
+    chunks = list(iter_trades(1000, sentiment, chunk_rows=300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    first, last = chunks[0]['Timestamp'].iloc[0], chunks[-1]['Timestamp'].iloc[-1]
+    assert first >= (sentiment['timestamp'].iloc[0] - 5.5 * 3600) * 1000
+    assert last < (sentiment['timestamp'].iloc[-1] - 5.5 * 3600) * 1000
+
+def test_stage_peak_memory_includes_worker_processes(workdir, monkeypatch):
+    child = "data = b'x' * (200 << 20)"
+    monkeypatch.setitem(benchmark.STAGES, 'child', lambda: subprocess.run([sys.executable, '-c', child], check=True))
+    measured = run_stage('child', str(workdir))
+    assert measured['children_rss_mb'] >= 200
+    assert measured['peak_rss_mb'] == max(measured['own_rss_mb'], measured['children_rss_mb'])
+
+def test_regressions_against_a_baseline(workdir):
+    before = [{'rows': 10, 'stage': 'eda', 'seconds': 1.0, 'rows_per_sec': 100.0, 'peak_rss_mb': 100.0},
+              {'rows': 10, 'stage': 'sweep', 'seconds': 1.0, 'rows_per_sec': 100.0, 'peak_rss_mb': 100.0},
+              {'rows': 10, 'stage': 'dashboard', 'error': 'boom'}]
+    save_results(before, 'data/baseline.json', rows=[10])
+    assert json.load(open('data/baseline.json'))['settings'] == {'rows': [10]}
+    after = [{'rows': 10, 'stage': 'eda', 'seconds': 2.0, 'rows_per_sec': 50.0, 'peak_rss_mb': 100.0},
+             {'rows': 10, 'stage': 'sweep', 'seconds': 1.0, 'rows_per_sec': 90.0, 'peak_rss_mb': 200.0},
+             {'rows': 10, 'stage': 'dashboard', 'error': 'boom'}]
+    regressions = find_regressions(after, 'data/baseline.json')
+    assert len(regressions) == 2
+    assert 'eda' in regressions[0] and 'rows/s' in regressions[0]
+    assert 'sweep' in regressions[1] and 'peak RSS' in regressions[1]
@@ -0,0 +1,54 @@
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+import cluster
+from store import save_merged, iter_merged
+from cluster import CLUSTER_FEATURES, CLUSTER_COLUMNS, CLUSTERED_CSV, run_clustering, run_clustering_streaming
+
+def test_run_clustering_writes_keys_and_labels(workdir, merged_df):
+    merged_df.loc[merged_df.index[:3], 'sentiment_score'] = float('nan')
+    save_merged(merged_df)
+    run_clustering(n_clusters=3)
+    clustered = pd.read_csv(CLUSTERED_CSV, parse_dates=['datetime'])
+    assert {'Account', 'Coin', 'datetime', 'cluster', *CLUSTER_FEATURES} <= set(clustered.columns)
+    assert len(clustered) == len(merged_df) - 3
+    assert set(clustered['cluster']) == {0, 1, 2}
+    # The keys join the labels back to the stored trades.
+    joined = clustered.merge(merged_df.astype({'Account': str, 'Coin': str}), on=['Account', 'Coin', 'datetime',
+                                                                              'Closed PnL'])
+    assert len(joined) >= len(clustered)
+    assert (workdir / 'output' / 'clustering_plot.png').exists()
+
+def test_run_clustering_from_a_frame(workdir, merged_df):
+    save_merged(merged_df)
+    run_clustering(n_clusters=2, df=merged_df)
+    clustered = pd.read_csv(CLUSTERED_CSV)
+    assert set(clustered['cluster']) == {0, 1}
+    assert 'Account' in clustered.columns
+
+def test_streaming_clustering_writes_keys(workdir, merged_df, monkeypatch):
+    save_merged(merged_df)
+    reads, seen = [], {}
+    monkeypatch.setattr(cluster, 'iter_merged', lambda *args, **kwargs: reads.append(kwargs['columns'])
+                        or iter_merged(*args, **kwargs))
+
+    class CountingKMeans(MiniBatchKMeans):
+        def partial_fit(self, X, y=None, sample_weight=None):
+            seen[self.n_clusters] = seen.get(self.n_clusters, 0) + len(X)
+            return super().partial_fit(X, y, sample_weight)
+
+    monkeypatch.setattr(cluster, 'MiniBatchKMeans', CountingKMeans)
+    run_clustering_streaming(k_values=(2, 3), batch_size=50, workers=2)
+    clustered = pd.read_csv(CLUSTERED_CSV)
+    assert {'Account', 'Coin', 'datetime', 'cluster', *CLUSTER_FEATURES} <= set(clustered.columns)
+    rows = merged_df[CLUSTER_FEATURES].notna().all(axis=1).sum()
+    assert len(clustered) == rows
+    # Every k is updated on every row, in one shared pass: scaler and
+    # sample, partial_fit, then labelling.
+    assert seen == {2: rows, 3: rows}
+    assert reads == [CLUSTER_FEATURES, CLUSTER_FEATURES, CLUSTER_COLUMNS]
+    assert (workdir / 'output' / 'clustering_plot.png').exists()
+
+def test_streaming_clustering_holds_back_small_leading_chunks(workdir, merged_df):
+    save_merged(merged_df.iloc[:40])
+    run_clustering_streaming(k_values=(3,), batch_size=4, workers=1)
+    assert set(pd.read_csv(CLUSTERED_CSV)['cluster']) <= {0, 1, 2}
@@ -0,0 +1,44 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from compact import CompactForest, is_forest, packed_path, save_packed, load_model
+
+def training_data(rows=500, seed=3):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, 4)).astype('float32'), columns=['a', 'b', 'c', 'd'])
+    return X, (X['a'] + X['b'] > 0).astype(int) + (X['c'] > 1), X['a'] * 3 - X['d']
+
+def test_packed_classifier_matches_forest(tmp_path):
+    X, labels, _ = training_data()
+    forest = RandomForestClassifier(n_estimators=7, max_depth=6, random_state=0).fit(X, labels)
+    packed = CompactForest.load(save_packed(forest, str(tmp_path / 'clf.packed')))
+    np.testing.assert_array_equal(packed.predict(X), forest.predict(X))
+    np.testing.assert_allclose(packed.predict_proba(X), forest.predict_proba(X), atol=1e-6)
+    # Columns are picked by name, whatever their order.
+    np.testing.assert_array_equal(packed.predict(X[['d', 'c', 'b', 'a']]), forest.predict(X))
+
+def test_packed_regressor_matches_forest(tmp_path):
+    X, _, target = training_data()
+    forest = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, target)
+    packed = CompactForest.load(save_packed(forest, str(tmp_path / 'reg.packed')))
+    np.testing.assert_allclose(packed.predict(X), forest.predict(X), rtol=1e-5, atol=1e-5)
+    assert packed.predict(X.iloc[:0]).shape == (0,)
+
+def test_load_model_prefers_packed(tmp_path):
+    X, _, target = training_data()
+    forest = RandomForestRegressor(n_estimators=3, random_state=0).fit(X, target)
+    path = str(tmp_path / 'reg.pkl')
+    joblib.dump(forest, path)
+    assert not isinstance(load_model(path), CompactForest)
+    save_packed(forest, packed_path(path))
+    assert os.path.isdir(str(tmp_path / 'reg.packed'))
+    assert isinstance(load_model(path), CompactForest)
+    assert isinstance(load_model(path, prefer_packed=False), RandomForestRegressor)
+
+def test_is_forest():
+    X, _, target = training_data(rows=50)
+    assert is_forest(RandomForestRegressor(n_estimators=2).fit(X, target))
+    assert not is_forest(LinearRegression().fit(X, target))
@@ -0,0 +1,50 @@
+import os
+import numpy as np
+import pandas as pd
+from matplotlib import cbook
+import eda
+from store import save_merged
+from eda import PLOTS, MANIFEST_PATH, box_stats, density_by_sentiment, side_counts, run_eda, load_manifest
+from conftest import make_merged
+
+def test_box_stats_match_matplotlib():
+    df = make_merged(rows=500)
+    stats = {entry['label']: entry for entry in box_stats(df, 'Leverage', max_fliers=1000)}
+    for name, values in df.groupby('classification', observed=True)['Leverage']:
+        expected = cbook.boxplot_stats(values.dropna().to_numpy())[0]
+        for key in ('q1', 'med', 'q3', 'whislo', 'whishi'):
+            assert np.isclose(stats[str(name)][key], expected[key])
+        assert len(stats[str(name)]['fliers']) == len(expected['fliers'])
+
+def test_box_stats_bound_the_fliers():
+    df = pd.DataFrame({'classification': ['Fear'] * 1000, 'x': np.r_[np.zeros(500), np.arange(500) * 1e6]})
+    stats = box_stats(df, 'x', max_fliers=10)
+    assert len(stats[0]['fliers']) <= 10
+
+def test_density_by_sentiment_integrates_to_one():
+    density = density_by_sentiment(make_merged(rows=500))
+    widths = np.diff(density['edges'])
+    for group in density['groups']:
+        assert np.isclose((group['density'] * widths).sum(), 1.0)
+    assert density_by_sentiment(pd.DataFrame({'classification': [], 'Closed PnL': []}))['groups'] == []
+
+def test_side_counts_cover_every_trade():
+    df = make_merged(rows=300)
+    assert side_counts(df)['count'].sum() == df['classification'].notna().sum()
+
+def rendered_times():
+    return {name: os.path.getmtime(path) for name, (_, _, path) in PLOTS.items()}
+
+def test_run_eda_skips_up_to_date_plots(workdir, monkeypatch):
+    save_merged(make_merged(rows=300))
+    run_eda(workers=1)
+    manifest = load_manifest(MANIFEST_PATH)
+    assert set(manifest) == set(PLOTS)
+    first = rendered_times()
+    run_eda(workers=1)
+    assert rendered_times() == first
+    # Any change to the code the plots depend on re-renders them.
+    monkeypatch.setattr(eda, 'code_fingerprint', lambda *modules: 'changed')
+    run_eda(workers=1)
+    changed = load_manifest(MANIFEST_PATH)
+    assert all(changed[name] != manifest[name] for name in PLOTS)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from features import feature_columns, compute_features, update_features
+
+def trades(rows=300, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Account': pd.Categorical(rng.choice(['a', 'b', 'c'], rows)),
+        'datetime': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 10 * 86_400, rows), unit='s'),
+        'Closed PnL': rng.normal(0, 10, rows),
+        'Size USD': rng.uniform(1, 100, rows),
+        'sentiment_score': rng.integers(0, 100, rows).astype('float64'),
+    })
+
+def brute_force(df, window):
+    # Earlier trades of the same account strictly inside the window.
+    width = pd.Timedelta(window)
+    pnl, count = [], []
+    for i, row in df.iterrows():
+        seen = df.iloc[:i]
+        seen = seen[(seen['Account'] == row['Account']) & (seen['datetime'] > row['datetime'] - width)]
+        pnl.append(seen['Closed PnL'].sum())
+        count.append(len(seen))
+    return np.array(pnl), np.array(count)
+
+def test_compute_features_matches_brute_force():
+    featured = compute_features(trades())
+    assert set(feature_columns()) <= set(featured.columns)
+    assert featured[['Account', 'datetime']].apply(tuple, axis=1).is_monotonic_increasing
+    for window in ('1h', '24h', '7D'):
+        pnl, count = brute_force(featured, window)
+        np.testing.assert_allclose(featured[f'pnl_{window}'], pnl, atol=1e-9)
+        np.testing.assert_array_equal(featured[f'trades_{window}'], count)
+
+def test_first_trade_of_an_account_has_no_history():
+    featured = compute_features(trades())
+    first = ~featured['Account'].duplicated()
+    assert (featured.loc[first, 'trades_7D'] == 0).all()
+    assert featured.loc[first, 'secs_since_prev'].isna().all()
+    assert featured.loc[first, 'sentiment_delta'].isna().all()
+
+def test_update_features_matches_one_batch():
+    df = trades().sort_values('datetime', ignore_index=True)
+    expected = compute_features(df).sort_values(['Account', 'datetime'], ignore_index=True)
+    tail, parts = None, []
+    for start in range(0, len(df), 70):
+        fresh, tail = update_features(df.iloc[start:start + 70], tail)
+        parts.append(fresh)
+    combined = pd.concat(parts).sort_values(['Account', 'datetime'], ignore_index=True)
+    for col in feature_columns():
+        np.testing.assert_allclose(combined[col].astype('float64'), expected[col].astype('float64'), atol=1e-6)
+    assert len(tail) < len(df)
+
+def test_compute_features_on_empty_frame():
+    featured = compute_features(trades().iloc[:0])
+    assert featured.empty
+    assert set(feature_columns()) <= set(featured.columns)
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import numpy as np
+import pandas as pd
+from conftest import TRADE_COLUMNS, make_merged
+from live import LiveKPIs, SentimentSource, consume, follow_file, load_live_state, write_state
+
+ROW = '0xa,BTC,100.0,{size},BUY,01-01-2024 {clock},{pnl}\n'
+
+def trade_lines(n, start=0):
+    return [ROW.format(size=100 + i, clock=f'{i // 60 % 24:02d}:{i % 60:02d}', pnl=i - 3) for i in range(start, start + n)]
+
+async def drain(queue, n_lines, timeout=5.0):
+    # (header, lines) items until n_lines lines have arrived.
+    items, lines = [], 0
+    while lines < n_lines:
+        item = await asyncio.wait_for(queue.get(), timeout)
+        items.append(item)
+        lines += len(item[1])
+    return items
+
+def test_live_windows_match_the_trades():
+    df = make_merged(rows=600, days=1, seed=4)
+    kpis = LiveKPIs('2h', steps=12)
+    for part in np.array_split(np.arange(len(df)), 5):
+        kpis.update(df.iloc[part])
+    state = kpis.state()
+    assert state['rows'] == 600
+    latest = df['datetime'].max()
+    buckets = df['datetime'].dt.floor(pd.Timedelta('10min'))
+    current = df[(buckets > latest - pd.Timedelta('2h')) & (buckets <= latest)]
+    assert state['current']['active_traders'] == current['Account'].nunique()
+    assert np.isclose(state['current']['total_pnl'], current['Closed PnL'].sum())
+    assert np.isclose(state['total']['total_pnl'], df['Closed PnL'].sum())
+    # Buckets older than two periods are dropped.
+    assert min(kpis.buckets) >= latest - pd.Timedelta('4h') - pd.Timedelta('10min')
+    assert LiveKPIs().state() == {'rows': 0}
+
+def test_state_file_expires(tmp_path):
+    path = str(tmp_path / 'live.json')
+    assert load_live_state(path) is None
+    write_state({'rows': 3}, path)
+    assert load_live_state(path)['rows'] == 3
+    assert load_live_state(path, max_age=-1) is None
+
+def test_follow_file_reads_bounded_blocks_and_rotations(tmp_path):
+    path = str(tmp_path / 'trades.csv')
+    header = ','.join(TRADE_COLUMNS) + '\n'
+    with open(path, 'w') as fh:
+        fh.write(header + ''.join(trade_lines(20)))
+
+    async def scenario():
+        queue = asyncio.Queue()
+        task = asyncio.create_task(follow_file(path, queue, from_start=True, poll=0.01, block_size=128))
+        items = await drain(queue, 20)
+        assert [line for _, lines in items for line in lines] == trade_lines(20)
+        assert len(items) > 1 and all(len(''.join(lines)) <= 128 for _, lines in items)
+        # A half-written row waits for its newline.
+        with open(path, 'a') as fh:
+            fh.write(trade_lines(1, 20)[0][:10])
+        await asyncio.sleep(0.05)
+        assert queue.empty()
+        with open(path, 'a') as fh:
+            fh.write(trade_lines(1, 20)[0][10:])
+        (item,) = await drain(queue, 1)
+        assert item[1] == trade_lines(1, 20)
+        # A replaced file is read from its first row, with its own header.
+        rotated = ','.join(reversed(TRADE_COLUMNS)) + '\n'
+        with open(path + '.new', 'w') as fh:
+            fh.write(rotated + ','.join(reversed(trade_lines(1, 30)[0].strip().split(','))) + '\n')
+        os.replace(path + '.new', path)
+        (item,) = await drain(queue, 1)
+        task.cancel()
+        return item
+
+    header_seen, lines = asyncio.run(scenario())
+    assert header_seen.startswith('Closed PnL,')
+    assert len(lines) == 1
+
+def test_consume_writes_a_heartbeat_while_idle(workdir, write_sentiment):
+    sentiment = SentimentSource(write_sentiment('data/fear_greed.csv', [('2024-01-01', 40, 'Fear')]))
+    header = ','.join(TRADE_COLUMNS) + '\n'
+
+    async def scenario():
+        queue = asyncio.Queue()
+        task = asyncio.create_task(consume(queue, LiveKPIs(), sentiment, 'data/live.json', heartbeat=0.05))
+        await asyncio.sleep(0.02)
+        first = json.load(open('data/live.json'))['updated']
+        await asyncio.sleep(0.15)
+        second = json.load(open('data/live.json'))['updated']
+        await queue.put((header, trade_lines(3)))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second > first
+    state = load_live_state('data/live.json')
+    assert state['rows'] == 3
+    assert state['total']['active_traders'] == 1
@@ -0,0 +1,73 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier
+import model
+import store
+from store import save_merged, load_merged
+from features import compute_features, feature_columns
+from model import (CLASSIFIER_PATH, REGRESSOR_PATH, STREAM_CLASSIFIER_PATH, STREAM_REGRESSOR_PATH, split_cores,
+                   run_models, run_models_streaming, iter_training_batches, prepare_training_frame)
+from conftest import make_merged
+
+def test_split_cores(monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 5)
+    assert split_cores(2) == [3, 2]
+    monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+    assert split_cores(2) == [1, 1]
+
+def test_run_models_saves_forests(workdir, monkeypatch):
+    monkeypatch.setitem(model.FOREST_PARAMS, 'n_estimators', 5)
+    save_merged(make_merged(rows=400))
+    run_models()
+    clf = joblib.load(CLASSIFIER_PATH)
+    assert isinstance(clf, RandomForestClassifier)
+    assert clf.n_jobs == split_cores(2)[0]
+    assert os.path.exists(REGRESSOR_PATH)
+
+def test_streaming_models_have_their_own_paths(workdir, monkeypatch):
+    monkeypatch.setitem(model.FOREST_PARAMS, 'n_estimators', 5)
+    save_merged(make_merged(rows=400))
+    run_models()
+    forest = os.path.getmtime(CLASSIFIER_PATH)
+    run_models_streaming(batch_size=100)
+    assert isinstance(joblib.load(STREAM_CLASSIFIER_PATH), Pipeline)
+    assert isinstance(joblib.load(STREAM_REGRESSOR_PATH), Pipeline)
+    assert isinstance(joblib.load(CLASSIFIER_PATH), RandomForestClassifier)
+    assert os.path.getmtime(CLASSIFIER_PATH) == forest
+    # Continuing from a date trains the saved pipelines further.
+    run_models_streaming(since='2024-01-04', batch_size=100)
+    assert isinstance(joblib.load(STREAM_CLASSIFIER_PATH), Pipeline)
+
+def test_since_batches_see_earlier_history(workdir):
+    merged = make_merged(rows=400)
+    save_merged(merged)
+    resumed = pd.concat([df for _, df in iter_training_batches('data/merged', since='2024-01-03', batch_size=64)])
+    full = prepare_training_frame(compute_features(merged))
+    full = full[full['datetime'] >= '2024-01-03']
+    key = ['Account', 'datetime', 'Closed PnL']
+    resumed = resumed.sort_values(key, ignore_index=True)
+    full = full.sort_values(key, ignore_index=True)
+    assert len(resumed) == len(full)
+    for col in feature_columns():
+        np.testing.assert_allclose(resumed[col].astype('float64'), full[col].astype('float64'), atol=1e-4)
+
+@pytest.mark.parametrize('kind', ['parquet', 'csv'])
+def test_batch_features_do_not_depend_on_batch_size(workdir, monkeypatch, kind):
+    if kind == 'csv':
+        monkeypatch.setattr(store, 'pq', None)
+    merged = make_merged(rows=600, days=4, seed=3)
+    path = save_merged(merged)
+    # Trades of one account at the same minute keep the store's order.
+    key = ['Account', 'datetime', 'Closed PnL', 'Leverage']
+    full = prepare_training_frame(compute_features(load_merged(path, columns=model.MODEL_COLUMNS)))
+    full = full.sort_values(key, ignore_index=True)
+    for batch_size in (1000, 97, 20):
+        batched = pd.concat([df for _, df in iter_training_batches(path, batch_size=batch_size)])
+        batched = batched.sort_values(key, ignore_index=True)
+        assert len(batched) == len(full)
+        for col in feature_columns():
+            np.testing.assert_allclose(batched[col].astype('float64'), full[col].astype('float64'), atol=1e-4)
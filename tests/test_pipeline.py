@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import pytest
+import utils
+from preprocess import TRADES_PATH, SENTIMENT_PATH
+import pipeline
+from conftest import make_merged
+from store import save_merged
+from pipeline import (PIPELINE_MANIFEST, PIPELINE_SNAPSHOT, STAGES, Stage, select_stages, stage_fingerprint,
+                      run_pipeline, run_stage, write_stage_snapshot)
+
+def test_select_stages_adds_upstream_stages():
+    assert [stage.name for stage in select_stages(['sweep'])] == ['preprocess', 'sweep']
+    assert [stage.name for stage in select_stages()] == [stage.name for stage in STAGES]
+    with pytest.raises(ValueError):
+        select_stages(['nope'])
+
+def test_fingerprint_follows_imported_modules(workdir, monkeypatch):
+    # A change to a module the stage only imports indirectly (sweep ->
+    # preprocess -> rollup) makes the stage stale.
+    src = workdir / 'src'
+    shutil.copytree(utils.SRC_DIR, src, ignore=shutil.ignore_patterns('__pycache__'))
+    monkeypatch.setattr(utils, 'SRC_DIR', str(src))
+    sweep = {stage.name: stage for stage in STAGES}['sweep']
+    before = stage_fingerprint(sweep)
+    with open(src / 'rollup.py', 'a') as fh:
+        fh.write('\n# changed\n')
+    assert stage_fingerprint(sweep) != before
+
+def test_pipeline_runs_stale_stages_in_processes_and_skips_fresh_ones(workdir, write_trades, write_sentiment):
+    write_sentiment(SENTIMENT_PATH, [('2024-01-01', 20, 'Fear'), ('2024-01-02', 50, 'Neutral'), ('2024-01-03', 80, 'Greed')])
+    rows = [('0xa', 'BTC', 100.0, 100.0 + i, 'BUY' if i % 2 else 'SELL', f'0{1 + i % 3}-01-2024 1{i % 10}:00', i - 20)
+            for i in range(60)]
+    write_trades(TRADES_PATH, rows)
+    status = run_pipeline(['sweep'])
+    assert status == {'preprocess': 'done', 'sweep': 'done'}
+    assert set(json.load(open(PIPELINE_MANIFEST))) == {'preprocess', 'sweep'}
+    assert run_pipeline(['sweep']) == {'preprocess': 'fresh', 'sweep': 'fresh'}
+    os.remove('output/sentiment_sweep.csv')
+    assert run_pipeline(['sweep'], dry_run=True) == {'preprocess': 'fresh', 'sweep': 'stale'}
+    assert run_pipeline(['sweep']) == {'preprocess': 'fresh', 'sweep': 'done'}
+    assert not os.path.exists(PIPELINE_SNAPSHOT)
+
+def test_failed_stage_blocks_its_dependents(workdir):
+    # No raw inputs: preprocess writes nothing, so it fails.
+    assert run_pipeline(['sweep', 'cluster']) == {'preprocess': 'failed', 'sweep': 'blocked', 'cluster': 'blocked'}
+    assert not os.path.exists(PIPELINE_MANIFEST)
+
+def test_stages_share_one_snapshot_of_the_store(workdir, monkeypatch):
+    merged = make_merged(rows=120)
+    save_merged(merged)
+    seen = {}
+    stages = [Stage(name, lambda df, name=name: seen.setdefault(name, df), name, columns=columns)
+              for name, columns in [('a', ['Account', 'Closed PnL']), ('b', ['datetime', 'classification'])]]
+    monkeypatch.setattr(pipeline, 'STAGES', stages)
+    snapshot, columns = write_stage_snapshot(stages)
+    assert columns == ['Account', 'Closed PnL', 'datetime', 'classification']
+    # The stages read the snapshot, not the store.
+    monkeypatch.setattr(pipeline, 'load_merged', lambda *args, **kwargs: pytest.fail("store re-read"))
+    run_stage('a', snapshot)
+    run_stage('b', snapshot)
+    assert seen['a'].columns.tolist() == ['Account', 'Closed PnL'] and len(seen['a']) == 120
+    assert sorted(seen['a']['Closed PnL']) == sorted(merged['Closed PnL'])
+    assert seen['b']['classification'].dtype == merged['classification'].dtype
@@ -0,0 +1,269 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from store import load_merged
+from preprocess import (TRADES_PATH, SENTIMENT_PATH, load_and_clean_trades, iter_clean_trades,
+                        parse_trade_timestamps, merge_datasets, merge_stream, get_scheme, band_sentiment,
+                        classify_sentiment, load_and_clean_sentiment, load_state, run_full, run_incremental,
+                        sentiment_fingerprints, sentiment_changed_since, merge_by_datetime, run_files,
+                        load_trade_files)
+
+TRADES = [
+    ('0xa', 'BTC', 100.0, 1000.0, 'BUY', '01-01-2024 10:15', '5.5'),
+    ('0xb', 'ETH', 50.0, 200.0, 'SELL', '01-01-2024 10:15', 'oops'),
+    ('0xa', 'BTC', 200.0, 400.0, 'SELL', '02-01-2024 23:59', '-1.25'),
+    ('0xc', 'SOL', 10.0, 30.0, 'BUY', '03-01-2024 00:00', '0'),
+    ('0xb', 'ETH', 40.0, 80.0, 'BUY', '03-01-2024 00:00', ''),
+]
+
+def test_load_and_clean_trades_schema(workdir, write_trades):
+    path = write_trades('data/trades.csv', TRADES)
+    df = load_and_clean_trades(path)
+    assert list(df.columns) == ['Account', 'Coin', 'Execution Price', 'Size USD', 'Side', 'datetime',
+                                'Closed PnL', 'Leverage']
+    assert isinstance(df['Account'].dtype, pd.CategoricalDtype)
+    assert df['Execution Price'].dtype == 'float32'
+    assert df['Closed PnL'].dtype == 'float64'
+    assert df['datetime'].iloc[2] == pd.Timestamp('2024-01-02 23:59')
+    assert df['Closed PnL'].isna().tolist() == [False, True, False, False, True]
+    np.testing.assert_allclose(df['Leverage'], [10.0, 4.0, 2.0, 3.0, 2.0])
+
+def test_chunked_load_matches_full_load(workdir, write_trades):
+    path = write_trades('data/trades.csv', TRADES)
+    chunks = list(load_and_clean_trades(path, chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    combined = pd.concat(chunks, ignore_index=True)
+    full = load_and_clean_trades(path)
+    for col in ['Execution Price', 'Size USD', 'datetime', 'Closed PnL', 'Leverage']:
+        pd.testing.assert_series_equal(combined[col], full[col])
+    assert combined['Account'].astype(str).tolist() == full['Account'].astype(str).tolist()
+
+def test_iter_clean_trades_is_lazy(workdir, write_trades):
+    path = write_trades('data/trades.csv', TRADES)
+    chunks = iter_clean_trades(path, chunksize=4)
+    assert len(next(chunks)) == 4
+    assert len(next(chunks)) == 1
+
+def test_parse_trade_timestamps_keeps_missing_values():
+    values = pd.Series(['01-01-2024 10:15', None, '01-01-2024 10:15'], dtype='string', index=[5, 6, 7])
+    parsed = parse_trade_timestamps(values)
+    assert list(parsed.index) == [5, 6, 7]
+    assert parsed.iloc[0] == parsed.iloc[2] == pd.Timestamp('2024-01-01 10:15')
+    assert pd.isna(parsed.iloc[1])
+
+def sentiment_frame(times, scores):
+    return pd.DataFrame({'datetime': pd.to_datetime(times), 'sentiment_score': scores,
+                         'label': [1.0] * len(scores)})
+
+def trades_frame(times):
+    return pd.DataFrame({'datetime': pd.to_datetime(times)}, index=np.arange(10, 10 + len(times)))
+
+def test_merge_datasets_is_an_as_of_join():
+    sentiment = sentiment_frame(['2024-01-03', '2024-01-01', '2024-01-02'], [30.0, 10.0, 20.0])
+    trades = trades_frame(['2023-12-31 23:00', '2024-01-01 00:00', '2024-01-01 17:45', '2024-01-02 05:00',
+                           '2024-01-03 00:59', '2024-01-03 01:00', None])
+    merged = merge_datasets(trades, sentiment)
+    assert list(merged.index) == list(trades.index)
+    # Before the first reading and after the last reading's hour: no match.
+    expected = [np.nan, 10.0, 10.0, 20.0, 30.0, np.nan, np.nan]
+    np.testing.assert_array_equal(merged['sentiment_score'].to_numpy(), expected)
+
+def test_merge_datasets_keeps_nan_scores():
+    sentiment = sentiment_frame(['2024-01-01', '2024-01-02'], [np.nan, 20.0])
+    merged = merge_datasets(trades_frame(['2024-01-01 12:00', '2024-01-02 00:30']), sentiment)
+    assert merged['sentiment_score'].isna().tolist() == [True, False]
+
+def test_merge_datasets_with_empty_sentiment():
+    sentiment = sentiment_frame([], [])
+    merged = merge_datasets(trades_frame(['2024-01-01 12:00', '2024-01-02 00:30']), sentiment)
+    assert merged['sentiment_score'].isna().all()
+    assert merged['label'].isna().all()
+
+def test_merge_datasets_tolerance_and_resolution():
+    sentiment = sentiment_frame(['2024-01-01', '2024-01-03'], [10.0, 30.0])
+    trades = trades_frame(['2024-01-01 05:00', '2024-01-02 12:00', '2024-01-03 00:30'])
+    merged = merge_datasets(trades.copy(), sentiment, tolerance='1D')
+    np.testing.assert_array_equal(merged['sentiment_score'].to_numpy(), [10.0, np.nan, 30.0])
+    # Unfloored, a trade half an hour after the last reading is past it.
+    merged = merge_datasets(trades.copy(), sentiment, resolution=None)
+    np.testing.assert_array_equal(merged['sentiment_score'].to_numpy(), [10.0, 10.0, np.nan])
+
+def test_merge_stream_joins_every_chunk():
+    sentiment = sentiment_frame(['2024-01-02', '2024-01-01'], [20.0, 10.0])
+    chunks = [trades_frame(['2024-01-01 01:00']), trades_frame(['2024-01-02 00:10', '2023-01-01 00:00'])]
+    merged = list(merge_stream(chunks, sentiment))
+    assert merged[0]['sentiment_score'].tolist() == [10.0]
+    np.testing.assert_array_equal(merged[1]['sentiment_score'].to_numpy(), [20.0, np.nan])
+
+def test_classify_sentiment_bands():
+    assert [classify_sentiment(score) for score in (0, 39.9, 40, 59, 60, 100)] == \
+        ['Fear', 'Fear', 'Neutral', 'Neutral', 'Greed', 'Greed']
+    assert classify_sentiment(25, '5-class') == 'Fear'
+    assert classify_sentiment(80, '5-class') == 'Extreme Greed'
+
+@pytest.mark.parametrize('score', [float('nan'), np.nan, None, pd.NA])
+def test_classify_sentiment_missing_score(score):
+    assert classify_sentiment(score) is None
+
+def test_band_sentiment_matches_classify_sentiment():
+    scores = pd.Series([10.0, np.nan, 40.0, 75.0], index=[3, 1, 2, 0])
+    bands = band_sentiment(scores)
+    assert list(bands.index) == [3, 1, 2, 0]
+    assert bands.cat.categories.tolist() == ['Fear', 'Neutral', 'Greed']
+    assert [None if pd.isna(band) else band for band in bands] == [classify_sentiment(s) for s in scores]
+
+def test_band_sentiment_custom_scheme():
+    bands = band_sentiment([5, 50, 95], ([10, 90], ['low', 'mid', 'high']))
+    assert list(bands) == ['low', 'mid', 'high']
+    with pytest.raises(ValueError):
+        get_scheme(([10], ['only']))
+    with pytest.raises(ValueError):
+        get_scheme('7-class')
+
+INCREMENTAL_TRADES = [
+    ('0xa', 'BTC', 100.0, 1000.0, 'BUY', '01-01-2024 10:15', '5'),
+    ('0xb', 'ETH', 50.0, 200.0, 'SELL', '02-01-2024 09:00', '-2'),
+    ('0xa', 'BTC', 100.0, 300.0, 'SELL', '03-01-2024 12:30', '1'),
+    ('0xc', 'SOL', 10.0, 30.0, 'BUY', '04-01-2024 00:20', '0'),
+]
+READINGS = [('2024-01-01', 20, 'Fear'), ('2024-01-02', 50, 'Neutral'), ('2024-01-03', 70, 'Greed')]
+
+def stored_scores():
+    df = load_merged(columns=['datetime', 'sentiment_score']).sort_values('datetime', ignore_index=True)
+    return df['sentiment_score'].tolist()
+
+def test_incremental_appends_only_new_rows(workdir, write_trades, write_sentiment):
+    write_trades(TRADES_PATH, INCREMENTAL_TRADES[:2])
+    write_sentiment(SENTIMENT_PATH, READINGS)
+    run_full()
+    write_trades(TRADES_PATH, INCREMENTAL_TRADES)
+    with open(TRADES_PATH, 'a') as fh:
+        fh.write('0xd,BTC,1.0,2.0,BUY,04-01-2024 09')
+    run_incremental()
+    assert len(load_merged()) == 4
+    state = load_state()
+    assert state['trades']['last_datetime'] == '2024-01-04T00:20:00'
+    # The partial last row is left for the next run.
+    assert state['trades']['offset'] < os.path.getsize(TRADES_PATH)
+
+def test_incremental_backfills_corrected_and_new_readings(workdir, write_trades, write_sentiment):
+    write_trades(TRADES_PATH, INCREMENTAL_TRADES)
+    write_sentiment(SENTIMENT_PATH, READINGS)
+    run_full()
+    # The 04-01 trade is past the last reading and unmatched.
+    assert np.isnan(stored_scores()[3])
+    # Correct an older reading and publish a new one.
+    write_sentiment(SENTIMENT_PATH, [READINGS[0], ('2024-01-02', 55, 'Greed'), READINGS[2],
+                                     ('2024-01-04', 80, 'Greed')])
+    run_incremental()
+    assert stored_scores() == [20.0, 55.0, 70.0, 80.0]
+    assert sentiment_changed_since(load_state()['sentiment'], load_and_clean_sentiment(SENTIMENT_PATH)) is None
+
+def test_sentiment_changed_since():
+    sentiment = sentiment_frame(['2024-01-01', '2024-01-02', '2024-01-03'], [10.0, 20.0, 30.0])
+    state = {'last_datetime': '2024-01-03T00:00:00', 'readings': sentiment_fingerprints(sentiment)}
+    assert sentiment_changed_since(state, sentiment) is None
+    corrected = sentiment.assign(sentiment_score=[10.0, 25.0, 30.0])
+    assert sentiment_changed_since(state, corrected) == pd.Timestamp('2024-01-02')
+    removed = sentiment.iloc[[0, 2]]
+    assert sentiment_changed_since(state, removed) == pd.Timestamp('2024-01-02')
+    extended = pd.concat([sentiment, sentiment_frame(['2024-01-05'], [50.0])], ignore_index=True)
+    assert sentiment_changed_since(state, extended) == pd.Timestamp('2024-01-03')
+    assert sentiment_changed_since({}, sentiment) == pd.Timestamp('2024-01-01')
+
+def test_merge_by_datetime_orders_across_frames():
+    first = pd.DataFrame({'datetime': pd.to_datetime(['2024-01-01', '2024-01-03', '2024-01-05', None]),
+                          'Account': ['a', 'a', 'a', 'a']})
+    second = pd.DataFrame({'datetime': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04']),
+                           'Account': ['b', 'b', 'b']})
+    chunks = list(merge_by_datetime([first, second.iloc[:0], second], chunksize=2))
+    assert len(chunks) > 1
+    merged = pd.concat(chunks, ignore_index=True)
+    assert merged['Account'].astype(str).tolist() == ['a', 'b', 'a', 'b', 'b', 'a', 'a']
+    assert merged['datetime'].iloc[:-1].is_monotonic_increasing
+    assert pd.isna(merged['datetime'].iloc[-1])
+
+def test_run_files_writes_in_time_order(workdir, write_trades, write_sentiment):
+    # The later file sorts first by name.
+    write_trades('data/parts/a.csv', [INCREMENTAL_TRADES[3], INCREMENTAL_TRADES[1]])
+    write_trades('data/parts/b.csv', [INCREMENTAL_TRADES[2], INCREMENTAL_TRADES[0]])
+    write_sentiment(SENTIMENT_PATH, READINGS)
+    run_files('data/parts', workers=1)
+    loaded = load_merged()
+    assert loaded['datetime'].is_monotonic_increasing
+    assert len(loaded) == 4
+    state = load_state()
+    assert state['trades']['path'] == 'data/parts' and state['trades']['offset'] is None
+    assert state['trades']['last_datetime'] == '2024-01-04T00:20:00'
+    assert load_trade_files('data/parts/*.csv', workers=1, verbose=False)['datetime'].is_monotonic_increasing
+
+def test_run_files_watermark_forces_a_rebuild(workdir, write_trades, write_sentiment):
+    write_trades('data/parts/a.csv', INCREMENTAL_TRADES[:2])
+    write_trades(TRADES_PATH, INCREMENTAL_TRADES)
+    write_sentiment(SENTIMENT_PATH, READINGS)
+    run_files('data/parts', workers=1)
+    run_incremental()
+    assert len(load_merged()) == 4
+
+def test_merge_datasets_keeps_non_numeric_columns():
+    sentiment = sentiment_frame(['2024-01-01', '2024-01-02'], [10.0, 20.0])
+    sentiment['source'] = ['api', 'csv']
+    sentiment['band'] = pd.Categorical(['Fear', 'Greed'], categories=['Fear', 'Neutral', 'Greed'])
+    merged = merge_datasets(trades_frame(['2024-01-01 12:00', '2024-01-02 00:30', '2023-12-31 00:00']), sentiment)
+    assert merged['source'].tolist()[:2] == ['api', 'csv'] and pd.isna(merged['source'].iloc[2])
+    assert merged['band'].cat.categories.tolist() == ['Fear', 'Neutral', 'Greed']
+    assert merged['band'].tolist()[:2] == ['Fear', 'Greed'] and pd.isna(merged['band'].iloc[2])
+    assert merged['sentiment_score'].dtype == 'float64'
+    empty = merge_datasets(trades_frame(['2024-01-01 12:00']), sentiment.iloc[:0])
+    assert isinstance(empty['band'].dtype, pd.CategoricalDtype) and empty['band'].isna().all()
+    assert empty['sentiment_score'].isna().all()
+
+def test_scheme_change_relabels_the_store(workdir, write_trades, write_sentiment):
+    write_trades(TRADES_PATH, INCREMENTAL_TRADES)
+    write_sentiment(SENTIMENT_PATH, READINGS)
+    run_full()
+    assert load_state()['scheme'] == '3-class'
+    run_incremental(scheme='5-class')
+    assert load_state()['scheme'] == '5-class'
+    df = load_merged(columns=['datetime', 'classification']).sort_values('datetime', ignore_index=True)
+    assert df['classification'].tolist()[:2] == ['Extreme Fear', 'Neutral']
+    assert df['classification'].cat.categories.tolist()[0] == 'Extreme Fear'
+    assert len(df) == 4
+
+def test_incremental_rebuilds_a_replaced_trades_file(workdir, write_trades, write_sentiment):
+    write_trades(TRADES_PATH, INCREMENTAL_TRADES[:2])
+    write_sentiment(SENTIMENT_PATH, READINGS)
+    run_full()
+    assert load_state()['trades']['identity']['inode'] == os.stat(TRADES_PATH).st_ino
+    # A regenerated file at least as long as the offset: appending from the
+    # old offset would skip its first rows.
+    write_trades(TRADES_PATH, [INCREMENTAL_TRADES[3], INCREMENTAL_TRADES[2], INCREMENTAL_TRADES[1]])
+    run_incremental()
+    df = load_merged(columns=['datetime', 'Coin'])
+    assert sorted(df['Coin'].astype(str)) == ['BTC', 'ETH', 'SOL']
+
+def test_merge_by_datetime_pulls_chunks_lazily():
+    pulled = []
+
+    def source(name, times, size):
+        df = pd.DataFrame({'datetime': pd.to_datetime(times), 'Account': name})
+        for start in range(0, len(df), size):
+            pulled.append((name, start))
+            yield df.iloc[start:start + size]
+
+    days = pd.date_range('2024-01-01', periods=12, freq='D')
+    merged = merge_by_datetime([source('a', days[::2], 2), source('b', days[1::2], 2)], chunksize=2)
+    first = next(merged)
+    assert first['datetime'].is_monotonic_increasing
+    # Only a's exhausted head was replaced; b's second chunk is not read yet.
+    assert pulled == [('a', 0), ('b', 0), ('a', 2)]
+    rest = pd.concat([first, *merged], ignore_index=True)
+    assert rest['datetime'].tolist() == list(days)
+
+def test_merge_by_datetime_keeps_ties_across_chunk_boundaries():
+    day = pd.Timestamp('2024-01-01')
+    first = [pd.DataFrame({'datetime': [day], 'Account': 'a'}), pd.DataFrame({'datetime': [day], 'Account': 'a'})]
+    second = pd.DataFrame({'datetime': [day], 'Account': ['b']})
+    merged = pd.concat(list(merge_by_datetime([iter(first), second], chunksize=1)), ignore_index=True)
+    assert merged['Account'].astype(str).tolist() == ['a', 'a', 'b']
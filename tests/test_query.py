@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from conftest import make_merged
+from query import TradeIndex, page_count
+
+def scan(df, equals, ranges):
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in equals.items():
+        mask &= df[col].isin(values).to_numpy()
+    for col, (low, high) in ranges.items():
+        if low is not None:
+            mask &= (df[col] >= low).to_numpy()
+        if high is not None:
+            mask &= (df[col] <= high).to_numpy()
+    return np.flatnonzero(mask)
+
+def test_queries_match_a_full_scan():
+    df = make_merged(rows=1000, seed=2)
+    index = TradeIndex(df)
+    day = np.datetime64(df['datetime'].iloc[500])
+    cases = [
+        ({'Coin': ['BTC']}, {}),
+        ({'Account': ['0xa', '0xc'], 'Coin': ['ETH', 'SOL']}, {}),
+        ({}, {'Closed PnL': (0.0, None)}),
+        ({'classification': index.categories('classification')[:1]}, {'Closed PnL': (-20.0, 20.0), 'datetime': (None, day)}),
+        ({'Coin': ['DOGE']}, {'Closed PnL': (0.0, None)}),
+    ]
+    for equals, ranges in cases:
+        np.testing.assert_array_equal(index.query(equals, ranges), scan(df, equals, ranges))
+    np.testing.assert_array_equal(index.query(), np.arange(len(df)))
+    assert index.equal_count('Coin', ['BTC', 'DOGE']) == (df['Coin'] == 'BTC').sum()
+
+def test_categories_only_lists_present_values():
+    df = make_merged(rows=50)
+    df['Coin'] = pd.Categorical(df['Coin'].astype(str), categories=['BTC', 'ETH', 'SOL', 'XRP'])
+    assert 'XRP' not in TradeIndex(df).categories('Coin')
+
+def test_pages_are_sorted_and_bounded():
+    df = make_merged(rows=250)
+    index = TradeIndex(df)
+    rows = index.query({'Side': None}, {'Closed PnL': (None, None)})
+    assert len(rows) == 250
+    first = index.page(rows, 0, 100, sort_by='Closed PnL', ascending=False)
+    last = index.page(rows, 2, 100, sort_by='Closed PnL', ascending=False)
+    assert len(first) == 100 and len(last) == 50
+    assert first['Closed PnL'].is_monotonic_decreasing
+    assert first['Closed PnL'].iloc[0] == df['Closed PnL'].max()
+    assert page_count(250) == 3 and page_count(0) == 1
@@ -0,0 +1,68 @@
+import threading
+import time
+from refresh import BackgroundLoader
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+class Source:
+    # A fingerprint the test bumps, and a load that can be held back.
+    def __init__(self):
+        self.version = 1
+        self.loads = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def fingerprint(self):
+        return self.version
+
+    def load(self):
+        self.release.wait(5)
+        if self.fail:
+            raise ValueError("broken input")
+        self.loads += 1
+        return {'loaded': self.loads}
+
+def test_first_call_loads_and_unchanged_inputs_are_not_reloaded():
+    source = Source()
+    loader = BackgroundLoader(source.load, source.fingerprint, interval=0)
+    assert loader.get() == (1, {'loaded': 1})
+    for _ in range(5):
+        assert loader.get() == (1, {'loaded': 1})
+    assert source.loads == 1
+
+def test_changed_inputs_reload_in_the_background():
+    source = Source()
+    loader = BackgroundLoader(source.load, source.fingerprint, interval=0)
+    loader.get()
+    source.release.clear()
+    source.version = 2
+    # The old snapshot is served while the new one is built, by one thread.
+    assert loader.get() == (1, {'loaded': 1})
+    assert loader.get() == (1, {'loaded': 1})
+    source.release.set()
+    wait_until(lambda: not loader.reloading)
+    assert loader.get() == (2, {'loaded': 2})
+    assert source.loads == 2
+
+def test_checks_wait_for_the_interval():
+    source = Source()
+    loader = BackgroundLoader(source.load, source.fingerprint, interval=60)
+    loader.get()
+    source.version = 2
+    assert loader.get()[0] == 1
+    assert not loader.reloading
+
+def test_failed_reload_keeps_the_previous_snapshot():
+    source = Source()
+    loader = BackgroundLoader(source.load, source.fingerprint, interval=0)
+    loader.get()
+    source.fail, source.version = True, 2
+    loader.get()
+    wait_until(lambda: not loader.reloading)
+    assert loader.get()[1] == {'loaded': 1}
+    assert 'broken input' in loader.error
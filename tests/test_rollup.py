@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import preprocess
+from conftest import make_merged
+from rollup import (MIN_ABS_PNL, RELATIVE_ACCURACY, build_cube, merge_cubes, save_cube, load_cube, rebuild_cube,
+                    pnl_bins, bin_values, box_summary, density_summary, period_changes, trades_by_sentiment,
+                    top_accounts)
+from store import save_merged
+
+def cube_totals(cube):
+    return cube['cells']['trades'].sum(), cube['hist']['count'].sum(), round(cube['cells']['pnl_sum'].sum(), 6)
+
+def sorted_cells(cells):
+    keys = ['classification', 'date', 'Coin', 'Account']
+    cells = cells.astype({key: str for key in keys})
+    return cells.sort_values(keys).reset_index(drop=True)[keys + ['trades', 'wins', 'pnl_sum', 'pnl_min', 'pnl_max']]
+
+def test_trades_with_missing_sentiment_keep_their_cell():
+    df = make_merged(rows=30)
+    df.loc[df.index[:3], 'classification'] = np.nan
+    cube = build_cube(df)
+    assert cube_totals(cube)[:2] == (30, 30)
+    assert cube['cells']['classification'].isna().sum() >= 1
+    assert merge_cubes(cube, cube)['cells']['trades'].sum() == 60
+
+def test_merged_chunk_cubes_match_one_cube():
+    df = make_merged(rows=400)
+    whole = build_cube(df)
+    merged = merge_cubes(*(build_cube(df.iloc[i:i + 100]) for i in range(0, len(df), 100)))
+    pd.testing.assert_frame_equal(sorted_cells(merged['cells']), sorted_cells(whole['cells']), check_dtype=False)
+    assert cube_totals(merged) == cube_totals(whole)
+    assert merge_cubes() is None
+    assert merge_cubes(None, whole) is whole
+
+def test_process_trades_folds_cubes_every_few_chunks(workdir, monkeypatch):
+    df = make_merged(rows=300)
+    trades = df.drop(columns=['sentiment_score', 'label', 'classification'])
+    sentiment = pd.DataFrame({'datetime': pd.date_range('2024-01-01', periods=6, freq='D'),
+                              'sentiment_score': np.linspace(10, 90, 6), 'label': np.nan})
+    calls = []
+    def counting_merge(*cubes):
+        calls.append(len(cubes))
+        return merge_cubes(*cubes)
+    monkeypatch.setattr(preprocess, 'merge_cubes', counting_merge)
+    monkeypatch.setattr(preprocess, 'CUBE_MERGE_CHUNKS', 4)
+    chunks = [trades.iloc[i:i + 50].copy() for i in range(0, len(trades), 50)]
+    rows, _ = preprocess.process_trades(chunks, sentiment, append=False)
+    assert rows == 300
+    # The (empty) running cube plus four chunk cubes, then the other two.
+    assert calls == [5, 3]
+    assert load_cube()['cells']['trades'].sum() == 300
+
+def test_pnl_bins_are_within_relative_accuracy():
+    values = np.concatenate([np.geomspace(MIN_ABS_PNL, 1e6, 500), -np.geomspace(MIN_ABS_PNL, 1e6, 500)])
+    approx = bin_values(pnl_bins(values))
+    assert np.all(np.abs(approx - values) <= RELATIVE_ACCURACY * np.abs(values) + 1e-12)
+    assert list(pnl_bins([0.0, MIN_ABS_PNL / 2, np.nan])) == [0, 0, 0]
+
+def test_box_and_density_summaries_follow_the_data():
+    df = make_merged(rows=2000, seed=1)
+    cube = build_cube(df)
+    summary = {stats['label']: stats for stats in box_summary(cube['hist'], cube['cells'])}
+    for label, group in df.groupby('classification', observed=True):
+        stats = summary[str(label)]
+        pnl = group['Closed PnL']
+        assert stats['q1'] <= stats['median'] <= stats['q3']
+        assert abs(stats['median'] - pnl.median()) <= max(5.0, 0.1 * pnl.abs().median())
+        assert np.isclose(stats['mean'], pnl.mean())
+        assert len(stats['outliers']) <= 50
+    density = density_summary(cube['hist'], bins=40)
+    assert len(density['centers']) == 40
+    for group in density['groups']:
+        # Nearly all of each group's mass falls inside the shared span.
+        assert 0.9 <= (group['density'] * np.diff(density['centers']).mean()).sum() <= 1.01
+
+def test_dashboard_queries():
+    df = make_merged(rows=500, days=3)
+    cells = build_cube(df)['cells']
+    assert trades_by_sentiment(cells).sum() == 500
+    assert np.isclose(top_accounts(cells, 2).iloc[0], df.groupby('Account', observed=True)['Closed PnL'].sum().max())
+    days = df['datetime'].dt.floor('D')
+    latest, previous = df[days == days.max()], df[days == sorted(days.unique())[-2]]
+    changes = period_changes(cells)
+    expected = (latest['Closed PnL'].mean() - previous['Closed PnL'].mean()) / abs(previous['Closed PnL'].mean()) * 100
+    assert np.isclose(changes['avg_pnl'], expected)
+    assert period_changes(cells[cells['date'] == cells['date'].max()]) == {'active_traders': None, 'avg_pnl': None}
+
+def test_saved_cube_round_trips_and_rebuilds(workdir):
+    df = make_merged(rows=300)
+    cube = build_cube(df)
+    save_cube(cube)
+    loaded = load_cube()
+    pd.testing.assert_frame_equal(sorted_cells(loaded['cells']), sorted_cells(cube['cells']), check_dtype=False)
+    path = save_merged(df, path='data/merged_data.csv')
+    rebuilt = rebuild_cube(path, path='data/rebuilt')
+    assert cube_totals(rebuilt) == cube_totals(cube)
@@ -0,0 +1,88 @@
+import json
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+from store import save_merged, load_merged
+from score import SCORED_DATASET, predict_frame, score_dataset, MicroBatcher, ScoreServer, make_handler
+from features import compute_features
+from model import MODEL_COLUMNS
+from conftest import make_merged
+
+class SumModel:
+    # Stand-in for a fitted model: predicts the sum of the features.
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return np.asarray(X, dtype='float64').sum(axis=1)
+
+def test_predict_frame_aligns_and_fills_features():
+    model = SumModel()
+    frame = pd.DataFrame({'Leverage': [1.0, np.nan], 'unused': [100.0, 100.0], 'sentiment_score': [2.0, 3.0]})
+    labels, pnl = predict_frame(frame, model, model)
+    np.testing.assert_array_equal(labels, [3.0, 3.0])
+
+def test_micro_batcher_groups_concurrent_requests():
+    model = SumModel()
+    batcher = MicroBatcher(model, model, max_rows=1000, max_wait=0.05)
+    frames = [pd.DataFrame({'sentiment_score': [float(i)]}) for i in range(20)]
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(batcher.score, frames))
+    assert [float(labels[0]) for labels, _ in results] == [float(i) for i in range(20)]
+    stats = batcher.stats()
+    assert stats['requests'] == 20 and stats['rows'] == 20
+    assert stats['batches'] < 20
+    assert 'latency_p99_ms' in stats
+
+def test_micro_batcher_reports_errors():
+    class Broken:
+        def predict(self, X):
+            raise ValueError("bad input")
+
+    batcher = MicroBatcher(Broken(), Broken(), max_wait=0.001)
+    with pytest.raises(ValueError):
+        batcher.score(pd.DataFrame({'Leverage': [1.0]}))
+
+def test_http_endpoint():
+    model = SumModel()
+    server = ScoreServer(('127.0.0.1', 0), make_handler(MicroBatcher(model, model, max_wait=0.001)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        request = urllib.request.Request(url + '/score', data=json.dumps([{'Leverage': 2, 'sentiment_score': 5}]).encode(),
+                                         method='POST')
+        with urllib.request.urlopen(request) as response:
+            assert json.load(response) == {'label': [7.0], 'pnl': [7.0]}
+        with urllib.request.urlopen(url + '/metrics') as response:
+            assert json.load(response)['requests'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+class LabelModel(SumModel):
+    def predict(self, X):
+        return np.zeros(len(X), dtype='int64')
+
+def test_score_dataset(workdir, monkeypatch):
+    merged = make_merged(rows=150)
+    save_merged(merged)
+    monkeypatch.setattr('score.load_models', lambda *paths, prefer_packed=True: (LabelModel(), SumModel()))
+    score_dataset(batch_size=40)
+    scored = load_merged(SCORED_DATASET)
+    assert len(scored) == len(merged)
+    assert (scored['predicted_classification'].astype(str) == 'Fear').all()
+
+def test_score_dataset_features_do_not_depend_on_batch_size(workdir, monkeypatch):
+    save_merged(make_merged(rows=300, days=3, seed=5))
+    monkeypatch.setattr('score.load_models', lambda *paths, prefer_packed=True: (LabelModel(), SumModel()))
+    key = ['Account', 'datetime', 'Closed PnL', 'Coin']
+    full = compute_features(load_merged(columns=MODEL_COLUMNS + ['Coin']))
+    full = full.assign(expected=predict_frame(full, SumModel(), SumModel())[1]).sort_values(key, kind='mergesort')
+    for batch_size in (1000, 40, 7):
+        score_dataset(batch_size=batch_size)
+        scored = load_merged(SCORED_DATASET).sort_values(key, kind='mergesort')
+        np.testing.assert_allclose(scored['predicted_pnl'], full['expected'], rtol=1e-5)
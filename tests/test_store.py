@@ -0,0 +1,119 @@
+import os
+import pandas as pd
+import pytest
+import store
+from store import (MERGED_CSV, MERGED_DATASET, save_merged, load_merged, iter_merged, default_merged_path,
+                   iter_merged_by_time, rewrite_merged_since, csv_row_offset, write_snapshot, load_snapshot)
+
+def sorted_frame(df):
+    return df.sort_values(['datetime', 'Account', 'Closed PnL'], ignore_index=True)
+
+@pytest.fixture(params=['parquet', 'csv'])
+def store_path(request, workdir, monkeypatch):
+    if request.param == 'csv':
+        monkeypatch.setattr(store, 'pq', None)
+    return MERGED_DATASET if request.param == 'parquet' else MERGED_CSV
+
+def test_save_and_load_round_trip(store_path, merged_df):
+    assert save_merged(merged_df) == store_path
+    assert default_merged_path() == store_path
+    loaded = sorted_frame(load_merged())
+    expected = sorted_frame(merged_df)
+    assert sorted(loaded.columns) == sorted(merged_df.columns)
+    assert loaded['Coin'].astype(str).tolist() == expected['Coin'].astype(str).tolist()
+    pd.testing.assert_series_equal(loaded['Closed PnL'], expected['Closed PnL'])
+    pd.testing.assert_series_equal(loaded['datetime'], expected['datetime'], check_dtype=False)
+    assert (loaded['classification'].astype(str) == expected['classification'].astype(str)).all()
+
+def test_load_projects_and_filters(store_path, merged_df):
+    save_merged(merged_df)
+    loaded = load_merged(columns=['datetime', 'Closed PnL'], start='2024-01-02', end='2024-01-03', coins=['BTC'])
+    assert loaded.columns.tolist() == ['datetime', 'Closed PnL']
+    mask = ((merged_df['datetime'] >= '2024-01-02') & (merged_df['datetime'] < '2024-01-04')
+            & (merged_df['Coin'] == 'BTC'))
+    assert len(loaded) == mask.sum()
+    assert sorted(loaded['Closed PnL']) == sorted(merged_df.loc[mask, 'Closed PnL'])
+
+def test_append_and_overwrite(store_path, merged_df):
+    save_merged(merged_df.iloc[:100])
+    save_merged(merged_df.iloc[100:], append=True)
+    assert len(load_merged()) == len(merged_df)
+    save_merged(merged_df.iloc[:10])
+    assert len(load_merged()) == 10
+
+def test_iter_merged_batches(store_path, merged_df):
+    save_merged(merged_df)
+    batches = list(iter_merged(columns=['Closed PnL'], batch_size=64))
+    assert sum(len(batch) for batch in batches) == len(merged_df)
+    assert all(batch.columns.tolist() == ['Closed PnL'] for batch in batches)
+
+def test_partition_layout(workdir, merged_df):
+    save_merged(merged_df)
+    days = sorted(name for name in os.listdir(MERGED_DATASET) if name.startswith('date='))
+    assert days == [f'date=2024-01-0{day}' for day in range(1, 6)]
+    assert sorted(os.listdir(os.path.join(MERGED_DATASET, days[0]))) == ['Coin=BTC', 'Coin=ETH', 'Coin=SOL']
+
+def flag_rows(df):
+    return df.assign(**{'Closed PnL': -1.0})
+
+def test_rewrite_merged_since(store_path, merged_df):
+    save_merged(merged_df)
+    rewritten = rewrite_merged_since('2024-01-04 13:00', flag_rows)
+    later = merged_df['datetime'] >= '2024-01-04'
+    assert rewritten == later.sum()
+    loaded = sorted_frame(load_merged())
+    assert len(loaded) == len(merged_df)
+    assert (loaded.loc[loaded['datetime'] >= '2024-01-04', 'Closed PnL'] == -1.0).all()
+    kept = loaded.loc[loaded['datetime'] < '2024-01-04', 'Closed PnL']
+    assert sorted(kept) == sorted(merged_df.loc[~later, 'Closed PnL'])
+    assert rewrite_merged_since('2025-01-01', flag_rows) == 0
+
+def test_failed_rewrite_keeps_the_store(store_path, merged_df):
+    save_merged(merged_df)
+
+    def fail(df):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        rewrite_merged_since('2024-01-02', fail)
+    assert len(load_merged()) == len(merged_df)
+    assert not os.path.exists(MERGED_DATASET + '.tmp')
+
+def test_csv_rewrite_only_touches_the_tail(workdir, merged_df, monkeypatch):
+    monkeypatch.setattr(store, 'pq', None)
+    save_merged(merged_df)
+    with open(MERGED_CSV, 'rb') as fh:
+        before = fh.read()
+    rewrite_merged_since('2024-01-03', flag_rows)
+    with open(MERGED_CSV, 'rb') as fh:
+        after = fh.read()
+    head = csv_row_offset(MERGED_CSV, int((merged_df['datetime'] < '2024-01-03').sum()))
+    assert after[:head] == before[:head]
+    assert after[head:] != before[head:]
+
+def test_iter_merged_by_time(store_path, merged_df):
+    # Stored out of time order, with an undated row.
+    shuffled = merged_df.sample(frac=1, random_state=0).reset_index(drop=True)
+    shuffled.loc[0, 'datetime'] = pd.NaT
+    save_merged(shuffled)
+    batches = list(iter_merged_by_time(columns=['datetime', 'Closed PnL'], batch_size=37))
+    assert [len(batch) for batch in batches[:-1]] == [37] * (len(batches) - 1)
+    merged = pd.concat(batches, ignore_index=True)
+    assert merged.columns.tolist() == ['datetime', 'Closed PnL']
+    assert len(merged) == len(merged_df)
+    assert merged['datetime'].iloc[:-1].is_monotonic_increasing and pd.isna(merged['datetime'].iloc[-1])
+    expected = load_merged(columns=['datetime', 'Closed PnL']).sort_values('datetime', kind='mergesort')
+    assert merged['Closed PnL'].tolist() == expected['Closed PnL'].tolist()
+    since = pd.concat(iter_merged_by_time(columns=['Closed PnL'], start='2024-01-03', batch_size=50))
+    assert len(since) == (shuffled['datetime'] >= '2024-01-03').sum()
+
+def test_snapshot_round_trip(store_path, merged_df):
+    save_merged(merged_df)
+    path = write_snapshot('data/snapshot.arrow', ['datetime', 'Account', 'Closed PnL', 'classification'],
+                          batch_size=64)
+    loaded = load_snapshot(path, ['Account', 'classification', 'Closed PnL'])
+    expected = load_merged(columns=['Account', 'classification', 'Closed PnL'])
+    assert loaded.columns.tolist() == ['Account', 'classification', 'Closed PnL']
+    assert isinstance(loaded['Account'].dtype, pd.CategoricalDtype)
+    assert loaded['classification'].dtype == expected['classification'].dtype
+    assert sorted(loaded['Closed PnL']) == sorted(expected['Closed PnL'])
@@ -0,0 +1,45 @@
+import os
+import numpy as np
+import pandas as pd
+from conftest import make_merged
+from store import save_merged
+from sweep import SWEEP_RESULTS, SWEEP_HEATMAP, score_profile, merge_profiles, sweep, best_pairs, threshold_grid, run_sweep
+
+def brute_force(df, lower, upper):
+    score, pnl = df['sentiment_score'], df['Closed PnL']
+    bands = {'fear': score < lower, 'neutral': (score >= lower) & (score < upper), 'greed': score >= upper}
+    return {band: (int(mask.sum()), pnl[mask].sum(), pnl[mask].mean()) for band, mask in bands.items()}
+
+def test_sweep_matches_brute_force_bands():
+    df = make_merged(rows=800, days=20, seed=5)
+    df.loc[df.index[:5], 'Leverage'] = np.nan
+    results = sweep(score_profile(df), threshold_grid(0, 100, 5)).set_index(['lower', 'upper'])
+    assert len(results) == 21 * 20 // 2
+    for lower, upper in [(0, 100), (25, 75), (45, 55), (10, 15)]:
+        row = results.loc[(lower, upper)]
+        for band, (trades, total, mean) in brute_force(df, lower, upper).items():
+            assert row[f'{band}_trades'] == trades
+            assert np.isclose(row[f'{band}_total_pnl'], total)
+            assert np.isclose(row[f'{band}_avg_pnl'], mean, equal_nan=True)
+
+def test_profiles_merge_across_batches():
+    df = make_merged(rows=500, days=10)
+    parts = [score_profile(df.iloc[i:i + 120]) for i in range(0, len(df), 120)]
+    pd.testing.assert_frame_equal(merge_profiles(parts), score_profile(df))
+    assert merge_profiles([]).empty
+
+def test_best_pairs_respect_min_trades():
+    df = make_merged(rows=600, days=15)
+    results = sweep(score_profile(df), threshold_grid(0, 100, 10))
+    top = best_pairs(results, min_trades=50, n=5)
+    assert len(top) <= 5 and (top['min_band_trades'] >= 50).all()
+    assert top['pnl_spread'].abs().is_monotonic_decreasing
+
+def test_run_sweep_writes_results_and_heatmap(workdir):
+    df = make_merged(rows=400, days=10)
+    path = save_merged(df, path='data/merged_data.csv')
+    results = run_sweep(path, step=10, min_trades=10)
+    assert len(results) == 55
+    assert os.path.exists(SWEEP_RESULTS) and os.path.exists(SWEEP_HEATMAP)
+    # A frame passed in (as the pipeline does) replaces the read.
+    assert run_sweep(path, step=20, df=df.iloc[:0])['fear_trades'].sum() == 0
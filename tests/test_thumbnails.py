@@ -0,0 +1,48 @@
+import os
+from PIL import Image
+from thumbnails import gallery, get_thumbnail, list_images
+
+def write_image(path, size=(1200, 600), mode='RGB'):
+    Image.new(mode, size, 'red' if mode != 'P' else 1).save(path)
+    return path
+
+def test_gallery_builds_small_thumbnails_once(tmp_path):
+    write_image(tmp_path / 'b.png')
+    write_image(tmp_path / 'a.jpg')
+    write_image(tmp_path / 'c.png', size=(300, 200), mode='P')
+    (tmp_path / 'notes.txt').write_text('not an image')
+    items = gallery(str(tmp_path), width=240)
+    assert [name for name, _, _, _ in items] == ['a.jpg', 'b.png', 'c.png']
+    assert all(error is None for _, _, _, error in items)
+    with Image.open(items[1][2]) as thumb:
+        assert thumb.size == (240, 120)
+    mtimes = [os.stat(thumb).st_mtime_ns for _, _, thumb, _ in items]
+    assert [os.stat(thumb).st_mtime_ns for _, _, thumb, _ in gallery(str(tmp_path), width=240)] == mtimes
+
+def test_changed_images_get_a_new_thumbnail_and_old_ones_are_pruned(tmp_path):
+    path = write_image(tmp_path / 'plot.png')
+    (first,) = [thumb for _, _, thumb, _ in gallery(str(tmp_path))]
+    write_image(path, size=(800, 800))
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    (second,) = [thumb for _, _, thumb, _ in gallery(str(tmp_path))]
+    assert second != first
+    assert not os.path.exists(first)
+    os.remove(path)
+    assert gallery(str(tmp_path)) == []
+    assert not os.path.exists(second)
+
+def test_broken_images_are_reported_not_raised(tmp_path):
+    (tmp_path / 'broken.png').write_bytes(b'not a png')
+    write_image(tmp_path / 'ok.png')
+    items = dict((name, (thumb, error)) for name, _, thumb, error in gallery(str(tmp_path)))
+    assert items['broken.png'][0] is None and items['broken.png'][1]
+    assert items['ok.png'][1] is None
+
+def test_thumbnail_cache_dir_and_listing(tmp_path):
+    assert list_images(str(tmp_path / 'missing')) == []
+    path = write_image(tmp_path / 'x.png', size=(100, 50))
+    thumb = get_thumbnail(str(path), width=480, cache_dir=str(tmp_path / 'cache'))
+    assert os.path.dirname(thumb) == str(tmp_path / 'cache')
+    with Image.open(thumb) as image:
+        # Small images are never upscaled.
+        assert image.size == (100, 50)
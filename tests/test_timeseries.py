@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from timeseries import dedupe_series, lttb_indices, minmax_indices, downsample_indices, reduce_series
+
+def step_frame():
+    # Sentiment repeated on every trade, changing once a day, with gaps.
+    times = pd.date_range('2024-01-01', periods=24 * 10, freq='h')
+    values = np.repeat([10.0, 20.0, 20.0, 50.0, 40.0, 40.0, 40.0, 80.0, 10.0, 30.0], 24)
+    values[5] = np.nan
+    return pd.DataFrame({'datetime': times.repeat(3), 'sentiment_score': values.repeat(3)})
+
+def test_dedupe_series_keeps_run_endpoints():
+    series = dedupe_series(step_frame())
+    assert series['datetime'].is_monotonic_increasing and series['datetime'].is_unique
+    # Each run of equal values is reduced to its two endpoints.
+    assert len(series) == 2 * 7
+    assert series['sentiment_score'].tolist()[:4] == [10.0, 10.0, 20.0, 20.0]
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype='float64')
+    y = np.sin(x / 50)
+    y[500] = 10.0
+    idx = lttb_indices(x, y, 50)
+    assert len(idx) == 50 and idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+    assert 500 in idx
+    np.testing.assert_array_equal(lttb_indices(x[:10], y[:10], 50), np.arange(10))
+
+def test_minmax_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(0)
+    x = pd.date_range('2024-01-01', periods=10_000, freq='min').to_numpy()
+    y = rng.normal(size=10_000)
+    idx = minmax_indices(x, y, 100)
+    assert idx[0] == 0 and idx[-1] == 9_999
+    assert y.argmax() in idx and y.argmin() in idx
+    assert len(idx) <= 2 * 100 + 2
+
+def test_downsample_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        downsample_indices(np.arange(10), np.arange(10), 5, method='nearest')
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_reduce_series_bounds_points(method):
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame({'datetime': pd.date_range('2024-01-01', periods=20_000, freq='min'),
+                          'sentiment_score': rng.normal(size=20_000).cumsum()})
+    reduced = reduce_series(frame, n_out=500, method=method)
+    assert 250 < len(reduced) <= 500
+    assert reduced['datetime'].iloc[0] == frame['datetime'].iloc[0]
+    assert reduced['datetime'].iloc[-1] == frame['datetime'].iloc[-1]
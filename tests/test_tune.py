@@ -0,0 +1,54 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import tune
+from store import save_merged
+from model import MODEL_FEATURES
+from tune import (TUNING_RESULTS, build_fold_cache, load_fold_cache, sample_candidates, successive_halving,
+                  run_tuning)
+from conftest import make_merged
+
+def test_fold_cache_is_built_once(workdir):
+    save_merged(make_merged(rows=300))
+    path = build_fold_cache(n_splits=3)
+    data = load_fold_cache(path)
+    assert data['X'].shape[1] == len(MODEL_FEATURES)
+    assert len(data['X']) == len(data['label']) == len(data['folds'])
+    assert set(np.unique(data['folds'])) <= {0, 1, 2}
+    mtime = os.path.getmtime(os.path.join(path, 'folds.npy'))
+    assert build_fold_cache(n_splits=3) == path
+    assert os.path.getmtime(os.path.join(path, 'folds.npy')) == mtime
+    assert build_fold_cache(n_splits=4) != path
+
+def test_fold_cache_follows_the_feature_code(workdir, monkeypatch):
+    save_merged(make_merged(rows=300))
+    path = build_fold_cache(n_splits=3)
+    monkeypatch.setattr(tune, 'code_fingerprint', lambda *modules: 'edited' + ','.join(modules))
+    assert build_fold_cache(n_splits=3) != path
+
+def test_sample_candidates_are_distinct():
+    candidates = sample_candidates(20)
+    assert len({json.dumps(c, sort_keys=True, default=str) for c in candidates}) == 20
+    assert sample_candidates(20) == candidates
+
+def test_successive_halving_keeps_the_best(workdir, monkeypatch):
+    # Score = -max_depth: the shallowest candidate must win.
+    monkeypatch.setattr(tune, 'evaluate', lambda cache, target, params, fold, rows: -(params['max_depth'] or 99))
+    candidates = [{'max_depth': depth} for depth in (24, 8, 16, 12, None, 4, 6, 10, 20)]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        best, history = successive_halving(pool, 'unused', 'classifier', candidates, n_splits=2, n_rows=10_000,
+                                           eta=3, min_rows=100)
+    assert best['params'] == {'max_depth': 4}
+    # Later rungs see fewer candidates on more rows.
+    rows = [entry['rows'] for entry in history]
+    assert rows == sorted(rows) and rows.count(rows[0]) == len(candidates)
+    assert best['rows'] == rows[-1] > rows[0]
+
+def test_run_tuning_end_to_end(workdir):
+    save_merged(make_merged(rows=300))
+    results = run_tuning(n_candidates=2, n_splits=2, workers=1)
+    assert set(results) == {'classifier', 'regressor'}
+    assert results['classifier']['best'] is not None
+    with open(TUNING_RESULTS) as fh:
+        assert set(json.load(fh)) == {'classifier', 'regressor'}
@@ -0,0 +1,79 @@
+import json
+import numpy as np
+import pandas as pd
+import utils
+from utils import (THREE_CLASS_ORDER, SENTIMENT_ORDER, MISSING_LABEL, STATE_PATH, apply_schema, sentiment_dtype,
+                   sentiment_labels, memory_per_row, path_fingerprint, local_imports, code_fingerprint)
+
+def test_apply_schema_dtypes():
+    df = apply_schema(pd.DataFrame({
+        'Account': ['0xa', '0xb', '0xa'],
+        'Coin': ['BTC', 'ETH', 'BTC'],
+        'Side': ['BUY', 'SELL', 'BUY'],
+        'Execution Price': ['1.5', 'bad', '3'],
+        'Closed PnL': [1, 2, 3],
+        'datetime': ['2024-01-01 10:00', '2024-01-02 11:00', None],
+        'classification': ['Greed', None, 'Fear'],
+        'label': [0, 0, 0],
+    }))
+    assert all(isinstance(df[col].dtype, pd.CategoricalDtype) for col in ['Account', 'Coin', 'Side'])
+    assert df['Execution Price'].dtype == 'float32'
+    assert np.isnan(df['Execution Price'].iloc[1])
+    assert df['Closed PnL'].dtype == 'float64'
+    assert pd.api.types.is_datetime64_any_dtype(df['datetime'])
+    # The label is recomputed from the ordered classification.
+    assert df['label'].dtype == 'int8'
+    assert df['label'].tolist() == [2, MISSING_LABEL, 0]
+
+def test_sentiment_dtype_uses_the_full_scheme(workdir):
+    assert sentiment_dtype('3-class').categories.tolist() == THREE_CLASS_ORDER
+    assert sentiment_dtype('5-class').categories.tolist() == SENTIMENT_ORDER
+    # Without a scheme, the one recorded in the watermark, else the default.
+    assert sentiment_dtype().categories.tolist() == THREE_CLASS_ORDER
+    with open(STATE_PATH, 'w') as fh:
+        json.dump({'scheme': '5-class'}, fh)
+    assert sentiment_dtype().categories.tolist() == SENTIMENT_ORDER
+    classes = pd.Series(['Neutral', 'Extreme Greed'], dtype=sentiment_dtype())
+    assert sentiment_labels(classes).tolist() == [2, 4]
+
+def test_apply_schema_takes_categories_from_the_scheme_not_the_chunk(workdir):
+    # A chunk holding only 3-class names still gets 5-class codes.
+    df = apply_schema(pd.DataFrame({'classification': ['Fear', 'Greed', 'Other'], 'label': 0}), '5-class')
+    assert df['classification'].cat.categories.tolist() == SENTIMENT_ORDER
+    assert df['label'].tolist() == [1, 3, MISSING_LABEL]
+    assert apply_schema(pd.DataFrame({'classification': ['Fear']}))['classification'].cat.categories.tolist() == \
+        THREE_CLASS_ORDER
+    # Already banded with a scheme: kept.
+    banded = pd.DataFrame({'classification': pd.Categorical(['Fear'], categories=SENTIMENT_ORDER, ordered=True)})
+    assert apply_schema(banded)['classification'].cat.categories.tolist() == SENTIMENT_ORDER
+
+def test_apply_schema_without_classification_fills_missing_labels():
+    df = apply_schema(pd.DataFrame({'label': [1.0, np.nan]}))
+    assert df['label'].tolist() == [1, MISSING_LABEL]
+
+def test_compact_schema_saves_memory():
+    raw = pd.DataFrame({'Account': ['0x' + 'a' * 40] * 1000, 'Leverage': np.ones(1000)})
+    assert memory_per_row(apply_schema(raw.copy())) < memory_per_row(raw) / 5
+
+def test_path_fingerprint(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('a\n1\n')
+    first = path_fingerprint(str(path))
+    assert path_fingerprint(str(path)) == first
+    assert path_fingerprint(str(path), 'extra') != first
+    path.write_text('a\n1\n2\n')
+    assert path_fingerprint(str(path)) != first
+    assert path_fingerprint(str(tmp_path)) != path_fingerprint(str(tmp_path / 'missing'))
+
+def test_code_fingerprint_follows_local_imports(tmp_path, monkeypatch):
+    (tmp_path / 'top.py').write_text('import os\nfrom middle import value\n')
+    (tmp_path / 'middle.py').write_text('def value():\n    import leaf\n    return leaf.X\n')
+    (tmp_path / 'leaf.py').write_text('X = 1\n')
+    (tmp_path / 'other.py').write_text('Y = 1\n')
+    monkeypatch.setattr(utils, 'SRC_DIR', str(tmp_path))
+    assert local_imports('top') == {'middle'}
+    first = code_fingerprint('top')
+    (tmp_path / 'other.py').write_text('Y = 2\n')
+    assert code_fingerprint('top') == first
+    (tmp_path / 'leaf.py').write_text('X = 2\n')
+    assert code_fingerprint('top') != first